@@ -0,0 +1,244 @@
+"""
+Benchmark of the AI agent workflow over a corpus of questions.
+
+Every question is answered in a fresh conversation by AttendanceAgentWorkflow, and per query
+the benchmark reports the agent the turn started at, LLM calls, tool calls and the queries
+they executed, DB time, time to the first streamed token, wall time and estimated tokens.
+
+By default the LLM is the offline scripted backend replaying the recorded plans in
+mock_data/agent_plans.json, so runs need no network and are deterministic apart from timings;
+tools still query the database configured through the usual environment variables.
+
+Usage (from the backend directory):
+
+    python agent_benchmark.py                              # scripted LLM, 3 repetitions
+    python agent_benchmark.py --latency 0.8 --concurrency 4
+    python agent_benchmark.py --save baseline.json
+    python agent_benchmark.py --baseline baseline.json     # exit code 1 on regression
+    python agent_benchmark.py --resume-check               # also check persisted conversations resume
+    python agent_benchmark.py --backend gemini             # the real model (needs GOOGLE_API_KEY)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+# Counted per query and averaged over the repetitions; any increase over the baseline is a regression
+COUNTED_METRICS = ("llm_calls", "tool_calls", "queries", "prompt_tokens", "completion_tokens")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the AI agent workflow over recorded questions.")
+    parser.add_argument("--backend", default="scripted", choices=("scripted", "gemini"), help="LLM backend (default: scripted)")
+    parser.add_argument("--plans", help="JSON file of questions and recorded plans (default: LLM_PLANS_FILE)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per scripted LLM call")
+    parser.add_argument("--repeat", type=int, default=3, help="Times the corpus is run")
+    parser.add_argument("--concurrency", type=int, default=1, help="Questions answered at the same time")
+    parser.add_argument("--cold", action="store_true", help="Clear the tool cache before every question")
+    parser.add_argument("--no-routing", action="store_true", help="Start every question at the manager agent")
+    parser.add_argument("--save", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative wall time increase over the baseline")
+    parser.add_argument("--slack", type=float, default=0.05, help="Seconds of wall time increase always allowed, for timer noise")
+    parser.add_argument("--resume-check", action="store_true", help="Check every conversation survives a save and load and can continue")
+    parser.add_argument("--verbose", action="store_true", help="Keep the application's INFO logging")
+    return parser.parse_args()
+
+
+async def run_question(workflow: Any, question: str) -> Dict[str, Any]:
+    """Answers one question in a new conversation and measures it."""
+    from app.llm import track_usage
+
+    done: Dict[str, Any] = {}
+    first_token = None
+    tool_calls = 0
+    started = time.perf_counter()
+    with track_usage() as usage:
+        async for event in workflow.stream(question):
+            if event["type"] == "token" and first_token is None:
+                first_token = time.perf_counter() - started
+            elif event["type"] == "tool_call" and event["tool"] != "handoff":
+                tool_calls += 1
+            elif event["type"] == "done":
+                done = event
+    wall = time.perf_counter() - started
+    tools = done.get("tools", {})
+    return {
+        "question": question,
+        "route": done.get("route"),
+        **usage.stats(),
+        "tool_calls": tool_calls,
+        "queries": tools.get("executed", 0),
+        "db_seconds": tools.get("db_seconds", 0.0),
+        "first_token_seconds": first_token if first_token is not None else wall,
+        "wall_seconds": wall,
+        "response": done.get("response", ""),
+    }
+
+
+async def run_corpus(questions: List[str], repeat: int, concurrency: int, cold: bool) -> List[List[Dict[str, Any]]]:
+    """Runs every question ``repeat`` times; returns the runs of each question in corpus order."""
+    from app.ai import load_agent_workflow
+    from app.toolcache import tool_cache
+
+    agent_workflow = await load_agent_workflow()
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def measured(question: str) -> Dict[str, Any]:
+        async with semaphore:
+            if cold:
+                tool_cache.clear()
+            return await run_question(agent_workflow, question)
+
+    runs: List[List[Dict[str, Any]]] = [[] for _ in questions]
+    for _ in range(repeat):
+        results = await asyncio.gather(*(measured(question) for question in questions))
+        for index, result in enumerate(results):
+            runs[index].append(result)
+    return runs
+
+
+async def check_resume(questions: List[str]) -> List[str]:
+    """
+    Saves and loads every conversation the way persisted chat sessions do, then continues it.
+
+    Returns a description of every conversation that failed to round-trip through JSON or lost
+    its history.
+    """
+    from app.ai import load_agent_workflow
+
+    workflow = await load_agent_workflow()
+    failures = []
+    for question in questions:
+        try:
+            response, ctx = await workflow.chat(question)
+            data = json.loads(json.dumps(await workflow.serialize_context(ctx)))
+            restored = await workflow.deserialize_context(data)
+            history = list((await restored.get("memory")).get_all())
+            if [message.content for message in history[-2:]] != [question, response]:
+                failures.append(f"{question}: restored history does not end with the previous turn")
+                continue
+            follow_up, ctx = await workflow.chat(question, restored)
+            if follow_up != response or len((await ctx.get("memory")).get_all()) <= len(history):
+                failures.append(f"{question}: the restored conversation did not continue")
+        except Exception as e:
+            failures.append(f"{question}: {e}")
+    return failures
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregates the repetitions of one question."""
+    walls = [run["wall_seconds"] for run in runs]
+    summary = {
+        "question": runs[0]["question"],
+        "route": runs[0]["route"],
+        "wall_p50": statistics.median(walls),
+        "wall_max": max(walls),
+        "first_token_p50": statistics.median(run["first_token_seconds"] for run in runs),
+        "db_seconds": statistics.mean(run["db_seconds"] for run in runs),
+    }
+    for metric in COUNTED_METRICS:
+        summary[metric] = statistics.mean(run[metric] for run in runs)
+    return summary
+
+
+def print_report(summaries: List[Dict[str, Any]], elapsed: float, total_runs: int) -> None:
+    header = f"{'question':<44} {'route':<17} {'llm':>4} {'tools':>5} {'qry':>4} {'db ms':>7} {'ttft ms':>8} {'p50 ms':>8} {'max ms':>8} {'prompt':>7} {'compl':>6}"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        question = s["question"] if len(s["question"]) <= 44 else s["question"][:43] + "…"
+        print(
+            f"{question:<44} {s['route'] or '-':<17} {s['llm_calls']:>4.1f} {s['tool_calls']:>5.1f} {s['queries']:>4.1f}"
+            f" {s['db_seconds'] * 1000:>7.1f} {s['first_token_p50'] * 1000:>8.1f} {s['wall_p50'] * 1000:>8.1f}"
+            f" {s['wall_max'] * 1000:>8.1f} {s['prompt_tokens']:>7.0f} {s['completion_tokens']:>6.0f}"
+        )
+    print("-" * len(header))
+    print(
+        f"{total_runs} queries in {elapsed:.2f}s ({total_runs / elapsed:.1f}/s); per query: "
+        f"{statistics.mean(s['llm_calls'] for s in summaries):.2f} LLM calls, "
+        f"{statistics.mean(s['tool_calls'] for s in summaries):.2f} tool calls, "
+        f"{statistics.mean(s['db_seconds'] for s in summaries) * 1000:.1f} ms DB, "
+        f"{statistics.mean(s['wall_p50'] for s in summaries) * 1000:.1f} ms wall, "
+        f"{statistics.mean(s['prompt_tokens'] + s['completion_tokens'] for s in summaries):.0f} tokens"
+    )
+
+
+def compare(summaries: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float, slack: float) -> List[str]:
+    """
+    Returns a description of every regression against the baseline.
+
+    Counts are only comparable between runs with the same --repeat, --cold and --no-routing
+    options, since repetitions are served from the tool cache.
+    """
+    regressions = []
+    for s in summaries:
+        before = baseline.get(s["question"])
+        if before is None:
+            continue
+        for metric in COUNTED_METRICS:
+            if s[metric] > before[metric] + 1e-9:
+                regressions.append(f"{s['question']}: {metric} {before[metric]:g} -> {s[metric]:g}")
+        if s["wall_p50"] > before["wall_p50"] * (1 + tolerance) + slack:
+            regressions.append(f"{s['question']}: wall_p50 {before['wall_p50'] * 1000:.1f} ms -> {s['wall_p50'] * 1000:.1f} ms")
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+    # Read by app.llm and app.ai when they are imported below
+    os.environ["LLM_BACKEND"] = args.backend
+    os.environ["SCRIPTED_LLM_LATENCY"] = str(args.latency)
+    if args.plans:
+        os.environ["LLM_PLANS_FILE"] = args.plans
+    if args.no_routing:
+        os.environ["CHAT_DIRECT_ROUTING"] = "false"
+
+    from app.db import pool
+    from app.llm import LLM_PLANS_FILE
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    with open(LLM_PLANS_FILE, encoding="utf-8") as f:
+        questions = [entry["question"] for entry in json.load(f)]
+
+    pool.open()
+    try:
+        started = time.perf_counter()
+        runs = asyncio.run(run_corpus(questions, args.repeat, args.concurrency, args.cold))
+        elapsed = time.perf_counter() - started
+        resume_failures = asyncio.run(check_resume(questions)) if args.resume_check else []
+    finally:
+        pool.close()
+
+    summaries = [summarize(question_runs) for question_runs in runs]
+    print_report(summaries, elapsed, sum(len(question_runs) for question_runs in runs))
+
+    if args.resume_check:
+        for failure in resume_failures:
+            print(f"RESUME FAILED {failure}")
+        if not resume_failures:
+            print(f"All {len(questions)} conversations resumed after a save and load")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({s["question"]: s for s in summaries}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(summaries, json.load(f), args.tolerance, args.slack)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 1 if resume_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
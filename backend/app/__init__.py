@@ -1,22 +1,43 @@
+import time
+
+# When importing the app began, for the startup report in /stats/
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from tenacity import retry, stop_after_attempt, retry_if_exception, wait_incrementing, before_sleep_log, after_log
 from . import employees, teams, attendance, auth, ai
-from .db import (
+from .async_db import (
     create_employee,
+    get_employee_by_username,
+    close_pool,
+    get_pool,
+    get_pool_stats as get_async_pool_stats,
+    invalidation_listener,
+)
+from .db import (
+    get_pool_stats,
+    get_statement_stats,
+    maintain_attendance_partitions,
+    pool,
 )
 from .models import (
     EmployeeCreate,
     Employee
 )
+from .cache import principal_cache, trends_cache
+from .toolcache import tool_cache
 from .helper import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
+    get_password_hash_stats,
+    password_hash_executor,
     create_access_token,
-    get_employee_by_username,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
+from contextlib import asynccontextmanager
+import asyncio
 import datetime
 import logging
 
@@ -27,11 +48,46 @@ logger = logging.getLogger(__name__)
 # OAuth2 setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Startup timings: seconds spent importing the app, running the startup hooks, and from the
+# start of the import until the app was ready to serve
+startup_stats = {"import_seconds": None, "lifespan_seconds": None, "ready_seconds": None}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warms up the database connection pools, attendance partitions and the cache invalidation listener on startup and closes them on shutdown."""
+    lifespan_started = time.perf_counter()
+    pool.open()
+    try:
+        await get_pool()
+    except Exception as e:
+        logger.error(f"Error warming up async connection pool: {e}")
+    # Creates upcoming attendance partitions when partitioning is enabled
+    await asyncio.to_thread(maintain_attendance_partitions)
+    invalidation_listener.start()
+    # The AI agent workflow is not needed to serve; it is built on the first chat unless warmed up here
+    warmup = None
+    if ai.CHAT_WORKFLOW_WARMUP == "background":
+        warmup = asyncio.create_task(ai.warm_up_agent_workflow())
+    startup_stats["lifespan_seconds"] = round(time.perf_counter() - lifespan_started, 3)
+    startup_stats["ready_seconds"] = round(time.perf_counter() - _import_started, 3)
+    logger.info(
+        f"Startup: app imported in {startup_stats['import_seconds']}s, ready after {startup_stats['ready_seconds']}s "
+        f"(agent workflow: {ai.CHAT_WORKFLOW_WARMUP})"
+    )
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await invalidation_listener.stop()
+    await close_pool()
+    pool.close()
+    password_hash_executor.shutdown(wait=False)
+
 # FastAPI app
 app = FastAPI(
     title="AI-enhanced Attendance Operations Platform",
     description="API for managing attendance records, teams, and employees.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -58,13 +114,32 @@ app.include_router(ai.router)
 # Endpoints
 @app.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    employee = get_employee_by_username(form_data.username)
-    if not employee or not verify_password(form_data.password, employee.password_hash):
+    employee = await get_employee_by_username(form_data.username)
+    if not employee or not await verify_password_async(form_data.password, employee.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     access_token_expires = datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(data={"sub": employee.email, "role": employee.role, "team_id": employee.team_id, "employee_id": employee.employee_id}, expires_delta=access_token_expires)
+    access_token = create_access_token(data={"sub": employee.email, "name": employee.name, "role": employee.role, "team_id": employee.team_id, "employee_id": employee.employee_id}, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer", "role": employee.role}
 
+@app.get("/stats/")
+async def read_stats(current_user: Employee = Depends(auth.get_current_active_user)):
+    """Runtime statistics for the database connection pools and caches."""
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    return {
+        "db_pool": get_pool_stats(),
+        "async_db_pool": get_async_pool_stats(),
+        "principal_cache": principal_cache.stats(),
+        "trends_cache": trends_cache.stats(),
+        "cache_invalidation": invalidation_listener.stats(),
+        "prepared_statements": get_statement_stats(),
+        "password_hashing": get_password_hash_stats(),
+        "chat_sessions": ai.chat_sessions.stats(),
+        "tool_cache": tool_cache.stats(),
+        "chat_routing": ai.intent_router.stats(),
+        "startup": {**startup_stats, "agent_workflow": ai.get_agent_workflow_stats()},
+    }
+
 # Employees CRUD endpoints
 @app.post("/employees/", response_model=Employee)
 @retry(
@@ -85,8 +160,8 @@ async def create_employee_endpoint(employee_data: EmployeeCreate, current_user:
         password = employee_data.password
         if not name or not email or not password:
             raise HTTPException(status_code=400, detail="Name, email, and password are required")
-        hashed_password = get_password_hash(password)
-        employee_id = create_employee(name, email, team_id, role, hashed_password)
+        hashed_password = await get_password_hash_async(password)
+        employee_id = await create_employee(name, email, team_id, role, hashed_password)
         if not employee_id:
             raise HTTPException(status_code=500, detail="Failed to create employee")
         return Employee(
@@ -98,3 +173,5 @@ async def create_employee_endpoint(employee_data: EmployeeCreate, current_user:
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create employee: {e}")
+
+startup_stats["import_seconds"] = round(time.perf_counter() - _import_started, 3)
@@ -1,20 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
-# from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.llms.gemini import Gemini
-from llama_index.core.agent.workflow import FunctionAgent, AgentWorkflow
-from llama_index.core.tools import FunctionTool
-from llama_index.core.agent.workflow import (
-    AgentOutput,
-    ToolCall,
-    ToolCallResult,
-)
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Optional, Set, Tuple
+from uuid import uuid4
 from datetime import datetime, timedelta
 from pydantic import Field
 from .helper import get_attendance_data
+from .analytics import get_attendance_analytics
 from .models import Employee
 from .auth import get_current_active_user
+from .async_db import save_chat_context, load_chat_context, delete_chat_context
+from .toolcache import ToolCallTurn
+from .tooloutput import (
+    tool_functions,
+    ATTENDANCE_ROWS,
+    EMPLOYEE_ROWS,
+    TEAM_ROWS,
+    GAP_ROWS,
+    DEFAULT_OUTPUT,
+)
+from .sessions import (
+    SessionStore,
+    SessionBusyError,
+    CHAT_SESSIONS_MAX,
+    CHAT_SESSION_IDLE_TTL,
+    CHAT_SESSION_CONCURRENCY,
+    CHAT_SESSION_WAIT,
+    CHAT_SESSIONS_PERSIST,
+)
 from pydantic import BaseModel
+import asyncio
+import json
 import logging
+import os
+import re
+import threading
+import time
 from .db import (
     get_all_employees,
     get_all_teams,
@@ -27,16 +47,30 @@ from .db import (
     get_employee_attendance_stats,
     get_team_attendance_stats,
     get_employees_without_attendance,
+    get_attendance_gaps,
     get_attendance_by_status,
     search_employees,
     search_teams
 )
 
+# LlamaIndex and the LLM client take seconds to import and construct, so they are loaded with
+# the agent workflow on first use (see get_agent_workflow) instead of when the app is imported
+if TYPE_CHECKING:
+    from llama_index.core.workflow import Context
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Appended to the specialist prompts: how tool results are encoded (see app/tooloutput.py)
+TOOL_RESULTS_GUIDELINES = """
+## Tool Results
+- Lists are returned as {"columns": [...], "rows": [[...], ...]}, each row holding its values in column order
+- Large lists also carry "total_rows", a "summary" of counts over all rows and one page of rows; answer from the summary when it is enough, otherwise call the same function again with `offset` set to "next_offset"
+- A "truncated" field or a trailing "…" marks output left out to save space; narrow the query instead of guessing what is missing
+"""
+
 # System prompts for specialized agents
 MANAGER_SYSTEM_PROMPT = """
 Your name is "Manager Agent".
@@ -110,9 +144,10 @@ You are an Attendance Records Specialist for an attendance management system.
 You handle queries about attendance data, statistics, and trends.
 
 ## Available Functions
-1. `get_attendance_data(timeframe: str) -> str`
-   - Retrieves attendance summary for a specific timeframe: "last week", "last month", or "today"
-   - Use this function, if the query mentions timeframe like "last week", "last month", or "today"
+1. `get_attendance_data(timeframe: str, columns: Optional[List[str]] = None) -> str`
+   - Retrieves attendance data for a relative timeframe: "today", "yesterday", "last week", "last month", "last N days" (also weeks/months), "this week", "this month", "this quarter" or "this year"
+   - Use this function, if the query mentions a timeframe like these
+   - Pass `columns` (e.g. ["employee_id", "attendance_date", "status"]) to fetch only the fields you need
    - The function returns all details about the attendance data for the specified timeframe
 
 2. `get_attendance_by_date_range(start_date: str, end_date: str, employee_id: Optional[int] = None, status: Optional[str] = None) -> List[dict]`
@@ -140,13 +175,21 @@ You handle queries about attendance data, statistics, and trends.
 8. `get_employees_without_attendance(date: str, team_id: Optional[int] = None) -> List[dict]`
    - Gets employees who don't have an attendance record for a specific date
 
-9. `get_attendance_record(record_id: int) -> dict`
+9. `get_attendance_gaps(start_date: str, end_date: str, team_id: Optional[int] = None, employee_id: Optional[int] = None, holidays: Optional[List[str]] = None) -> List[dict]`
+   - Gets every working day (Monday to Friday by default, minus `holidays`) in a date range on which an employee has no attendance record
+   - Use this instead of calling `get_employees_without_attendance` once per day when the query covers more than one date
+
+10. `get_attendance_analytics(start_date: str, end_date: str, team_id: Optional[int] = None, employee_id: Optional[int] = None, window: int = 7, limit: int = 10) -> dict`
+   - Computes attendance rates against working days (so missing records count as non-attendance), absence and presence streaks and missing-record counts
+   - Returns the overall rate and the `limit` employees with the lowest attendance rate; use it for questions like "who has the worst attendance this month" or "what is the attendance rate of team 3"
+
+11. `get_attendance_record(record_id: int) -> dict`
    - Retrieves a specific attendance record by record_id
 
-10. `get_today_date() -> str`
+12. `get_today_date() -> str`
     - Gets today's date in YYYY-MM-DD format
 
-11. `process_date(date: str, days: Optional[int], weeks: Optional[int], operation: str) -> str`
+13. `process_date(date: str, days: Optional[int], weeks: Optional[int], operation: str) -> str`
     - Processes a date string by adding or subtracting days or weeks
 
 ## Guidelines
@@ -176,28 +219,136 @@ def process_date(date: str = get_today_date(), days: int = 0, weeks: int = 0, op
 
     return new_date.strftime('%Y-%m-%d')
 
+class IntentRouter:
+    """
+    Rules-based router that sends clearly scoped messages straight to one specialist agent.
+
+    Every message otherwise starts at manager_agent, whose only job is to hand off, costing at
+    least two LLM round trips before a specialist sees the question. A message is routed when
+    its keywords point at exactly one specialist; anything ambiguous, conversational or asking
+    for changes the agents cannot make starts at the manager as before. A routed specialist
+    can still hand off to the manager, so a wrong route costs one extra round trip.
+
+    Keeps hit-rate counters and estimates the latency saved from the time the manager took
+    before handing off on the turns that went through it.
+    """
+
+    RULES = {
+        "attendance_agent": re.compile(
+            r"\b(attendance|attend(ed|ing)?|present|absent(ee)?s?|absences?|wfh|work(ed|ing)? from home|remote|"
+            r"leaves?|on leave|check(ed)?[- ]?(in|out)|late|missing|gaps?|streaks?|rates?|stats|statistics|trends?|"
+            r"today|yesterday|(last|this|past|next) (\d+ )?(days?|weeks?|months?|quarter|year)|"
+            r"january|february|march|april|june|july|august|september|october|november|december|"
+            r"\d{4}-\d{2}-\d{2})\b",
+            re.IGNORECASE,
+        ),
+        "team_agent": re.compile(r"\b(teams?|departments?|squads?)\b", re.IGNORECASE),
+        "employee_agent": re.compile(
+            r"\b(employees?|staff|people|person|members?|colleagues?|emails?|roles?|admins?|who is)\b",
+            re.IGNORECASE,
+        ),
+    }
+    # "team 3" / "employee 12" are ids every specialist's tools take directly, so they do not
+    # call for a lookup by another agent
+    ID_REFERENCE = re.compile(r"\b(team|employee)(?:_id)?\s*#?\s*\d+\b", re.IGNORECASE)
+    # Requests the tools cannot serve, and small talk, are left to the manager
+    FALLBACK = re.compile(
+        r"\b(create|add|insert|delete|remove|update|change|rename|mark|assign|hello|hi|hey|thanks|thank you|help)\b",
+        re.IGNORECASE,
+    )
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._messages = 0
+        self._routed: Dict[str, int] = {}
+        self._handed_back = 0
+        self._fallback_turns = 0
+        self._manager_seconds = 0.0
+
+    def route(self, message: str) -> Optional[str]:
+        """Returns the specialist agent to start with, or None to start at the manager."""
+        self._messages += 1
+        if not self.enabled or self.FALLBACK.search(message):
+            return None
+        text = self.ID_REFERENCE.sub(" ", message)
+        matched = {agent for agent, rule in self.RULES.items() if rule.search(text)}
+        if not matched:
+            # Only an id reference, e.g. "show team 3": route by the entity it names
+            matched = {f"{reference.group(1).lower()}_agent" for reference in self.ID_REFERENCE.finditer(message)}
+        agent = matched.pop() if len(matched) == 1 else None
+        if agent is not None:
+            self._routed[agent] = self._routed.get(agent, 0) + 1
+        return agent
+
+    def record(self, route: Optional[str], manager_seconds: Optional[float], handed_back: bool) -> None:
+        """
+        Records how a turn went.
+
+        Args:
+            route (str, optional): Agent the turn was routed to, None if it started at the manager
+            manager_seconds (float, optional): Time the manager took before its first handoff
+            handed_back (bool): Whether a routed specialist handed the turn to the manager
+        """
+        if route is not None:
+            self._handed_back += handed_back
+        elif manager_seconds is not None:
+            self._fallback_turns += 1
+            self._manager_seconds += manager_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns route hit rate, handbacks and the estimated manager time saved."""
+        routed = sum(self._routed.values())
+        average_manager = self._manager_seconds / self._fallback_turns if self._fallback_turns else None
+        return {
+            "enabled": self.enabled,
+            "messages": self._messages,
+            "routed": dict(self._routed),
+            "hit_rate": round(routed / self._messages, 3) if self._messages else 0.0,
+            "handed_back": self._handed_back,
+            "average_manager_seconds": round(average_manager, 3) if average_manager is not None else None,
+            "estimated_seconds_saved": round((routed - self._handed_back) * average_manager, 3) if average_manager is not None else None,
+        }
+
+
+# Start clearly scoped chat messages at the matching specialist instead of the manager
+CHAT_DIRECT_ROUTING = os.getenv("CHAT_DIRECT_ROUTING", "true").lower() == "true"
+
+intent_router = IntentRouter(enabled=CHAT_DIRECT_ROUTING)
+
+def _discard_result(future: asyncio.Future) -> None:
+    # Retrieve the outcome of a cancelled run so asyncio does not log it as never retrieved
+    if not future.cancelled():
+        future.exception()
+
 class AttendanceAgentWorkflow:
     """Workflow manager for attendance system agents"""
     
     def __init__(self, llm):
         """Initialize the agent workflow with specialized agents."""
+        from llama_index.core.agent.workflow import FunctionAgent, AgentWorkflow
+        from llama_index.core.tools import FunctionTool
+        from .llm import ScriptedLLM
+
         self.llm = llm
-        self.handler = None
         
-        # Create specialized tools for each agent
+        # Create specialized tools for each agent. tool_functions builds each database tool:
+        # calls go through the tool call cache, so repeated calls within a turn are memoized,
+        # identical concurrent calls share one query and team/employee lookups are reused
+        # across turns until a write invalidates them, and results are shaped into compact
+        # columns, summaries and pages of large lists within a token budget per call.
         employee_tools = [
             FunctionTool.from_defaults(
-                fn=get_all_employees,
+                **tool_functions(get_all_employees, EMPLOYEE_ROWS, entities=("employee", "team")),
                 name="get_all_employees",
                 description="Retrieve all employees in the system.",
             ),
             FunctionTool.from_defaults(
-                fn=get_employee,
+                **tool_functions(get_employee, DEFAULT_OUTPUT, entities=("employee", "team")),
                 name="get_employee",
                 description="Retrieve details for a specific employee by employee_id.",
             ),
             FunctionTool.from_defaults(
-                fn=search_employees,
+                **tool_functions(search_employees, EMPLOYEE_ROWS, entities=("employee", "team")),
                 name="search_employees",
                 description="Search for employees by name, email, team_id, or role.",
             ),
@@ -205,17 +356,17 @@ class AttendanceAgentWorkflow:
         
         team_tools = [
             FunctionTool.from_defaults(
-                fn=get_all_teams,
+                **tool_functions(get_all_teams, TEAM_ROWS, entities=("team",)),
                 name="get_all_teams",
                 description="Retrieve all teams in the system.",
             ),
             FunctionTool.from_defaults(
-                fn=get_team,
+                **tool_functions(get_team, DEFAULT_OUTPUT, entities=("team",)),
                 name="get_team",
                 description="Retrieve details for a specific team by team_id.",
             ),
             FunctionTool.from_defaults(
-                fn=search_teams,
+                **tool_functions(search_teams, TEAM_ROWS, entities=("team",)),
                 name="search_teams",
                 description="Search for teams by name.",
             ),
@@ -223,47 +374,57 @@ class AttendanceAgentWorkflow:
         
         attendance_tools = [
             FunctionTool.from_defaults(
-                fn=get_attendance_data,
+                **tool_functions(get_attendance_data, DEFAULT_OUTPUT),
                 name="get_attendance_data",
                 description="Retrieve attendance data for a specific timeframe.",
             ),
             FunctionTool.from_defaults(
-                fn=get_attendance_by_date_range,
+                **tool_functions(get_attendance_by_date_range, ATTENDANCE_ROWS),
                 name="get_attendance_by_date_range",
                 description="Retrieve attendance records within a specific date range with optional employee and status filters.",
             ),
             FunctionTool.from_defaults(
-                fn=get_attendance_records_by_employee,
+                **tool_functions(get_attendance_records_by_employee, ATTENDANCE_ROWS),
                 name="get_attendance_records_by_employee",
                 description="Retrieve all attendance records for a specific employee.",
             ),
             FunctionTool.from_defaults(
-                fn=get_attendance_records_by_team,
+                **tool_functions(get_attendance_records_by_team, ATTENDANCE_ROWS),
                 name="get_attendance_records_by_team",
                 description="Retrieve attendance records for all employees in a specific team.",
             ),
             FunctionTool.from_defaults(
-                fn=get_employee_attendance_stats,
+                **tool_functions(get_employee_attendance_stats, DEFAULT_OUTPUT),
                 name="get_employee_attendance_stats",
                 description="Get attendance statistics (counts by status) for an employee within a date range.",
             ),
             FunctionTool.from_defaults(
-                fn=get_team_attendance_stats,
+                **tool_functions(get_team_attendance_stats, DEFAULT_OUTPUT),
                 name="get_team_attendance_stats",
                 description="Get attendance statistics (counts by status) for a team within a date range.",
             ),
             FunctionTool.from_defaults(
-                fn=get_attendance_by_status,
+                **tool_functions(get_attendance_by_status, ATTENDANCE_ROWS),
                 name="get_attendance_by_status",
                 description="Retrieve attendance records with a specific status and optional date range and team filters.",
             ),
             FunctionTool.from_defaults(
-                fn=get_employees_without_attendance,
+                **tool_functions(get_employees_without_attendance, EMPLOYEE_ROWS),
                 name="get_employees_without_attendance",
                 description="Find employees who don't have an attendance record for a specific date, optionally filtered by team.",
             ),
             FunctionTool.from_defaults(
-                fn=get_attendance_record,
+                **tool_functions(get_attendance_gaps, GAP_ROWS),
+                name="get_attendance_gaps",
+                description="Find every (employee, working day) pair without an attendance record in a date range, optionally filtered by team or employee and excluding holidays.",
+            ),
+            FunctionTool.from_defaults(
+                **tool_functions(get_attendance_analytics, DEFAULT_OUTPUT),
+                name="get_attendance_analytics",
+                description="Compute working-day attendance rates, absence/presence streaks and missing-record counts for a date range, optionally for one team or employee, listing the employees with the lowest attendance.",
+            ),
+            FunctionTool.from_defaults(
+                **tool_functions(get_attendance_record, DEFAULT_OUTPUT),
                 name="get_attendance_record",
                 description="Retrieve a specific attendance record by record_id.",
             ),
@@ -293,7 +454,7 @@ class AttendanceAgentWorkflow:
             llm=llm,
             tools=employee_tools,
             name="employee_agent",
-            system_prompt=EMPLOYEE_SYSTEM_PROMPT,
+            system_prompt=EMPLOYEE_SYSTEM_PROMPT + TOOL_RESULTS_GUIDELINES,
             description="Employee Agent: Handles all employee-related queries.",
             can_handoff_to=["manager_agent"],
         )
@@ -302,7 +463,7 @@ class AttendanceAgentWorkflow:
             llm=llm,
             tools=team_tools,
             name="team_agent",
-            system_prompt=TEAM_SYSTEM_PROMPT,
+            system_prompt=TEAM_SYSTEM_PROMPT + TOOL_RESULTS_GUIDELINES,
             description="Team Agent: Handles all team-related queries.",
             can_handoff_to=["manager_agent"],
         )
@@ -311,7 +472,7 @@ class AttendanceAgentWorkflow:
             llm=llm,
             tools=attendance_tools,
             name="attendance_agent",
-            system_prompt=ATTENDANCE_SYSTEM_PROMPT,
+            system_prompt=ATTENDANCE_SYSTEM_PROMPT + TOOL_RESULTS_GUIDELINES,
             description="Attendance Agent: Handles all attendance-related queries.",
             can_handoff_to=["manager_agent"],
         )
@@ -326,14 +487,46 @@ class AttendanceAgentWorkflow:
             ],
             root_agent="manager_agent"
         )
+
+        # A scripted LLM tells the agents apart by their system prompts to replay agent-tagged steps
+        if isinstance(llm, ScriptedLLM):
+            llm.bind_agents(self.workflow.agents.values())
         
-    async def chat(self, message: str) -> str:
-        """Process a user message through the agent workflow."""
+    async def stream(self, message: str, ctx: Optional["Context"] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user message through the agent workflow, yielding progress as it happens.
+
+        Yields events with a "type" of "agent" (the active agent changed), "tool_call",
+        "tool_result", "token" (an incremental piece of an agent's reply) and "error", always
+        ending with "done", which carries the final response, the agent the turn started at
+        ("route") and, under "ctx", the context to continue the conversation with. Closing the
+        generator early cancels the workflow run.
+
+        Args:
+            message (str): The user's message
+            ctx (Context, optional): Context of the conversation so far, None to start a new one
+        """
+        from llama_index.core.agent.workflow import AgentOutput, AgentStream, ToolCall, ToolCallResult
+        from llama_index.core.workflow import Context
+
+        handler = None
+        # Tool calls made by any agent during this turn share one memo
+        turn = ToolCallTurn()
+        route = intent_router.route(message)
+        started = time.perf_counter()
+        manager_seconds = None
+        handed_back = False
         try:
             current_agent = None
 
-            ctx = self.handler.ctx if self.handler != None else None
-            handler = self.workflow.run(
+            # The context remembers the agent that answered last, so choose the first agent of
+            # every turn: the routed specialist, or the manager to delegate as usual
+            if ctx is None:
+                ctx = Context(self.workflow)
+            await ctx.set("current_agent_name", route or "manager_agent")
+
+            handler = turn.run(
+                self.workflow.run,
                 ctx=ctx,
                 user_msg=message
             )
@@ -346,7 +539,15 @@ class AttendanceAgentWorkflow:
                 ):
                     current_agent = event.current_agent_name
                     logging.info(f"🤖 Agent: {current_agent}")
-
+                    if current_agent == "manager_agent":
+                        handed_back = route is not None
+                    elif route is None and manager_seconds is None:
+                        manager_seconds = time.perf_counter() - started
+                    yield {"type": "agent", "agent": current_agent}
+
+                if isinstance(event, AgentStream):
+                    if event.delta:
+                        yield {"type": "token", "agent": current_agent, "delta": event.delta}
                 elif isinstance(event, AgentOutput):
                     if event.response.content:
                         logging.info("📤 Output: " + event.response.content)
@@ -360,32 +561,177 @@ class AttendanceAgentWorkflow:
                     logging.info(f"🔧 Tool Result ({event.tool_name}):")
                     logging.info(f"  Arguments: {event.tool_kwargs}")
                     logging.info(f"  Output: {event.tool_output}")
+                    yield {"type": "tool_result", "tool": event.tool_name, "output": event.tool_output.content}
                 elif isinstance(event, ToolCall):
                     logging.info(f"🔨 Calling Tool: {event.tool_name}")
                     logging.info(f"  With arguments: {event.tool_kwargs}")
-            
+                    yield {"type": "tool_call", "tool": event.tool_name, "arguments": event.tool_kwargs}
+
+            # The event stream ends before the run itself; wait for it so the context is settled
+            # and is not cancelled below, which would abort the next turn started from it
+            await handler
+
             # Clean up the response to remove any "assistant:" prefixes
-            if complete_response.startswith("assistant: "):
+            if complete_response and complete_response.startswith("assistant: "):
                 complete_response = complete_response[len("assistant: "):]
 
-            self.handler = handler
-
-            if current_agent != "manager_agent":
-                # If the last agent was not the manager agent, Reset the handler (FIX IN FUTURE)
-                self.handler = None
+            ctx = handler.ctx
+            intent_router.record(route, manager_seconds, handed_back)
                 
-            return complete_response or "I'm sorry, I couldn't process your request."
+            logging.info(f"🧮 Tool calls: {turn.stats()}")
+            yield {
+                "type": "done",
+                "response": complete_response or "I'm sorry, I couldn't process your request.",
+                "route": route or "manager_agent",
+                "ctx": ctx,
+                "tools": turn.stats(),
+            }
             
         except Exception as e:
             logger.error(f"Error in agent workflow: {str(e)}")
-            return f"I encountered an error while processing your request: {str(e)}"
+            yield {"type": "error", "detail": str(e)}
+            yield {
+                "type": "done",
+                "response": f"I encountered an error while processing your request: {str(e)}",
+                "route": route or "manager_agent",
+                "ctx": ctx,
+                "tools": turn.stats(),
+            }
+        finally:
+            if handler is not None and not handler.done():
+                # The consumer went away (client disconnected): stop the agents instead of
+                # letting them run to completion
+                logger.info("Cancelling agent workflow run")
+                handler.add_done_callback(_discard_result)
+                await handler.cancel_run()
+
+    async def chat(self, message: str, ctx: Optional["Context"] = None) -> Tuple[str, Optional["Context"]]:
+        """
+        Process a user message through the agent workflow.
+
+        Args:
+            message (str): The user's message
+            ctx (Context, optional): Context of the conversation so far, None to start a new one
+
+        Returns:
+            The response and the context to continue the conversation with
+        """
+        async for event in self.stream(message, ctx):
+            if event["type"] == "done":
+                return event["response"], event["ctx"]
+        return "I'm sorry, I couldn't process your request.", ctx
+
+    async def serialize_context(self, ctx: "Context") -> Dict[str, Any]:
+        """
+        Serializes a conversation context to JSON-compatible data.
+
+        The workflow context itself does not serialize to JSON (its chat memory is not
+        serializable), so only the conversation is kept: the user's messages and the agents'
+        replies. Tool calls and results are left out, as they hold provider-specific objects;
+        the agents fetch data again when a follow-up needs it.
+        """
+        from llama_index.core.llms import ChatMessage, MessageRole
+
+        memory = await ctx.get("memory", default=None)
+        messages = memory.get_all() if memory is not None else []
+        return {
+            "messages": [
+                ChatMessage(role=message.role, content=message.content).model_dump(mode="json")
+                for message in messages
+                if message.role in (MessageRole.USER, MessageRole.ASSISTANT) and message.content
+            ],
+        }
+
+    async def deserialize_context(self, data: Dict[str, Any]) -> "Context":
+        """Restores a conversation context serialized by serialize_context."""
+        from llama_index.core.llms import ChatMessage
+        from llama_index.core.memory import ChatMemoryBuffer
+        from llama_index.core.workflow import Context
+
+        ctx = Context(self.workflow)
+        messages = [ChatMessage.model_validate(message) for message in data.get("messages", [])]
+        await ctx.set("memory", ChatMemoryBuffer.from_defaults(chat_history=messages, llm=self.llm))
+        return ctx
 
 # Data model for chat input
 class ChatInput(BaseModel):
     message: str = Field(..., description="The message to send to the agent")
-
-# Instantiate the agent workflow for the FastAPI app
-agent_workflow = AttendanceAgentWorkflow(llm=Gemini())
+    conversation_id: Optional[str] = Field(
+        None,
+        max_length=64,
+        pattern=r"^[A-Za-z0-9_-]+$",
+        description="Conversation to continue; a new one is started when omitted",
+    )
+
+# When the agent workflow is built: "lazy" waits for the first chat request, "background" starts
+# building it on a worker thread as soon as the app has started
+CHAT_WORKFLOW_WARMUP = os.getenv("CHAT_WORKFLOW_WARMUP", "lazy").lower()
+
+# The agent workflow of the FastAPI app, built once by get_agent_workflow(); LLM_BACKEND selects the model
+_agent_workflow: Optional[AttendanceAgentWorkflow] = None
+_agent_workflow_lock = threading.Lock()
+_agent_workflow_seconds: Optional[float] = None
+
+def get_agent_workflow() -> AttendanceAgentWorkflow:
+    """Returns the agent workflow, importing LlamaIndex and creating the LLM and agents on first use."""
+    global _agent_workflow, _agent_workflow_seconds
+    if _agent_workflow is None:
+        with _agent_workflow_lock:
+            if _agent_workflow is None:
+                started = time.perf_counter()
+                from .llm import create_llm
+                _agent_workflow = AttendanceAgentWorkflow(llm=create_llm())
+                _agent_workflow_seconds = time.perf_counter() - started
+                logger.info(f"Agent workflow built in {_agent_workflow_seconds:.2f}s")
+    return _agent_workflow
+
+async def load_agent_workflow() -> AttendanceAgentWorkflow:
+    """Like get_agent_workflow(), but a first build runs on a worker thread so the event loop keeps serving."""
+    if _agent_workflow is not None:
+        return _agent_workflow
+    return await asyncio.to_thread(get_agent_workflow)
+
+async def warm_up_agent_workflow() -> None:
+    """Builds the agent workflow ahead of the first chat; failures are logged and retried on first use."""
+    try:
+        await load_agent_workflow()
+    except Exception as e:
+        logger.error(f"Error warming up agent workflow: {e}")
+
+def get_agent_workflow_stats() -> Dict[str, Any]:
+    """Returns whether the agent workflow has been built and how long building it took."""
+    return {
+        "warmup": CHAT_WORKFLOW_WARMUP,
+        "built": _agent_workflow is not None,
+        "build_seconds": round(_agent_workflow_seconds, 3) if _agent_workflow_seconds is not None else None,
+    }
+
+async def _load_session_context(employee_id: int, conversation_id: str) -> Optional["Context"]:
+    data = await load_chat_context(employee_id, conversation_id)
+    if data is None:
+        return None
+    workflow = await load_agent_workflow()
+    return await workflow.deserialize_context(data)
+
+async def _save_session_context(employee_id: int, conversation_id: str, ctx: Optional["Context"]) -> None:
+    if ctx is None:
+        await delete_chat_context(employee_id, conversation_id)
+    else:
+        await save_chat_context(employee_id, conversation_id, await get_agent_workflow().serialize_context(ctx))
+
+# Seconds of silence after which /chat/stream sends a keep-alive comment and checks the client is still there
+CHAT_STREAM_HEARTBEAT = float(os.getenv("CHAT_STREAM_HEARTBEAT", "15"))
+
+# Conversations of every user, each with its own workflow context
+chat_sessions = SessionStore(
+    maxsize=CHAT_SESSIONS_MAX,
+    idle_ttl=CHAT_SESSION_IDLE_TTL,
+    concurrency=CHAT_SESSION_CONCURRENCY,
+    wait_timeout=CHAT_SESSION_WAIT,
+    load=_load_session_context if CHAT_SESSIONS_PERSIST else None,
+    save=_save_session_context if CHAT_SESSIONS_PERSIST else None,
+    delete=delete_chat_context if CHAT_SESSIONS_PERSIST else None,
+)
 
 @router.post("/chat/")
 async def chat(chat_input: ChatInput, current_user: Employee = Depends(get_current_active_user)):
@@ -397,14 +743,124 @@ async def chat(chat_input: ChatInput, current_user: Employee = Depends(get_curre
         
         # Get the message from the input
         message = chat_input.message
+        conversation_id = chat_input.conversation_id or uuid4().hex
 
         # Log the message
-        logger.info(f"User message: {message}")
+        logger.info(f"User message ({current_user.employee_id}/{conversation_id}): {message}")
+
+        # Get the response from the agent workflow, continuing this user's conversation
+        workflow = await load_agent_workflow()
+        async with chat_sessions.session(current_user.employee_id, conversation_id) as session:
+            response, session.context = await workflow.chat(message, session.context)
+
+        return {"response": str(response), "conversation_id": conversation_id}
+    except SessionBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except HTTPException as http_ex:
+        raise http_ex
+    except Exception as e:
+        logger.error(f"Chat endpoint error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {e}")
 
-        # Get the response from the agent workflow
-        response = await agent_workflow.chat(message)
+@router.delete("/chat/{conversation_id}")
+async def end_chat(conversation_id: str, current_user: Employee = Depends(get_current_active_user)):
+    """End a conversation and discard its context."""
+    try:
+        if current_user.role != "ADMIN":
+            raise HTTPException(status_code=403, detail="Unauthorized")
 
-        return {"response": str(response)}
+        ended = await chat_sessions.end(current_user.employee_id, conversation_id)
+        return {"message": "Conversation ended", "was_active": ended}
+    except HTTPException as http_ex:
+        raise http_ex
     except Exception as e:
-        logger.error(f"Chat endpoint error: {str(e)}")
+        logger.error(f"End chat endpoint error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ending chat failed: {e}")
+
+# Streaming turns still running; holds a reference until each task finishes
+_stream_tasks: Set[asyncio.Task] = set()
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _run_stream_turn(workflow: AttendanceAgentWorkflow, session, message: str, queue: asyncio.Queue, started: asyncio.Event) -> None:
+    """Runs one conversation turn, feeding its events to ``queue`` and ending with None."""
+    started.set()
+    completed = False
+    try:
+        async for event in workflow.stream(message, session.context):
+            if event["type"] == "done":
+                session.context = event.pop("ctx")
+            queue.put_nowait(event)
+        completed = True
+    finally:
+        await chat_sessions.release(session, completed)
+        queue.put_nowait(None)
+
+async def _stream_events(request: Request, conversation_id: str, queue: asyncio.Queue, task: asyncio.Task) -> AsyncIterator[str]:
+    """Relays a turn's events to the client as SSE, cancelling the turn if the client goes away."""
+    try:
+        yield _sse("conversation", {"conversation_id": conversation_id})
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=CHAT_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    logger.info(f"Chat stream client disconnected ({conversation_id})")
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            event_type = event.pop("type")
+            if event_type == "done":
+                event["conversation_id"] = conversation_id
+            yield _sse(event_type, event)
+    finally:
+        if not task.done():
+            task.cancel()
+
+@router.post("/chat/stream")
+async def chat_stream(chat_input: ChatInput, request: Request, current_user: Employee = Depends(get_current_active_user)):
+    """
+    Chat with the agent, receiving its progress as Server-Sent Events.
+
+    Emits "conversation" first, then "agent", "tool_call", "tool_result", "token" and "error"
+    events as they happen and finally "done" with the complete response. Disconnecting cancels
+    the agent run; the conversation then keeps its previous context.
+    """
+    try:
+        if current_user.role != "ADMIN":
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+        message = chat_input.message
+        conversation_id = chat_input.conversation_id or uuid4().hex
+        logger.info(f"User message, streaming ({current_user.employee_id}/{conversation_id}): {message}")
+
+        # Claim the conversation before responding so a busy one still gets a 429. The turn runs
+        # as its own task, which releases the session even if the response is never consumed.
+        workflow = await load_agent_workflow()
+        session = await chat_sessions.acquire(current_user.employee_id, conversation_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        started = asyncio.Event()
+        task = asyncio.create_task(_run_stream_turn(workflow, session, message, queue, started))
+        _stream_tasks.add(task)
+        task.add_done_callback(_stream_tasks.discard)
+        # A task cancelled before its first step never runs its body, so release the session here
+        task.add_done_callback(
+            lambda _: started.is_set() or asyncio.ensure_future(chat_sessions.release(session, completed=False))
+        )
+
+        return StreamingResponse(
+            _stream_events(request, conversation_id, queue, task),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except SessionBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except HTTPException as http_ex:
+        raise http_ex
+    except Exception as e:
+        logger.error(f"Chat stream endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat failed: {e}")
@@ -0,0 +1,248 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .db import ATTENDANCE_STATUSES, get_attendance_matrix_data
+from .workdays import WorkCalendar, work_calendar
+
+# Status codes in the attendance matrix: 0 is "no record", the rest follow ATTENDANCE_STATUSES
+NO_RECORD = 0
+STATUS_CODES = {status: code for code, status in enumerate(ATTENDANCE_STATUSES, start=1)}
+PRESENT = STATUS_CODES['Present']
+ABSENT = STATUS_CODES['Absent']
+WFH = STATUS_CODES['WFH']
+LEAVE = STATUS_CODES['Leave']
+
+
+class AttendanceMatrix:
+    """
+    Attendance of a set of employees over a date range as dense NumPy arrays.
+
+    Attributes:
+        employee_ids (np.ndarray): Sorted employee ids, one per row
+        names (List[str]): Employee names, by row
+        team_ids (List[Optional[int]]): Employee team ids, by row
+        start_date (date): Date of the first column
+        status (np.ndarray): int8 (employees, days) matrix of status codes, NO_RECORD where missing
+        working (np.ndarray): bool (employees, days) matrix, True where the employee's team works
+    """
+
+    def __init__(self, employee_ids, names, team_ids, start_date, status, working):
+        self.employee_ids = employee_ids
+        self.names = names
+        self.team_ids = team_ids
+        self.start_date = start_date
+        self.status = status
+        self.working = working
+
+    @property
+    def dates(self) -> List[date]:
+        return [self.start_date + timedelta(days=offset) for offset in range(self.status.shape[1])]
+
+
+def build_attendance_matrix(
+    employees: Sequence[Tuple],
+    arrays: Sequence[Optional[Sequence[int]]],
+    start_date: date,
+    end_date: date,
+    calendar: WorkCalendar = work_calendar,
+    holidays: Sequence[date] = (),
+) -> AttendanceMatrix:
+    """
+    Scatters the arrays returned by db.get_attendance_matrix_data into an AttendanceMatrix.
+
+    Args:
+        employees (Sequence[Tuple]): (employee_id, name, team_id) rows ordered by employee_id
+        arrays: Parallel employee_id, day offset and status code arrays (None when there are no records)
+        start_date (date): First date of the range
+        end_date (date): Last date of the range (inclusive)
+        calendar (WorkCalendar): Working-day calendar
+        holidays (Sequence[date]): Extra non-working dates for this analysis
+    """
+    employee_ids = np.array([row[0] for row in employees], dtype=np.int64)
+    team_ids = [row[2] for row in employees]
+    n_days = (end_date - start_date).days + 1
+    status = np.zeros((len(employee_ids), n_days), dtype=np.int8)
+
+    record_employees, offsets, codes = (np.asarray(array if array is not None else [], dtype=np.int64) for array in arrays)
+    if len(record_employees) and len(employee_ids):
+        rows = np.searchsorted(employee_ids, record_employees)
+        rows = np.minimum(rows, len(employee_ids) - 1)
+        known = employee_ids[rows] == record_employees
+        status[rows[known], offsets[known]] = codes[known]
+
+    if holidays:
+        calendar = WorkCalendar(calendar.weekdays, set(calendar.holidays) | set(holidays), calendar.team_weekdays)
+    working = calendar.working_mask(start_date, end_date, team_ids)
+    return AttendanceMatrix(employee_ids, [row[1] for row in employees], team_ids, start_date, status, working)
+
+
+def _runs(hit: np.ndarray, counted: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Longest and current run of consecutive counted days on which ``hit`` holds, per row.
+
+    Days outside ``counted`` (non-working days, leave) neither extend nor break a run.
+    """
+    n_rows, n_days = hit.shape
+    if n_days == 0:
+        zeros = np.zeros(n_rows, dtype=np.int64)
+        return zeros, zeros
+    index = np.arange(n_days)
+    hits = np.cumsum(hit & counted, axis=1)
+    breaks = counted & ~hit
+    last_break = np.maximum.accumulate(np.where(breaks, index, -1), axis=1)
+    hits_at_break = np.where(last_break >= 0, np.take_along_axis(hits, np.maximum(last_break, 0), axis=1), 0)
+    run = hits - hits_at_break
+    return run.max(axis=1), run[:, -1]
+
+
+def _rate(numerator: np.ndarray, denominator: np.ndarray) -> List[Optional[float]]:
+    """Percentages rounded to two decimals, None where the denominator is zero."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.round(numerator * 100.0 / denominator, 2)
+    return [None if count == 0 else rate for rate, count in zip(rates.tolist(), denominator.tolist())]
+
+
+def compute_attendance_analytics(matrix: AttendanceMatrix, window: int = 7, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Computes attendance rates, streaks, gaps and rolling averages from an AttendanceMatrix.
+
+    Expected days are working days not taken as leave; Present and WFH count as attended.
+    Rolling rates are computed over the last ``window`` calendar days with cumulative sums,
+    so every metric is a handful of whole-matrix operations regardless of the number of employees.
+
+    Args:
+        matrix (AttendanceMatrix): Attendance to analyse
+        window (int): Days in the rolling average and in each employee's recent rate
+        limit (int, optional): Return only this many employees, lowest attendance rate first
+
+    Returns:
+        Dictionary matching models.AttendanceAnalytics
+    """
+    status, working = matrix.status, matrix.working
+    n_days = status.shape[1]
+    window = max(1, min(window, n_days or 1))
+
+    expected = working & (status != LEAVE)
+    attended = expected & ((status == PRESENT) | (status == WFH))
+    absent = expected & (status == ABSENT)
+    missing = expected & (status == NO_RECORD)
+
+    expected_days = expected.sum(axis=1)
+    attended_days = attended.sum(axis=1)
+    longest_absence, _ = _runs(absent | missing, expected)
+    _, current_presence = _runs(attended, expected)
+    recent_rate = _rate(attended[:, n_days - window:].sum(axis=1), expected[:, n_days - window:].sum(axis=1))
+
+    # Daily totals and their rolling average over the last `window` days
+    daily_expected = expected.sum(axis=0)
+    daily_attended = attended.sum(axis=0)
+    cumulative_expected = np.concatenate(([0], np.cumsum(daily_expected)))
+    cumulative_attended = np.concatenate(([0], np.cumsum(daily_attended)))
+    starts = np.maximum(np.arange(1, n_days + 1) - window, 0)
+    rolling_rate = _rate(
+        cumulative_attended[1:] - cumulative_attended[starts],
+        cumulative_expected[1:] - cumulative_expected[starts],
+    )
+
+    employees = [
+        {
+            'employee_id': employee_id,
+            'name': name,
+            'team_id': team_id,
+            'working_days': working_days,
+            'expected_days': expected_count,
+            'attended': attended_count,
+            'absent': absent_count,
+            'leave': leave_count,
+            'wfh': wfh_count,
+            'missing': missing_count,
+            'attendance_rate': rate,
+            'recent_rate': recent,
+            'longest_absence_streak': longest,
+            'current_presence_streak': current,
+        }
+        for (employee_id, name, team_id, working_days, expected_count, attended_count, absent_count,
+             leave_count, wfh_count, missing_count, rate, recent, longest, current) in zip(
+            matrix.employee_ids.tolist(),
+            matrix.names,
+            matrix.team_ids,
+            working.sum(axis=1).tolist(),
+            expected_days.tolist(),
+            attended_days.tolist(),
+            absent.sum(axis=1).tolist(),
+            (working & (status == LEAVE)).sum(axis=1).tolist(),
+            (expected & (status == WFH)).sum(axis=1).tolist(),
+            missing.sum(axis=1).tolist(),
+            _rate(attended_days, expected_days),
+            recent_rate,
+            longest_absence.tolist(),
+            current_presence.tolist(),
+        )
+    ]
+    employees.sort(key=lambda employee: (employee['attendance_rate'] is None, employee['attendance_rate'] or 0.0, employee['employee_id']))
+    if limit is not None:
+        employees = employees[:limit]
+
+    total_expected = int(expected_days.sum())
+    total_attended = int(attended_days.sum())
+    return {
+        'start_date': matrix.start_date,
+        'end_date': matrix.start_date + timedelta(days=n_days - 1),
+        'window': window,
+        'employee_count': len(matrix.employee_ids),
+        'expected_days': total_expected,
+        'attended_days': total_attended,
+        'missing_records': int(missing.sum()),
+        'attendance_rate': round(total_attended * 100.0 / total_expected, 2) if total_expected else None,
+        'daily': [
+            {'date': day, 'expected': day_expected, 'attended': day_attended, 'rate': rate, 'rolling_rate': rolling}
+            for day, day_expected, day_attended, rate, rolling in zip(
+                matrix.dates,
+                daily_expected.tolist(),
+                daily_attended.tolist(),
+                _rate(daily_attended, daily_expected),
+                rolling_rate,
+            )
+        ],
+        'employees': employees,
+    }
+
+
+def get_attendance_analytics(
+    start_date: str,
+    end_date: str,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    window: int = 7,
+    limit: int = 10,
+) -> Dict[str, Any]:
+    """
+    Computes working-day attendance analytics for a date range.
+
+    Returns the overall attendance rate and missing-record count, and the `limit` employees
+    with the lowest attendance rate, each with expected/attended/absent/leave/WFH/missing day
+    counts, their rate over the last `window` days and absence/presence streaks.
+
+    Args:
+        start_date (str): First date in YYYY-MM-DD format
+        end_date (str): Last date in YYYY-MM-DD format (inclusive)
+        team_id (int, optional): Only employees of this team
+        employee_id (int, optional): Only this employee
+        window (int): Days in the recent attendance rate
+        limit (int): Number of employees to return
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    if end < start:
+        return {'error': 'end_date must not be before start_date'}
+    data = get_attendance_matrix_data(start, end, team_id, employee_id)
+    if data is None:
+        return {'error': 'Failed to load attendance data'}
+    employees, arrays = data
+    analytics = compute_attendance_analytics(build_attendance_matrix(employees, arrays, start, end), window, limit)
+    # The per-day series is only useful to the agent for short ranges
+    if len(analytics['daily']) > 31:
+        analytics.pop('daily')
+    return analytics
@@ -0,0 +1,605 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from .db import (
+    db_name,
+    db_user,
+    db_password,
+    db_host,
+    db_port,
+    build_attendance_trends_query,
+    map_attendance_trends,
+    build_attendance_page_query,
+    map_attendance_page,
+    build_attendance_export_query,
+    BULK_ATTENDANCE_COLUMNS,
+    BULK_ATTENDANCE_STAGING_SQL,
+    BULK_ATTENDANCE_UNKNOWN_EMPLOYEES_SQL,
+    BULK_ATTENDANCE_UPSERT_SQL,
+    ATTENDANCE_PARTITIONING,
+    ENSURE_STAGED_PARTITIONS_SQL,
+    build_attendance_gaps_query,
+    filter_team_working_days,
+    build_attendance_matrix_queries,
+    map_bulk_attendance_result,
+    ATTENDANCE_SUMMARY_SOURCE,
+    build_attendance_summary_query,
+    map_attendance_summary,
+    ATTENDANCE_TEAM_SQL,
+    UPDATE_ATTENDANCE_RECORD_SQL,
+    updated_attendance_event,
+)
+from .models import User
+from .prepared import to_numbered_placeholders
+from .rows import record_to_row, records_to_rows
+from .cache import trends_cache
+from .invalidation import (
+    NOTIFY_ENABLED,
+    NOTIFY_CHANNEL,
+    InvalidationListener,
+    apply_event,
+    encode_event,
+    team_event,
+    employee_event,
+    attendance_event,
+)
+
+# Async counterparts of the db.py functions used by the routers. Queries run on an asyncpg
+# pool so awaiting them never blocks the event loop; db.py stays the synchronous API for the
+# LlamaIndex tools and command-line use.
+
+# Errors that the functions below log and turn into None / [] / False, like db.py does with psycopg2.Error
+DB_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError)
+
+pool_min_size = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+pool_max_size = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+pool_max_idle = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# asyncpg prepares every query it runs and keeps the statements in a per-connection LRU;
+# DB_PREPARED_STATEMENTS=false disables that cache so each query is planned again
+statement_cache_size = 100 if os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true" else 0
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+async def get_pool() -> asyncpg.Pool:
+    """Returns the process-wide asyncpg pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    database=db_name,
+                    user=db_user,
+                    password=db_password,
+                    host=db_host,
+                    port=int(db_port) if db_port else None,
+                    min_size=pool_min_size,
+                    max_size=pool_max_size,
+                    max_inactive_connection_lifetime=pool_max_idle,
+                    statement_cache_size=statement_cache_size,
+                )
+    return _pool
+
+async def close_pool() -> None:
+    """Closes the asyncpg pool, if it was created."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+@asynccontextmanager
+async def get_connection() -> AsyncIterator[asyncpg.Connection]:
+    """Acquires a pooled connection for use in an async with-block."""
+    pool = await get_pool()
+    async with pool.acquire(timeout=pool_timeout) as conn:
+        yield conn
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Returns size statistics for the asyncpg pool."""
+    if _pool is None:
+        return {"min_size": pool_min_size, "max_size": pool_max_size, "size": 0, "idle": 0, "in_use": 0, "saturation": 0.0}
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    return {
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "saturation": round((size - idle) / _pool.get_max_size(), 3),
+    }
+
+async def publish_invalidation(conn: asyncpg.Connection, event: Dict[str, Any]) -> None:
+    """Async counterpart of db.publish_invalidation; call it inside the write's transaction."""
+    if NOTIFY_ENABLED:
+        await conn.execute("SELECT pg_notify($1, $2);", NOTIFY_CHANNEL, encode_event(event))
+
+# Listens on a dedicated connection for invalidation events published by other workers
+invalidation_listener = InvalidationListener(
+    connect=lambda: asyncpg.connect(
+        database=db_name,
+        user=db_user,
+        password=db_password,
+        host=db_host,
+        port=int(db_port) if db_port else None,
+    )
+)
+
+async def create_team(team_name: str) -> Optional[int]:
+    """Creates a new team in the teams table."""
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction():
+                team_id = await conn.fetchval("INSERT INTO teams (team_name) VALUES ($1) RETURNING team_id;", team_name)
+                event = team_event(team_id, "created")
+                await publish_invalidation(conn, event)
+            logging.info(f"Team created with team_id: {team_id}")
+            apply_event(event)
+            return team_id
+    except DB_ERRORS as e:
+        logging.error(f"Error creating team: {e}")
+        return None
+
+async def get_team(team_id: int) -> Optional[Dict[str, Any]]:
+    """Retrieves a team from the teams table by team_id."""
+    try:
+        async with get_connection() as conn:
+            team = await conn.fetchrow("SELECT team_id, team_name, created_at, updated_at FROM teams WHERE team_id = $1;", team_id)
+            if team:
+                logging.info(f"Team retrieved with team_id: {team_id}")
+                return record_to_row(team)
+            else:
+                logging.info(f"Team with team_id: {team_id} not found.")
+                return None
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving team: {e}")
+        return None
+
+async def update_team(team_id: int, team_name: str) -> bool:
+    """Updates a team's name in the teams table."""
+    try:
+        async with get_connection() as conn:
+            event = team_event(team_id, "updated")
+            async with conn.transaction():
+                await conn.execute("UPDATE teams SET team_name = $1 WHERE team_id = $2;", team_name, team_id)
+                await publish_invalidation(conn, event)
+            logging.info(f"Team with team_id: {team_id} updated.")
+            apply_event(event)
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error updating team: {e}")
+        return False
+
+async def delete_team(team_id: int) -> bool:
+    """Deletes a team from the teams table."""
+    try:
+        async with get_connection() as conn:
+            event = team_event(team_id, "deleted")
+            async with conn.transaction():
+                await conn.execute("DELETE FROM teams WHERE team_id = $1;", team_id)
+                await publish_invalidation(conn, event)
+            logging.info(f"Team with team_id: {team_id} deleted.")
+            apply_event(event)
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error deleting team: {e}")
+        return False
+
+async def get_all_teams() -> List[Dict[str, Any]]:
+    """Retrieves all teams from the teams table."""
+    try:
+        async with get_connection() as conn:
+            teams = await conn.fetch("SELECT team_id, team_name, created_at, updated_at FROM teams;")
+            return records_to_rows(teams)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving all teams: {e}")
+        return []
+
+async def create_employee(name: str, email: str, team_id: Optional[int], role: str, password_hash: str) -> Optional[int]:
+    """Creates a new employee in the employees table."""
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction():
+                employee_id = await conn.fetchval(
+                    "INSERT INTO employees (name, email, team_id, role, password_hash) VALUES ($1, $2, $3, $4, $5) RETURNING employee_id;",
+                    name, email, team_id, role, password_hash
+                )
+                event = employee_event(employee_id, "created")
+                await publish_invalidation(conn, event)
+            logging.info(f"Employee created with employee_id: {employee_id}")
+            apply_event(event)
+            return employee_id
+    except DB_ERRORS as e:
+        logging.error(f"Error creating employee: {e}")
+        return None
+
+async def get_employee(employee_id: int) -> Optional[Dict[str, Any]]:
+    """Retrieves an employee from the employees table by employee_id."""
+    try:
+        async with get_connection() as conn:
+            employee = await conn.fetchrow("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE employee_id = $1;", employee_id)
+            if employee:
+                logging.info(f"Employee retrieved with employee_id: {employee_id}")
+                return record_to_row(employee)
+            else:
+                logging.info(f"Employee with employee_id: {employee_id} not found.")
+                return None
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving employee: {e}")
+        return None
+
+async def get_employee_by_username(username: str) -> Optional[User]:
+    """Retrieves the login principal, including the password hash, by email address."""
+    try:
+        async with get_connection() as conn:
+            employee = await conn.fetchrow("SELECT employee_id, name, email, team_id, role, password_hash FROM employees WHERE email = $1;", username)
+            return User(**dict(employee)) if employee else None
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving employee: {e}")
+        return None
+
+async def update_employee(employee_id: int, name: str, email: str, team_id: Optional[int], role: str) -> bool:
+    """Updates an employee's details in the employees table."""
+    try:
+        async with get_connection() as conn:
+            event = employee_event(employee_id, "updated")
+            async with conn.transaction():
+                await conn.execute(
+                    "UPDATE employees SET name = $1, email = $2, team_id = $3, role = $4 WHERE employee_id = $5;",
+                    name, email, team_id, role, employee_id
+                )
+                await publish_invalidation(conn, event)
+            logging.info(f"Employee with employee_id: {employee_id} updated.")
+            apply_event(event)
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error updating employee: {e}")
+        return False
+
+async def delete_employee(employee_id: int) -> bool:
+    """Deletes an employee from the employees table."""
+    try:
+        async with get_connection() as conn:
+            event = employee_event(employee_id, "deleted")
+            async with conn.transaction():
+                await conn.execute("DELETE FROM employees WHERE employee_id = $1;", employee_id)
+                await publish_invalidation(conn, event)
+            logging.info(f"Employee with employee_id: {employee_id} deleted.")
+            apply_event(event)
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error deleting employee: {e}")
+        return False
+
+async def get_all_employees() -> List[Dict[str, Any]]:
+    """Retrieves all employees from the employees table."""
+    try:
+        async with get_connection() as conn:
+            employees = await conn.fetch("SELECT employee_id, name, email, team_id, role FROM employees;")
+            return records_to_rows(employees)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving all employees: {e}")
+        return []
+
+async def create_attendance_record(employee_id: int, attendance_date: date, status: str, check_in_time: Optional[time], check_out_time: Optional[time], notes: Optional[str]) -> Optional[int]:
+    """Creates a new attendance record in the attendance_records table."""
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction():
+                record_id, team_id = await conn.fetchrow(
+                    f"INSERT INTO attendance_records (employee_id, attendance_date, status, check_in_time, check_out_time, notes) VALUES ($1, $2, $3, $4, $5, $6) RETURNING record_id, {ATTENDANCE_TEAM_SQL};",
+                    employee_id, attendance_date, status, check_in_time, check_out_time, notes
+                )
+                event = attendance_event([attendance_date], [employee_id], [team_id])
+                await publish_invalidation(conn, event)
+            logging.info(f"Attendance record created with record_id: {record_id}")
+            apply_event(event)
+            return record_id
+    except DB_ERRORS as e:
+        logging.error(f"Error creating attendance record: {e}")
+        return None
+
+async def get_attendance_record(record_id: int) -> Optional[Dict[str, Any]]:
+    """Retrieves an attendance record from the attendance_records table by record_id."""
+    try:
+        async with get_connection() as conn:
+            record = await conn.fetchrow("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE record_id = $1;", record_id)
+            if record:
+                logging.info(f"Attendance record retrieved with record_id: {record_id}")
+                return record_to_row(record)
+            else:
+                logging.info(f"Attendance record with record_id: {record_id} not found.")
+                return None
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance record: {e}")
+        return None
+
+async def update_attendance_record(record_id: int, employee_id: int, attendance_date: date, status: str, check_in_time: Optional[time], check_out_time: Optional[time], notes: Optional[str]) -> bool:
+    """Updates an attendance record's details in the attendance_records table."""
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction():
+                previous = await conn.fetchrow(
+                    to_numbered_placeholders(UPDATE_ATTENDANCE_RECORD_SQL),
+                    employee_id, attendance_date, status, check_in_time, check_out_time, notes, record_id
+                )
+                event = updated_attendance_event(previous, employee_id, attendance_date) if previous else None
+                if event:
+                    await publish_invalidation(conn, event)
+            logging.info(f"Attendance record with record_id: {record_id} updated.")
+            if event:
+                apply_event(event)
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error updating attendance record: {e}")
+        return False
+
+async def delete_attendance_record(record_id: int) -> bool:
+    """Deletes an attendance record from the attendance_records table."""
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction():
+                deleted = await conn.fetchrow(f"DELETE FROM attendance_records WHERE record_id = $1 RETURNING attendance_date, employee_id, {ATTENDANCE_TEAM_SQL};", record_id)
+                event = attendance_event([deleted[0]], [deleted[1]], [deleted[2]]) if deleted else None
+                if event:
+                    await publish_invalidation(conn, event)
+            logging.info(f"Attendance record with record_id: {record_id} deleted.")
+            if event:
+                apply_event(event)
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error deleting attendance record: {e}")
+        return False
+
+async def get_all_attendance_records() -> List[Dict[str, Any]]:
+    """Retrieves all attendance records from the attendance_records table."""
+    try:
+        async with get_connection() as conn:
+            records = await conn.fetch("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes FROM attendance_records;")
+            return records_to_rows(records)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving all attendance records: {e}")
+        return []
+
+async def get_attendance_page(
+    limit: int = 50,
+    cursor: Optional[Tuple[date, int]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+    include_total: bool = False,
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """Async counterpart of db.get_attendance_page; see there for the arguments."""
+    query, params, count_query, count_params = build_attendance_page_query(
+        limit, cursor, start_date, end_date, team_id, employee_id, status, descending
+    )
+    try:
+        async with get_connection() as conn:
+            records = await conn.fetch(to_numbered_placeholders(query), *params)
+            total_count = None
+            if include_total:
+                total_count = await conn.fetchval(to_numbered_placeholders(count_query), *count_params)
+            return map_attendance_page(records, limit, total_count)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance page: {e}")
+        return {'items': [], 'next_cursor': None, 'total_count': None}
+
+async def stream_attendance_records(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+    batch_size: int = 2000,
+) -> AsyncIterator[List[asyncpg.Record]]:
+    """
+    Async counterpart of db.stream_attendance_records.
+
+    Rows are read through an asyncpg server-side cursor inside a read-only transaction and
+    yielded in batches; the connection goes back to the pool as soon as the consumer stops
+    iterating, including when a streaming client disconnects.
+    """
+    query, params = build_attendance_export_query(start_date, end_date, team_id, employee_id, status)
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(to_numbered_placeholders(query), *params)
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+    except DB_ERRORS as e:
+        logging.error(f"Error streaming attendance records: {e}")
+        raise
+
+async def bulk_upsert_attendance_records(records: List[Tuple]) -> Optional[Dict[str, Any]]:
+    """
+    Async counterpart of db.bulk_upsert_attendance_records.
+
+    Rows are sent with the binary COPY protocol (copy_records_to_table), so they must carry
+    native date/time values rather than strings.
+    """
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction():
+                await conn.execute(BULK_ATTENDANCE_STAGING_SQL)
+                await conn.copy_records_to_table(
+                    'attendance_staging', records=records, columns=BULK_ATTENDANCE_COLUMNS
+                )
+                if ATTENDANCE_PARTITIONING != "none":
+                    await conn.execute(to_numbered_placeholders(ENSURE_STAGED_PARTITIONS_SQL), ATTENDANCE_PARTITIONING)
+                unknown_employees = await conn.fetch(BULK_ATTENDANCE_UNKNOWN_EMPLOYEES_SQL)
+                upserted = await conn.fetch(BULK_ATTENDANCE_UPSERT_SQL)
+                event = attendance_event({record[2] for record in records}, {record[1] for record in records})
+                await publish_invalidation(conn, event)
+            result = map_bulk_attendance_result(unknown_employees, upserted)
+            apply_event(event)
+            logging.info(f"Bulk attendance import: {result['inserted']} inserted, {result['updated']} updated.")
+            return result
+    except DB_ERRORS as e:
+        logging.error(f"Error bulk loading attendance records: {e}")
+        return None
+
+async def get_attendance_summary_counts(today: Optional[date] = None, precomputed: Optional[bool] = None) -> Optional[Dict[str, Dict[str, int]]]:
+    """Async counterpart of db.get_attendance_summary_counts."""
+    today = today or datetime.now().date()
+    if precomputed is None:
+        precomputed = ATTENDANCE_SUMMARY_SOURCE == "precomputed"
+    query, params = build_attendance_summary_query(
+        today - timedelta(days=1), today - timedelta(days=7), today, precomputed
+    )
+    try:
+        async with get_connection() as conn:
+            return map_attendance_summary(await conn.fetchrow(to_numbered_placeholders(query), *params))
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance summary: {e}")
+        return None
+
+async def get_attendance_records_by_employee(employee_id: int) -> List[Dict[str, Any]]:
+    """Retrieves attendance records for a specific employee from the attendance_records table."""
+    try:
+        async with get_connection() as conn:
+            records = await conn.fetch("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE employee_id = $1;", employee_id)
+            return records_to_rows(records)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance records by employee: {e}")
+        return []
+
+async def get_attendance_records_by_team(team_id: int) -> List[Dict[str, Any]]:
+    """Retrieves attendance records for all employees in a specific team."""
+    try:
+        async with get_connection() as conn:
+            # Join employees and attendance_records tables to filter by team_id
+            records = await conn.fetch("""
+                SELECT ar.record_id, ar.employee_id, ar.attendance_date, ar.status, ar.check_in_time, ar.check_out_time, ar.notes, ar.created_at, ar.updated_at
+                FROM attendance_records ar
+                JOIN employees e ON ar.employee_id = e.employee_id
+                WHERE e.team_id = $1;
+            """, team_id)
+            return records_to_rows(records)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance records by team: {e}")
+        return []
+
+async def get_attendance_gaps(
+    start_date: date,
+    end_date: date,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    holidays: Optional[List[date]] = None,
+) -> List[Dict[str, Any]]:
+    """Async counterpart of db.get_attendance_gaps, taking parsed dates."""
+    query, params = build_attendance_gaps_query(start_date, end_date, team_id, employee_id, holidays=holidays)
+    try:
+        async with get_connection() as conn:
+            gaps = records_to_rows(await conn.fetch(to_numbered_placeholders(query), *params))
+            return filter_team_working_days(gaps, team_id)
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance gaps: {e}")
+        return []
+
+async def get_attendance_matrix_data(
+    start_date: date,
+    end_date: date,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> Optional[Tuple[List[Tuple], Tuple[Optional[List[int]], ...]]]:
+    """Async counterpart of db.get_attendance_matrix_data."""
+    (employees_query, employee_params), (records_query, records_params) = build_attendance_matrix_queries(
+        start_date, end_date, team_id, employee_id
+    )
+    try:
+        async with get_connection() as conn:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                employees = await conn.fetch(to_numbered_placeholders(employees_query), *employee_params)
+                arrays = await conn.fetchrow(to_numbered_placeholders(records_query), *records_params)
+            return [tuple(employee) for employee in employees], tuple(arrays)
+    except DB_ERRORS as e:
+        logging.error(f"Error loading attendance matrix: {e}")
+        return None
+
+async def get_attendance_trends(
+    start_date: str,
+    end_date: str,
+    group_by: str = "team",
+    employee_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Async counterpart of db.get_attendance_trends; see there for the arguments.
+
+    Results are served from trends_cache when the same normalised query was answered
+    recently and no attendance write has touched it since.
+    """
+    key = trends_cache.make_key(start_date, end_date, group_by, employee_id, team_id, status)
+    cached = trends_cache.get(key)
+    if cached is not None:
+        return cached
+    query, params = build_attendance_trends_query(start_date, end_date, group_by, employee_id, team_id, status)
+    generation = trends_cache.generation
+    try:
+        async with get_connection() as conn:
+            results = await conn.fetch(to_numbered_placeholders(query), *params)
+            trends = map_attendance_trends(results, group_by)
+            trends_cache.put(key, trends, generation)
+            return trends
+    except DB_ERRORS as e:
+        logging.error(f"Error retrieving attendance trends: {e}")
+        return []
+
+async def save_chat_context(employee_id: int, conversation_id: str, context: Dict[str, Any]) -> bool:
+    """Stores the serialized agent context of a chat conversation, replacing the previous one."""
+    try:
+        async with get_connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO chat_sessions (employee_id, conversation_id, context, updated_at)
+                VALUES ($1, $2, $3::jsonb, CURRENT_TIMESTAMP)
+                ON CONFLICT (employee_id, conversation_id)
+                DO UPDATE SET context = EXCLUDED.context, updated_at = EXCLUDED.updated_at;
+                """,
+                employee_id, conversation_id, json.dumps(context),
+            )
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error saving chat context: {e}")
+        return False
+
+async def load_chat_context(employee_id: int, conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Retrieves the serialized agent context of a chat conversation, or None if there is none."""
+    try:
+        async with get_connection() as conn:
+            context = await conn.fetchval(
+                "SELECT context FROM chat_sessions WHERE employee_id = $1 AND conversation_id = $2;",
+                employee_id, conversation_id,
+            )
+            return json.loads(context) if context is not None else None
+    except DB_ERRORS as e:
+        logging.error(f"Error loading chat context: {e}")
+        return None
+
+async def delete_chat_context(employee_id: int, conversation_id: str) -> bool:
+    """Deletes the stored agent context of a chat conversation."""
+    try:
+        async with get_connection() as conn:
+            await conn.execute(
+                "DELETE FROM chat_sessions WHERE employee_id = $1 AND conversation_id = $2;",
+                employee_id, conversation_id,
+            )
+            return True
+    except DB_ERRORS as e:
+        logging.error(f"Error deleting chat context: {e}")
+        return False
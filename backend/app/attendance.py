@@ -1,27 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Union, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from tenacity import retry, stop_after_attempt, retry_if_exception, wait_incrementing, before_sleep_log, after_log
-from .db import (
+from .async_db import (
+    DB_ERRORS,
     create_attendance_record,
     get_attendance_record,
     update_attendance_record,
     delete_attendance_record,
-    get_all_attendance_records,
+    get_attendance_page,
+    stream_attendance_records,
     get_attendance_records_by_employee,
     get_attendance_records_by_team,
     get_attendance_trends,
+    bulk_upsert_attendance_records,
+    get_attendance_summary_counts,
+    get_attendance_gaps,
+    get_attendance_matrix_data,
 )
-from .models import AttendanceRecord, Employee, AttendanceRecordCRUD, AttendanceSummary, TrendResult
+from .models import AttendanceRecord, AttendancePage, AttendanceGap, AttendanceAnalytics, BulkAttendanceResult, Employee, AttendanceRecordCRUD, AttendanceSummary, TrendResult
 from .auth import get_current_active_user
-from .helper import is_db_error, summarize_attendance
+from .db import EXPORT_COLUMNS
+from .responses import list_response, page_response
+from .analytics import build_attendance_matrix, compute_attendance_analytics
+from .helper import is_db_error, summarize_attendance, encode_cursor, decode_cursor, rows_to_ndjson, rows_to_csv, parse_attendance_rows
+import asyncio
 import logging
+import os
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Upper bound on rows accepted by one POST /attendance/bulk request
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+
+# Longest date range accepted by GET /attendance/gaps
+GAPS_MAX_DAYS = 366
+
+# Longest date range accepted by GET /analytics/
+ANALYTICS_MAX_DAYS = 731
+
 # Attendance Records CRUD endpoints
 @router.post("/attendance/", response_model=AttendanceRecord)
 @retry(
@@ -43,7 +64,7 @@ async def create_attendance_endpoint(attendance_record: AttendanceRecordCRUD, cu
             raise HTTPException(status_code=400, detail="Missing required fields")
         if current_user.role != "ADMIN" and current_user.employee_id != employee_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
-        record_id = create_attendance_record(employee_id, attendance_date, status, check_in_time, check_out_time, notes)
+        record_id = await create_attendance_record(employee_id, attendance_date, status, check_in_time, check_out_time, notes)
         if not record_id:
             raise HTTPException(status_code=500, detail="Failed to create attendance record")
         return AttendanceRecord(
@@ -58,6 +79,153 @@ async def create_attendance_endpoint(attendance_record: AttendanceRecordCRUD, cu
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create attendance record: {e}")
 
+@router.post("/attendance/bulk", response_model=BulkAttendanceResult)
+@retry(
+    retry=retry_if_exception(is_db_error), 
+    stop=stop_after_attempt(3), 
+    wait=wait_incrementing(start=5, increment=5), 
+    before_sleep=before_sleep_log(logger, logging.INFO), 
+    after=after_log(logger, logging.INFO)
+)
+async def bulk_attendance_endpoint(
+    request: Request,
+    input_format: Optional[str] = Query(None, alias="format", description="Input format: 'csv' or 'ndjson'. Defaults to the Content-Type of the body"),
+    current_user: Employee = Depends(get_current_active_user)
+):
+    """
+    Create or update many attendance records from a CSV or JSON-lines body.
+
+    Valid rows are loaded with COPY into a staging table and upserted in one transaction:
+    an existing record for the same employee and date is updated. Rows that fail
+    validation or reference an unknown employee are skipped and reported by row number.
+    """
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    if input_format is None:
+        content_type = request.headers.get("content-type", "")
+        input_format = "csv" if "csv" in content_type else "ndjson"
+    if input_format not in ["csv", "ndjson"]:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    try:
+        body = (await request.body()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8 encoded")
+
+    rows, errors = parse_attendance_rows(body, input_format)
+    if len(rows) + len(errors) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows can be uploaded at once")
+    if not rows:
+        return BulkAttendanceResult(inserted=0, updated=0, errors=errors)
+
+    result = await bulk_upsert_attendance_records(rows)
+    if result is None:
+        raise HTTPException(status_code=500, detail="Failed to load attendance records")
+    result['errors'] = sorted(errors + result['errors'], key=lambda error: error['row'])
+    return BulkAttendanceResult(**result)
+
+@router.get("/attendance/export")
+async def export_attendance_endpoint(
+    output_format: str = Query("ndjson", alias="format", description="Output format: 'ndjson' or 'csv'"),
+    start_date: Optional[str] = Query(None, description="Earliest attendance date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="Latest attendance date in YYYY-MM-DD format"),
+    team_id: Optional[int] = Query(None, description="Filter by team of the employee"),
+    employee_id: Optional[int] = Query(None, description="Filter by specific employee ID"),
+    status: Optional[str] = Query(None, description="Filter by attendance status (Present, Absent, WFH, Leave)"),
+    current_user: Employee = Depends(get_current_active_user)
+):
+    """
+    Stream attendance records as NDJSON or CSV.
+
+    Rows are read from a server-side cursor and written to the client batch by batch, so
+    exports of any size (e.g. a full year for payroll) run in bounded memory. The first batch
+    is read before the response starts, so an unavailable database is reported as a 500
+    rather than as an empty file.
+    """
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    if output_format not in ["ndjson", "csv"]:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    try:
+        if start_date:
+            datetime.strptime(start_date, '%Y-%m-%d')
+        if end_date:
+            datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if status and status not in ["Present", "Absent", "WFH", "Leave"]:
+        raise HTTPException(status_code=400, detail="status must be 'Present', 'Absent', 'WFH', or 'Leave'")
+
+    batches = stream_attendance_records(start_date, end_date, team_id, employee_id, status)
+    try:
+        first = await anext(batches, None)
+    except DB_ERRORS:
+        raise HTTPException(status_code=500, detail="Failed to export attendance records")
+
+    async def body():
+        try:
+            if output_format == "csv":
+                yield rows_to_csv(first or [], EXPORT_COLUMNS)
+            elif first:
+                yield rows_to_ndjson(first, EXPORT_COLUMNS)
+            if first:
+                async for rows in batches:
+                    if output_format == "csv":
+                        yield rows_to_csv(rows, None)
+                    else:
+                        yield rows_to_ndjson(rows, EXPORT_COLUMNS)
+        finally:
+            await batches.aclose()
+
+    media_type = "text/csv" if output_format == "csv" else "application/x-ndjson"
+    filename = f"attendance.{'csv' if output_format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/attendance/gaps", response_model=List[AttendanceGap])
+@retry(
+    retry=retry_if_exception(is_db_error), 
+    stop=stop_after_attempt(3), 
+    wait=wait_incrementing(start=5, increment=5), 
+    before_sleep=before_sleep_log(logger, logging.INFO), 
+    after=after_log(logger, logging.INFO)
+)
+async def read_attendance_gaps_endpoint(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format (inclusive)"),
+    team_id: Optional[int] = Query(None, description="Filter by team of the employee"),
+    employee_id: Optional[int] = Query(None, description="Filter by specific employee ID"),
+    holidays: Optional[List[str]] = Query(None, description="Non-working dates in YYYY-MM-DD format; repeat for several"),
+    current_user: Employee = Depends(get_current_active_user)
+):
+    """
+    Get every working day in a date range on which an employee has no attendance record.
+
+    Returns one entry per missing (employee, date), ordered by date, computed in a single query.
+    """
+    try:
+        if current_user.role != "ADMIN":
+            raise HTTPException(status_code=403, detail="Unauthorized")
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+            skipped = [datetime.strptime(holiday, '%Y-%m-%d').date() for holiday in holidays or []]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if end < start:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        if (end - start).days >= GAPS_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range must not exceed {GAPS_MAX_DAYS} days")
+
+        gaps = await get_attendance_gaps(start, end, team_id=team_id, employee_id=employee_id, holidays=skipped)
+        return list_response(gaps, AttendanceGap)
+    except HTTPException as http_ex:
+        raise http_ex
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read attendance gaps: {e}")
+
 @router.get("/attendance/{record_id}", response_model=AttendanceRecord)
 @retry(
     retry=retry_if_exception(is_db_error), 
@@ -68,12 +236,12 @@ async def create_attendance_endpoint(attendance_record: AttendanceRecordCRUD, cu
 )
 async def read_attendance_endpoint(record_id: int, current_user: Employee = Depends(get_current_active_user)):
     try:
-        record = get_attendance_record(record_id)
+        record = await get_attendance_record(record_id)
         if not record:
             raise HTTPException(status_code=404, detail="Attendance record not found")
         if current_user.role != "ADMIN" and current_user.employee_id != record['employee_id']:
             raise HTTPException(status_code=403, detail="Unauthorized")
-        return AttendanceRecord(**record)
+        return record
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read attendance record: {e}")
 
@@ -97,10 +265,10 @@ async def update_attendance_endpoint(record_id: int, attendance_record: Attendan
         notes = attendance_record.notes
         if not employee_id or not attendance_date or not status:
             raise HTTPException(status_code=400, detail="Missing required fields")
-        if not update_attendance_record(record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes):
+        if not await update_attendance_record(record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes):
             raise HTTPException(status_code=500, detail="Failed to update attendance record")
-        record = get_attendance_record(record_id)
-        return AttendanceRecord(**record)
+        record = await get_attendance_record(record_id)
+        return record
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update attendance record: {e}")
 
@@ -116,13 +284,13 @@ async def delete_attendance_endpoint(record_id: int, current_user: Employee = De
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        if not delete_attendance_record(record_id):
+        if not await delete_attendance_record(record_id):
             raise HTTPException(status_code=500, detail="Failed to delete attendance record")
         return {"message": "Attendance record deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete attendance record: {e}")
 
-@router.get("/attendance/", response_model=List[AttendanceRecord])
+@router.get("/attendance/", response_model=AttendancePage)
 @retry(
     retry=retry_if_exception(is_db_error), 
     stop=stop_after_attempt(3), 
@@ -130,12 +298,61 @@ async def delete_attendance_endpoint(record_id: int, current_user: Employee = De
 before_sleep=    before_sleep_log(logger, logging.INFO), 
     after=after_log(logger, logging.INFO)
 )
-async def read_all_attendance_endpoint(current_user: Employee = Depends(get_current_active_user)):
+async def read_all_attendance_endpoint(
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    start_date: Optional[str] = Query(None, description="Earliest attendance date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="Latest attendance date in YYYY-MM-DD format"),
+    team_id: Optional[int] = Query(None, description="Filter by team of the employee"),
+    employee_id: Optional[int] = Query(None, description="Filter by specific employee ID"),
+    status: Optional[str] = Query(None, description="Filter by attendance status (Present, Absent, WFH, Leave)"),
+    include_total: bool = Query(False, description="Also return the number of records matching the filters"),
+    descending: bool = Query(False, description="Return the newest records first"),
+    current_user: Employee = Depends(get_current_active_user)
+):
+    """
+    Get attendance records one page at a time.
+
+    Records are ordered by (attendance_date, record_id) and paginated with keyset cursors:
+    pass the returned next_cursor to fetch the following page, with the same filters.
+    """
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        records = get_all_attendance_records()
-        return [AttendanceRecord(**record) for record in records]
+        try:
+            if start_date:
+                datetime.strptime(start_date, '%Y-%m-%d')
+            if end_date:
+                datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if status and status not in ["Present", "Absent", "WFH", "Leave"]:
+            raise HTTPException(status_code=400, detail="status must be 'Present', 'Absent', 'WFH', or 'Leave'")
+        try:
+            cursor_key = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        page = await get_attendance_page(
+            limit=limit,
+            cursor=cursor_key,
+            start_date=start_date,
+            end_date=end_date,
+            team_id=team_id,
+            employee_id=employee_id,
+            status=status,
+            include_total=include_total,
+            descending=descending,
+        )
+        return page_response(
+            page['items'],
+            AttendanceRecord,
+            next_cursor=encode_cursor(page['next_cursor']) if page['next_cursor'] else None,
+            total_count=page['total_count'],
+            page_model=AttendancePage,
+        )
+    except HTTPException as http_ex:
+        raise http_ex
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read attendance records: {e}")
 
@@ -149,7 +366,7 @@ async def _read_attendance_by_employee(employee_id: Union[int, str], current_use
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid employee_id format")
 
-    records = get_attendance_records_by_employee(employee_id)
+    records = await get_attendance_records_by_employee(employee_id)
     if not records:
         raise HTTPException(status_code=404, detail="Records not found")
     
@@ -159,7 +376,7 @@ async def _read_attendance_by_employee(employee_id: Union[int, str], current_use
     if current_user.role != "ADMIN":
         if current_user.employee_id != employee_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
-    return [AttendanceRecord(**record) for record in records]
+    return records
 
 @router.get("/attendance/employee/{employee_id}", response_model=List[AttendanceRecord])
 @retry(
@@ -172,7 +389,7 @@ before_sleep=    before_sleep_log(logger, logging.INFO),
 async def read_attendance_by_employee_endpoint(employee_id: Union[int, str], current_user: Employee = Depends(get_current_active_user)):
     try:
         records = await _read_attendance_by_employee(employee_id, current_user)
-        return records
+        return list_response(records, AttendanceRecord)
     except HTTPException as http_ex:
         raise http_ex
     except Exception as e:
@@ -190,8 +407,8 @@ async def read_attendance_by_team_endpoint(team_id: int, current_user: Employee
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        records = get_attendance_records_by_team(team_id)
-        return [AttendanceRecord(**record) for record in records]
+        records = await get_attendance_records_by_team(team_id)
+        return list_response(records, AttendanceRecord)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read attendance records: {e}")
 
@@ -209,26 +426,12 @@ async def summarize_attendance_logs(current_user: Employee = Depends(get_current
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
 
-        today = datetime.now().date()
-        yesterday = today - timedelta(days=1)
-        last_week_start = today - timedelta(days=7)
-
-        all_records = get_all_attendance_records()
-
-        # Filter records for yesterday
-        yesterday_records = [
-            record for record in all_records
-            if record["attendance_date"] == yesterday
-        ]
+        counts = await get_attendance_summary_counts()
+        if counts is None:
+            raise HTTPException(status_code=500, detail="Failed to retrieve attendance counts")
 
-        # Filter records for the last week
-        last_week_records = [
-            record for record in all_records
-            if last_week_start <= record["attendance_date"] <= today
-        ]
-
-        yesterday_summary = summarize_attendance(yesterday_records, "Yesterday")
-        last_week_summary = summarize_attendance(last_week_records, "Last Week")
+        yesterday_summary = summarize_attendance(counts['yesterday'], "Yesterday")
+        last_week_summary = summarize_attendance(counts['last_week'], "Last Week")
 
         return AttendanceSummary(
             yesterday_summary=yesterday_summary,
@@ -288,7 +491,7 @@ async def get_attendance_trends_endpoint(
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
             
-        trends = get_attendance_trends(
+        trends = await get_attendance_trends(
             start_date=start_date,
             end_date=end_date,
             group_by=group_by,
@@ -297,6 +500,64 @@ async def get_attendance_trends_endpoint(
             status=status,
         )
         
-        return trends
+        return list_response(trends, TrendResult)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve attendance trends: {e}")
+
+@router.get("/analytics/", response_model=AttendanceAnalytics)
+@retry(
+    retry=retry_if_exception(is_db_error), 
+    stop=stop_after_attempt(3), 
+    wait=wait_incrementing(start=5, increment=5), 
+    before_sleep=before_sleep_log(logger, logging.INFO), 
+    after=after_log(logger, logging.INFO)
+)
+async def get_attendance_analytics_endpoint(
+    start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
+    end_date: str = Query(..., description="End date in YYYY-MM-DD format (inclusive)"),
+    team_id: Optional[int] = Query(None, description="Filter by team of the employee"),
+    employee_id: Optional[int] = Query(None, description="Filter by specific employee ID"),
+    window: int = Query(7, ge=1, le=366, description="Days in the rolling average and each employee's recent rate"),
+    limit: Optional[int] = Query(None, ge=1, description="Return only this many employees, lowest attendance rate first"),
+    holidays: Optional[List[str]] = Query(None, description="Extra non-working dates in YYYY-MM-DD format; repeat for several"),
+    current_user: Employee = Depends(get_current_active_user)
+):
+    """
+    Get working-day attendance analytics within a date range.
+
+    Rates are measured against each employee's working days (team schedule minus holidays and
+    leave) rather than against existing records, so missing records count against attendance:
+    - Overall and per-employee attendance rates, with a recent rate over the last `window` days
+    - Absent, leave, WFH and missing-record counts per employee
+    - Longest absence streak and current presence streak per employee
+    - Daily attendance rate with its rolling average
+    """
+    try:
+        if current_user.role != "ADMIN":
+            raise HTTPException(status_code=403, detail="Unauthorized")
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+            skipped = [datetime.strptime(holiday, '%Y-%m-%d').date() for holiday in holidays or []]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if end < start:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        if (end - start).days >= ANALYTICS_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range must not exceed {ANALYTICS_MAX_DAYS} days")
+
+        data = await get_attendance_matrix_data(start, end, team_id=team_id, employee_id=employee_id)
+        if data is None:
+            raise HTTPException(status_code=500, detail="Failed to load attendance data")
+        employees, arrays = data
+
+        def compute():
+            matrix = build_attendance_matrix(employees, arrays, start, end, holidays=skipped)
+            return compute_attendance_analytics(matrix, window=window, limit=limit)
+
+        # Keep the NumPy work off the event loop
+        return await asyncio.to_thread(compute)
+    except HTTPException as http_ex:
+        raise http_ex
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to retrieve attendance trends: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to compute attendance analytics: {e}")
@@ -2,10 +2,24 @@ from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from .models import Employee
-from .helper import SECRET_KEY, ALGORITHM, get_employee_by_username
+from .helper import SECRET_KEY, ALGORITHM, TRUST_JWT_CLAIMS
+from .async_db import get_employee_by_username
+from .cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+def _principal_from_claims(payload: dict):
+    """Builds the principal from the claims /token signed into the JWT, or None if any are missing."""
+    if payload.get("employee_id") is None or payload.get("role") is None or "name" not in payload:
+        return None
+    return Employee(
+        employee_id=payload["employee_id"],
+        name=payload["name"],
+        email=payload["sub"],
+        team_id=payload.get("team_id"),
+        role=payload["role"],
+    )
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -14,9 +28,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise HTTPException(status_code=401, detail="Invalid credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    employee = get_employee_by_username(username=username)
+    if TRUST_JWT_CLAIMS:
+        employee = _principal_from_claims(payload)
+        if employee is not None:
+            return employee
+    employee = principal_cache.get(username)
+    if employee is not None:
+        return employee
+    generation = principal_cache.generation
+    employee = await get_employee_by_username(username=username)
     if employee is None:
         raise HTTPException(status_code=401, detail="Employee not found")
+    principal_cache.put(employee, generation)
     return employee
 
 async def get_current_active_user(current_user: Employee = Depends(get_current_user)):
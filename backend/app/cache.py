@@ -0,0 +1,338 @@
+import hashlib
+import hmac
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from cachetools import TTLCache
+
+
+class PrincipalCache:
+    """
+    TTL-bounded cache of authenticated principals, keyed by email (the JWT subject).
+
+    A secondary index from employee_id to email lets the db write functions evict an
+    employee without knowing the address it was cached under. Lookups read ``generation``
+    before querying the employee and pass it to put(), which drops the row if an
+    invalidation ran in between. A ttl of 0 disables caching.
+
+    Args:
+        maxsize (int): Maximum number of cached principals
+        ttl (float): Seconds a principal stays cached
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_email = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl, 0.001))
+        self._email_by_id: Dict[int, str] = {}
+        # Bumped by every invalidation, so a lookup that overlapped a write is not cached
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    @property
+    def generation(self) -> int:
+        """Invalidation counter to read before querying a principal that will be put()."""
+        return self._generation
+
+    def get(self, email: str) -> Optional[Any]:
+        """Returns the cached principal for an email, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            principal = self._by_email.get(email)
+            if principal is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return principal
+
+    def put(self, principal: Any, generation: int) -> None:
+        """Caches a principal under its email and employee_id, unless invalidated since ``generation``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._by_email[principal.email] = principal
+            self._email_by_id[principal.employee_id] = principal.email
+            # Drop index entries whose principal has expired or been pushed out
+            if len(self._email_by_id) > 2 * self.maxsize:
+                self._email_by_id = {
+                    employee_id: email for employee_id, email in self._email_by_id.items()
+                    if email in self._by_email
+                }
+
+    def invalidate(self, employee_id: Optional[int] = None, email: Optional[str] = None) -> None:
+        """Evicts a principal by employee_id and/or email."""
+        with self._lock:
+            self._generation += 1
+            if employee_id is not None:
+                cached_email = self._email_by_id.pop(employee_id, None)
+                if cached_email is not None and self._by_email.pop(cached_email, None) is not None:
+                    self._evictions += 1
+            if email is not None and self._by_email.pop(email, None) is not None:
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Evicts every cached principal."""
+        with self._lock:
+            self._generation += 1
+            self._evictions += len(self._by_email)
+            self._by_email.clear()
+            self._email_by_id.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._by_email),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# Cache of User principals resolved by auth.get_current_user
+principal_cache = PrincipalCache(
+    maxsize=int(os.getenv("AUTH_CACHE_MAXSIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60")),
+)
+
+
+class CredentialCache:
+    """
+    Short-lived cache of successfully verified (password, password hash) pairs.
+
+    Lets repeated logins skip bcrypt for ``ttl`` seconds. Entries are keyed by an HMAC
+    of the pair under a per-process random key, so plaintext passwords are never stored,
+    and a changed password hash never matches an old entry. Failed verifications are not
+    cached. A ttl of 0 disables caching.
+
+    Args:
+        maxsize (int): Maximum number of cached credentials
+        ttl (float): Seconds a verified credential stays cached
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl, 0.001))
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def _digest(self, plain_password: str, hashed_password: str) -> bytes:
+        message = hashed_password.encode() + b"\0" + plain_password.encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def contains(self, plain_password: str, hashed_password: str) -> bool:
+        """Returns True if the pair was verified within the last ``ttl`` seconds."""
+        if not self.enabled:
+            return False
+        digest = self._digest(plain_password, hashed_password)
+        with self._lock:
+            found = digest in self._entries
+            if found:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return found
+
+    def add(self, plain_password: str, hashed_password: str) -> None:
+        """Records a successful verification."""
+        if not self.enabled:
+            return
+        digest = self._digest(plain_password, hashed_password)
+        with self._lock:
+            self._entries[digest] = True
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns size and hit/miss counters."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+# Verified logins, used by helper.verify_password_async
+credential_cache = CredentialCache(
+    maxsize=int(os.getenv("LOGIN_CACHE_MAXSIZE", "1024")),
+    ttl=float(os.getenv("LOGIN_CACHE_TTL", "0")),
+)
+
+
+# Normalised (start_date, end_date, group_by, employee_id, team_id, status) of a trends query
+TrendsKey = Tuple[date, date, str, Optional[int], Optional[int], Optional[str]]
+
+
+class TrendsCache:
+    """
+    LRU cache with a TTL for GET /trends/ results, keyed by the normalised query parameters.
+
+    Attendance writes evict only the entries whose date range covers a changed date and
+    whose employee and team filters could include the changed records; team and employee
+    metadata changes evict by grouping. Queries read ``generation`` before running and pass
+    it to put(), which drops the result if any eviction ran in between. A ttl of 0 disables
+    caching.
+
+    Args:
+        maxsize (int): Maximum number of cached results
+        ttl (float): Seconds a result stays cached
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl, 0.001))
+        # Bumped by every eviction, so a query that overlapped a write is not cached
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    @property
+    def generation(self) -> int:
+        """Eviction counter to read before running a query whose result will be put()."""
+        return self._generation
+
+    @staticmethod
+    def make_key(
+        start_date: str,
+        end_date: str,
+        group_by: str = "team",
+        employee_id: Optional[int] = None,
+        team_id: Optional[int] = None,
+        status: Optional[str] = None,
+    ) -> TrendsKey:
+        """Normalises trends query parameters; falsy filters are ignored by the query, so they map to None."""
+        return (
+            date.fromisoformat(start_date),
+            date.fromisoformat(end_date),
+            group_by,
+            employee_id or None,
+            team_id or None,
+            status or None,
+        )
+
+    def get(self, key: TrendsKey) -> Optional[Any]:
+        """Returns the cached result for a key, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return result
+
+    def put(self, key: TrendsKey, result: Any, generation: int) -> None:
+        """Caches a result under its key, unless an eviction ran since ``generation``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = result
+
+    def _evict(self, predicate) -> None:
+        """Evicts every entry whose key matches the predicate. Lock must be held."""
+        self._generation += 1
+        for key in [key for key in list(self._entries.keys()) if predicate(key)]:
+            if self._entries.pop(key, None) is not None:
+                self._evictions += 1
+
+    def invalidate_attendance(
+        self,
+        dates: Iterable[date],
+        employee_ids: Optional[Iterable[int]] = None,
+        team_ids: Optional[Iterable[Optional[int]]] = None,
+    ) -> None:
+        """
+        Evicts results that may include attendance records changed on the given dates.
+
+        employee_ids and team_ids narrow the eviction to entries filtered on one of them
+        or not filtered at all; None means the affected employees or teams are unknown.
+        """
+        dates = set(dates)
+        if not dates:
+            return
+        first, last = min(dates), max(dates)
+        employee_ids = None if employee_ids is None else set(employee_ids)
+        team_ids = None if team_ids is None else set(team_ids)
+
+        def affected(key: TrendsKey) -> bool:
+            start_date, end_date, _, employee_id, team_id, _ = key
+            if end_date < first or start_date > last:
+                return False
+            if employee_id is not None and employee_ids is not None and employee_id not in employee_ids:
+                return False
+            if team_id is not None and team_ids is not None and team_id not in team_ids:
+                return False
+            return any(start_date <= changed <= end_date for changed in dates)
+
+        with self._lock:
+            self._evict(affected)
+
+    def invalidate_group(self, group_by: str) -> None:
+        """Evicts results grouped by 'team' or 'employee', e.g. after a rename."""
+        with self._lock:
+            self._evict(lambda key: key[2] == group_by)
+
+    def clear(self) -> None:
+        """Evicts every cached result."""
+        with self._lock:
+            self._generation += 1
+            self._evictions += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# Results of GET /trends/, invalidated by the attendance, team and employee write functions
+trends_cache = TrendsCache(
+    maxsize=int(os.getenv("TRENDS_CACHE_MAXSIZE", "256")),
+    ttl=float(os.getenv("TRENDS_CACHE_TTL", "60")),
+)
@@ -1,9 +1,24 @@
 from dotenv import load_dotenv
+import csv
+import io
 import logging
 import os
 import psycopg2
-from typing import Dict, Optional, List, Any, Union, Tuple, TypedDict, NoReturn
-from datetime import date, time, datetime
+from typing import Dict, Optional, List, Any, Union, Tuple, TypedDict, NoReturn, Iterator
+from datetime import date, time, datetime, timedelta
+from .pool import ConnectionPool
+from .prepared import PreparedConnection, StatementRegistry
+from .rows import fetch_row, fetch_rows, make_rows, row_class
+from .workdays import work_calendar
+from .invalidation import (
+    NOTIFY_ENABLED,
+    NOTIFY_CHANNEL,
+    apply_event,
+    encode_event,
+    team_event,
+    employee_event,
+    attendance_event,
+)
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,6 +33,97 @@ db_password = os.getenv("DB_PASSWORD")
 db_host = os.getenv("DB_HOST")
 db_port = os.getenv("DB_PORT")
 
+# Process-wide connection pool, sized through environment variables
+pool = ConnectionPool(
+    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    check_after=float(os.getenv("DB_POOL_CHECK_AFTER", "10")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    dbname=db_name,
+    user=db_user,
+    password=db_password,
+    host=db_host,
+    port=db_port,
+    connection_factory=PreparedConnection,
+)
+
+def get_connection():
+    """
+    Checks out a pooled connection for use in a with-block.
+
+    The connection is returned to the pool on exit and any uncommitted transaction is
+    rolled back, so write functions only need to call commit().
+    """
+    return pool.connection()
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Returns saturation and wait-time statistics for the connection pool."""
+    return pool.stats()
+
+# Server-side prepared statements for the hot single-row and per-employee queries; set
+# DB_PREPARED_STATEMENTS=false to send plain SQL instead and compare latencies in GET /stats/
+statements = StatementRegistry(enabled=os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true")
+
+GET_EMPLOYEE = statements.register(
+    "get_employee",
+    "SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE employee_id = %s;",
+)
+GET_EMPLOYEE_BY_USERNAME = statements.register(
+    "get_employee_by_username",
+    "SELECT employee_id, name, email, team_id, role, password_hash FROM employees WHERE email = %s;",
+)
+GET_ATTENDANCE_RECORD = statements.register(
+    "get_attendance_record",
+    "SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE record_id = %s;",
+)
+GET_ATTENDANCE_RECORDS_BY_EMPLOYEE = statements.register(
+    "get_attendance_records_by_employee",
+    "SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE employee_id = %s;",
+)
+
+def get_statement_stats() -> Dict[str, Any]:
+    """Returns per-statement latency for prepared and plain execution."""
+    return statements.stats()
+
+def publish_invalidation(cur, event: Dict[str, Any]) -> None:
+    """
+    Queues a NOTIFY carrying a cache invalidation event for the other workers.
+
+    Postgres delivers it only when the surrounding transaction commits; the caller applies
+    the event to its own caches with apply_event after committing.
+    """
+    if NOTIFY_ENABLED:
+        cur.execute("SELECT pg_notify(%s, %s);", (NOTIFY_CHANNEL, encode_event(event)))
+
+# Triggers of attendance_records, appended to SCHEMA_SQL after the functions they call. Kept
+# separate so partition_attendance_records can recreate them on the partitioned table.
+ATTENDANCE_TRIGGERS_SQL = """
+CREATE TRIGGER set_timestamp_attendance
+BEFORE UPDATE ON attendance_records
+FOR EACH ROW
+EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER attendance_daily_rollup_insert
+AFTER INSERT ON attendance_records
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_attendance_daily_rollup();
+
+CREATE TRIGGER attendance_daily_rollup_update
+AFTER UPDATE ON attendance_records
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_attendance_daily_rollup();
+
+CREATE TRIGGER attendance_daily_rollup_delete
+AFTER DELETE ON attendance_records
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_attendance_daily_rollup();
+"""
+
 SCHEMA_SQL = """
 DROP TYPE IF EXISTS attendance_status CASCADE;
 CREATE TYPE attendance_status AS ENUM (
@@ -40,7 +146,12 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+-- attendance_daily_summary was folded into attendance_daily_rollup; dropped for older databases
+DROP TABLE IF EXISTS attendance_daily_summary CASCADE;
+DROP FUNCTION IF EXISTS apply_attendance_daily_summary CASCADE;
+DROP TABLE IF EXISTS attendance_daily_rollup CASCADE;
 DROP TABLE IF EXISTS attendance_records CASCADE;
+DROP TABLE IF EXISTS chat_sessions CASCADE;
 DROP TABLE IF EXISTS employees CASCADE;
 DROP TABLE IF EXISTS teams CASCADE;
 
@@ -79,6 +190,21 @@ BEFORE UPDATE ON employees
 FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column();
 
+-- Serialized AI chat agent contexts, one per (user, conversation), written after every turn
+CREATE TABLE chat_sessions (
+    employee_id INTEGER NOT NULL,
+    conversation_id VARCHAR(64) NOT NULL,
+    context JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (employee_id, conversation_id),
+    CONSTRAINT fk_chat_employee
+        FOREIGN KEY(employee_id)
+        REFERENCES employees(employee_id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX idx_chat_sessions_updated_at ON chat_sessions (updated_at);
+
 CREATE TABLE attendance_records (
     record_id SERIAL PRIMARY KEY,
     employee_id INTEGER NOT NULL,
@@ -97,975 +223,1439 @@ CREATE TABLE attendance_records (
 );
 
 CREATE INDEX idx_attendance_employee_date ON attendance_records (employee_id, attendance_date);
-CREATE INDEX idx_attendance_date ON attendance_records (attendance_date);
-CREATE INDEX idx_attendance_status ON attendance_records (status);
+-- Also serves keyset pagination ordered by (attendance_date, record_id)
+CREATE INDEX idx_attendance_date_record ON attendance_records (attendance_date, record_id);
+-- Status filters always come with a date range, so status leads a composite index
+CREATE INDEX idx_attendance_status_date ON attendance_records (status, attendance_date);
 
-CREATE TRIGGER set_timestamp_attendance
-BEFORE UPDATE ON attendance_records
+-- Per-(date, team, employee, status) counts read by the stats, trends and precomputed summary
+-- queries. team_id is the employee's current team, denormalised so those queries never join
+-- attendance_records to employees; rows are dropped when their count reaches zero.
+CREATE TABLE attendance_daily_rollup (
+    attendance_date DATE NOT NULL,
+    team_id INTEGER NULL,
+    employee_id INTEGER NOT NULL,
+    status attendance_status NOT NULL,
+    record_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (employee_id, attendance_date, status)
+);
+
+CREATE INDEX idx_rollup_date ON attendance_daily_rollup (attendance_date) INCLUDE (team_id, employee_id, status, record_count);
+CREATE INDEX idx_rollup_team_date ON attendance_daily_rollup (team_id, attendance_date) INCLUDE (employee_id, status, record_count);
+
+DROP FUNCTION IF EXISTS apply_attendance_daily_rollup CASCADE;
+CREATE OR REPLACE FUNCTION apply_attendance_daily_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO attendance_daily_rollup AS r (attendance_date, team_id, employee_id, status, record_count)
+        SELECT o.attendance_date, e.team_id, o.employee_id, o.status, -COUNT(*)
+        FROM old_rows o JOIN employees e ON e.employee_id = o.employee_id
+        GROUP BY o.attendance_date, e.team_id, o.employee_id, o.status
+        ON CONFLICT (employee_id, attendance_date, status) DO UPDATE SET record_count = r.record_count + EXCLUDED.record_count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO attendance_daily_rollup AS r (attendance_date, team_id, employee_id, status, record_count)
+        SELECT n.attendance_date, e.team_id, n.employee_id, n.status, COUNT(*)
+        FROM new_rows n JOIN employees e ON e.employee_id = n.employee_id
+        GROUP BY n.attendance_date, e.team_id, n.employee_id, n.status
+        ON CONFLICT (employee_id, attendance_date, status) DO UPDATE SET record_count = r.record_count + EXCLUDED.record_count;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM attendance_daily_rollup r
+        USING old_rows o
+        WHERE r.employee_id = o.employee_id
+          AND r.attendance_date = o.attendance_date
+          AND r.status = o.status
+          AND r.record_count <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Moving an employee (including ON DELETE SET NULL from teams) moves their rollup rows too
+DROP FUNCTION IF EXISTS move_attendance_daily_rollup CASCADE;
+CREATE OR REPLACE FUNCTION move_attendance_daily_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE attendance_daily_rollup SET team_id = NEW.team_id WHERE employee_id = NEW.employee_id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER attendance_daily_rollup_team_change
+AFTER UPDATE OF team_id ON employees
 FOR EACH ROW
-EXECUTE FUNCTION update_updated_at_column();
-"""
+WHEN (OLD.team_id IS DISTINCT FROM NEW.team_id)
+EXECUTE FUNCTION move_attendance_daily_rollup();
+""" + ATTENDANCE_TRIGGERS_SQL
+
 
 def initialize_database() -> None:
-    """Connects to the PostgreSQL database and executes the schema creation SQL."""
-    conn = None
+    """
+    Connects to the PostgreSQL database and executes the schema creation SQL.
+
+    With ATTENDANCE_PARTITIONING set, attendance_records is then converted to its partitioned layout.
+    """
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
+        with get_connection() as conn:
+            # Create a cursor object
+            with conn.cursor() as cur:
+                # Execute the multi-statement SQL script
+                cur.execute(SCHEMA_SQL)
 
-        # Create a cursor object
-        with conn.cursor() as cur:
-            # Execute the multi-statement SQL script
-            cur.execute(SCHEMA_SQL)
+            # Commit the changes to the database
+            conn.commit()
+            logging.info("Database changes committed.")
 
-        # Commit the changes to the database
-        conn.commit()
-        logging.info("Database changes committed.")
+        if ATTENDANCE_PARTITIONING != "none":
+            partition_attendance_records(ATTENDANCE_PARTITIONING)
 
     except psycopg2.Error as e:
+        # The pool rolls back the transaction if any part of it failed
         logging.error(f"Error connecting to or interacting with PostgreSQL: {e}")
-        # Rollback changes if any part of the transaction failed
-        if conn:
-            conn.rollback()
-            logging.error("Transaction rolled back.")
+        logging.error("Transaction rolled back.")
     except Exception as e:
         logging.exception(f"An unexpected error occurred: {e}")
-    finally:
-        # Ensure the connection is closed even if errors occurred
-        if conn is not None:
-            conn.close()
-            logging.info("Database connection closed.")
+
+# Optional range partitioning of attendance_records by attendance_date: 'none', 'month' or 'year'
+ATTENDANCE_PARTITIONING = os.getenv("ATTENDANCE_PARTITIONING", "none").lower()
+# Partitions created ahead of the current one by partition maintenance
+ATTENDANCE_PARTITIONS_AHEAD = int(os.getenv("ATTENDANCE_PARTITIONS_AHEAD", "3"))
+
+# Converts the attendance_records heap created by SCHEMA_SQL into a table partitioned by range of
+# attendance_date, keeping record ids, the sequence and the rollup table. The heap is renamed
+# and its index names freed; rows are copied before the triggers are recreated, so the migrated
+# rows, already counted in the rollup, are not counted twice.
+PARTITION_ATTENDANCE_SQL = """
+LOCK TABLE attendance_records IN ACCESS EXCLUSIVE MODE;
+ALTER TABLE attendance_records RENAME TO attendance_records_heap;
+ALTER TABLE attendance_records_heap DROP CONSTRAINT attendance_records_pkey, DROP CONSTRAINT unique_employee_date;
+DROP INDEX IF EXISTS idx_attendance_employee_date, idx_attendance_date_record, idx_attendance_status, idx_attendance_status_date;
+
+CREATE TABLE attendance_records (
+    record_id INTEGER NOT NULL DEFAULT nextval('attendance_records_record_id_seq'),
+    employee_id INTEGER NOT NULL,
+    attendance_date DATE NOT NULL,
+    status attendance_status NOT NULL,
+    check_in_time TIME WITHOUT TIME ZONE NULL,
+    check_out_time TIME WITHOUT TIME ZONE NULL,
+    notes TEXT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Unique constraints of a partitioned table must include the partition key
+    CONSTRAINT attendance_records_pkey PRIMARY KEY (record_id, attendance_date),
+    CONSTRAINT fk_employee
+        FOREIGN KEY(employee_id)
+        REFERENCES employees(employee_id)
+        ON DELETE RESTRICT,
+    CONSTRAINT unique_employee_date UNIQUE (employee_id, attendance_date)
+) PARTITION BY RANGE (attendance_date);
+
+ALTER SEQUENCE attendance_records_record_id_seq OWNED BY attendance_records.record_id;
+
+-- Catches dates no partition covers yet; ensure_attendance_partitions moves them out
+CREATE TABLE attendance_records_default PARTITION OF attendance_records DEFAULT;
+
+-- unique_employee_date already serves per-employee lookups, so no separate employee index.
+-- Keyset pagination needs the ordered B-tree; range scans and aggregates over whole
+-- partitions use the BRIN index, which stays a few pages per partition as dates arrive in order.
+CREATE INDEX idx_attendance_date_record ON attendance_records (attendance_date, record_id);
+CREATE INDEX idx_attendance_date_brin ON attendance_records USING BRIN (attendance_date);
+CREATE INDEX idx_attendance_status_date ON attendance_records (status, attendance_date);
+
+-- Creates every missing partition between two dates. Rows already in the default partition
+-- for a new range are moved into it first (directly, so no attendance_records trigger fires
+-- and the rollups stay as they are), then the table is attached.
+CREATE OR REPLACE FUNCTION ensure_attendance_partitions(p_from DATE, p_to DATE, p_interval TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    step INTERVAL;
+    lower_bound DATE;
+    upper_bound DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    IF p_interval NOT IN ('month', 'year') THEN
+        RAISE EXCEPTION 'Unsupported attendance partition interval: %', p_interval;
+    END IF;
+    IF p_from IS NULL OR p_to IS NULL THEN
+        RETURN 0;
+    END IF;
+    -- Serialises concurrent callers (workers, bulk loads, the maintenance command)
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_attendance_partitions'));
+    step := CASE p_interval WHEN 'year' THEN INTERVAL '1 year' ELSE INTERVAL '1 month' END;
+    lower_bound := date_trunc(p_interval, p_from::timestamp)::date;
+    WHILE lower_bound <= p_to LOOP
+        upper_bound := (lower_bound + step)::date;
+        partition_name := 'attendance_records_' || to_char(lower_bound, CASE p_interval WHEN 'year' THEN 'YYYY' ELSE 'YYYY_MM' END);
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE attendance_records INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM attendance_records_default WHERE attendance_date >= %L AND attendance_date < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                lower_bound, upper_bound, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE attendance_records ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+            created := created + 1;
+        END IF;
+        lower_bound := upper_bound;
+    END LOOP;
+    RETURN created;
+END;
+$$ language 'plpgsql';
+"""
+
+ATTENDANCE_IS_PARTITIONED_SQL = "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'attendance_records'::regclass);"
+
+# Run inside a bulk load, before the upsert, so the staged dates never land in the default partition
+ENSURE_STAGED_PARTITIONS_SQL = "SELECT ensure_attendance_partitions(MIN(attendance_date), MAX(attendance_date), %s) FROM attendance_staging;"
+
+def attendance_partition_window(today: date, interval: str, ahead: int = ATTENDANCE_PARTITIONS_AHEAD) -> Tuple[date, date]:
+    """Returns the first day of the current partition and the first day of the last one to create ahead of it."""
+    if interval == "year":
+        return date(today.year, 1, 1), date(today.year + ahead, 1, 1)
+    months = today.month - 1 + ahead
+    return date(today.year, today.month, 1), date(today.year + months // 12, months % 12 + 1, 1)
+
+def _ensure_attendance_partitions(cur, interval: str, today: date) -> int:
+    """Creates the partitions for rows waiting in the default partition and for the upcoming window."""
+    created = 0
+    cur.execute("SELECT MIN(attendance_date), MAX(attendance_date) FROM attendance_records_default;")
+    first, last = cur.fetchone()
+    for start, end in ((first, last), attendance_partition_window(today, interval)):
+        cur.execute("SELECT ensure_attendance_partitions(%s, %s, %s);", (start, end, interval))
+        created += cur.fetchone()[0]
+    return created
+
+def partition_attendance_records(interval: str = ATTENDANCE_PARTITIONING, today: Optional[date] = None) -> bool:
+    """
+    Migrates attendance_records to a table range-partitioned by attendance_date.
+
+    Runs in one transaction holding an exclusive lock on attendance_records, so reads and
+    writes wait until the copy commits. Partitions are created for every month (or year) with
+    data plus ATTENDANCE_PARTITIONS_AHEAD upcoming ones. On a table that is already partitioned
+    this only creates the missing partitions.
+
+    Args:
+        interval (str): 'month' or 'year'
+        today (date, optional): Reference date for the upcoming partitions. Defaults to today.
+    """
+    if interval not in ("month", "year"):
+        logging.error(f"Invalid attendance partition interval '{interval}'. Use 'month' or 'year'.")
+        return False
+    today = today or date.today()
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(ATTENDANCE_IS_PARTITIONED_SQL)
+                if not cur.fetchone()[0]:
+                    cur.execute(PARTITION_ATTENDANCE_SQL)
+                    cur.execute("SELECT MIN(attendance_date), MAX(attendance_date) FROM attendance_records_heap;")
+                    first, last = cur.fetchone()
+                    cur.execute("SELECT ensure_attendance_partitions(%s, %s, %s);", (first, last, interval))
+                    columns = ", ".join(EXPORT_COLUMNS)
+                    cur.execute(f"INSERT INTO attendance_records ({columns}) SELECT {columns} FROM attendance_records_heap;")
+                    copied = cur.rowcount
+                    cur.execute("DROP TABLE attendance_records_heap;")
+                    cur.execute(ATTENDANCE_TRIGGERS_SQL)
+                    logging.info(f"Moved {copied} attendance records to the partitioned table.")
+                created = _ensure_attendance_partitions(cur, interval, today)
+                conn.commit()
+                logging.info(f"Attendance partitioning by {interval} ready; {created} new partitions.")
+                return True
+    except psycopg2.Error as e:
+        logging.error(f"Error partitioning attendance records: {e}")
+        return False
+
+def maintain_attendance_partitions(today: Optional[date] = None) -> Optional[int]:
+    """
+    Creates upcoming attendance partitions and drains the default partition.
+
+    Meant to run at startup and periodically (e.g. daily from cron). Does nothing unless
+    ATTENDANCE_PARTITIONING is set and attendance_records is partitioned.
+
+    Returns:
+        Number of partitions created, or None on error
+    """
+    if ATTENDANCE_PARTITIONING not in ("month", "year"):
+        return 0
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(ATTENDANCE_IS_PARTITIONED_SQL)
+                if not cur.fetchone()[0]:
+                    logging.warning("ATTENDANCE_PARTITIONING is set but attendance_records is not partitioned; run 'python -m app.db partition'.")
+                    return 0
+                created = _ensure_attendance_partitions(cur, ATTENDANCE_PARTITIONING, today or date.today())
+                conn.commit()
+                if created:
+                    logging.info(f"Created {created} attendance partitions.")
+                return created
+    except psycopg2.Error as e:
+        logging.error(f"Error maintaining attendance partitions: {e}")
+        return None
 
 def create_team(team_name: str) -> Optional[int]:
     """Creates a new team in the teams table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("INSERT INTO teams (team_name) VALUES (%s) RETURNING team_id;", (team_name,))
-            team_id = cur.fetchone()[0]
-            conn.commit()
-            logging.info(f"Team created with team_id: {team_id}")
-            return team_id
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO teams (team_name) VALUES (%s) RETURNING team_id;", (team_name,))
+                team_id = cur.fetchone()[0]
+                event = team_event(team_id, "created")
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Team created with team_id: {team_id}")
+                apply_event(event)
+                return team_id
     except psycopg2.Error as e:
         logging.error(f"Error creating team: {e}")
-        if conn:
-            conn.rollback()
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_team(team_id: int) -> Optional[Dict[str, Any]]:
     """Retrieves a team from the teams table by team_id."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT team_id, team_name, created_at, updated_at FROM teams WHERE team_id = %s;", (team_id,))
-            team = cur.fetchone()
-            if team:
-                logging.info(f"Team retrieved with team_id: {team_id}")
-                return {
-                    'team_id': team[0],
-                    'team_name': team[1],
-                    'created_at': team[2],
-                    'updated_at': team[3]
-                }
-            else:
-                logging.info(f"Team with team_id: {team_id} not found.")
-                return None
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT team_id, team_name, created_at, updated_at FROM teams WHERE team_id = %s;", (team_id,))
+                team = fetch_row(cur)
+                if team:
+                    logging.info(f"Team retrieved with team_id: {team_id}")
+                    return team
+                else:
+                    logging.info(f"Team with team_id: {team_id} not found.")
+                    return None
     except psycopg2.Error as e:
         logging.error(f"Error retrieving team: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_team_by_name(team_name: str) -> Optional[Dict[str, Any]]:
     """Retrieves a team from the teams table by team_name."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT team_id, team_name, created_at, updated_at FROM teams WHERE team_name = %s;", (team_name,))
-            team = cur.fetchone()
-            if team:
-                logging.info(f"Team retrieved with team_name: {team_name}")
-                return {
-                    'team_id': team[0],
-                    'team_name': team[1],
-                    'created_at': team[2],
-                    'updated_at': team[3]
-                }
-            else:
-                logging.info(f"Team with team_name: {team_name} not found.")
-                return None
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT team_id, team_name, created_at, updated_at FROM teams WHERE team_name = %s;", (team_name,))
+                team = fetch_row(cur)
+                if team:
+                    logging.info(f"Team retrieved with team_name: {team_name}")
+                    return team
+                else:
+                    logging.info(f"Team with team_name: {team_name} not found.")
+                    return None
     except psycopg2.Error as e:
         logging.error(f"Error retrieving team: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def update_team(team_id: int, team_name: str) -> bool:
     """Updates a team's name in the teams table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("UPDATE teams SET team_name = %s WHERE team_id = %s;", (team_name, team_id))
-            conn.commit()
-            logging.info(f"Team with team_id: {team_id} updated.")
-            return True
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE teams SET team_name = %s WHERE team_id = %s;", (team_name, team_id))
+                event = team_event(team_id, "updated")
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Team with team_id: {team_id} updated.")
+                apply_event(event)
+                return True
     except psycopg2.Error as e:
         logging.error(f"Error updating team: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def delete_team(team_id: int) -> bool:
     """Deletes a team from the teams table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM teams WHERE team_id = %s;", (team_id,))
-            conn.commit()
-            logging.info(f"Team with team_id: {team_id} deleted.")
-            return True
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM teams WHERE team_id = %s;", (team_id,))
+                event = team_event(team_id, "deleted")
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Team with team_id: {team_id} deleted.")
+                apply_event(event)
+                return True
     except psycopg2.Error as e:
         logging.error(f"Error deleting team: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def create_employee(name: str, email: str, team_id: Optional[int], role: str, password_hash: str) -> Optional[int]:
     """Creates a new employee in the employees table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO employees (name, email, team_id, role, password_hash) VALUES (%s, %s, %s, %s, %s) RETURNING employee_id;",
-                (name, email, team_id, role, password_hash)
-            )
-            employee_id = cur.fetchone()[0]
-            conn.commit()
-            logging.info(f"Employee created with employee_id: {employee_id}")
-            return employee_id
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO employees (name, email, team_id, role, password_hash) VALUES (%s, %s, %s, %s, %s) RETURNING employee_id;",
+                    (name, email, team_id, role, password_hash)
+                )
+                employee_id = cur.fetchone()[0]
+                event = employee_event(employee_id, "created")
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Employee created with employee_id: {employee_id}")
+                apply_event(event)
+                return employee_id
     except psycopg2.Error as e:
         logging.error(f"Error creating employee: {e}")
-        if conn:
-            conn.rollback()
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_employee(employee_id: int) -> Optional[Dict[str, Any]]:
     """Retrieves an employee from the employees table by employee_id."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE employee_id = %s;", (employee_id,))
-            employee = cur.fetchone()
-            if employee:
-                logging.info(f"Employee retrieved with employee_id: {employee_id}")
-                return {
-                    'employee_id': employee[0],
-                    'name': employee[1],
-                    'email': employee[2],
-                    'team_id': employee[3],
-                    'role': employee[4],
-                    'created_at': employee[5],
-                    'updated_at': employee[6]
-                }
-            else:
-                logging.info(f"Employee with employee_id: {employee_id} not found.")
-                return None
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                statements.execute(cur, GET_EMPLOYEE, (employee_id,))
+                employee = fetch_row(cur)
+                if employee:
+                    logging.info(f"Employee retrieved with employee_id: {employee_id}")
+                    return employee
+                else:
+                    logging.info(f"Employee with employee_id: {employee_id} not found.")
+                    return None
     except psycopg2.Error as e:
         logging.error(f"Error retrieving employee: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_employee_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Retrieves an employee by their email address."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE email = %s;", (email,))
-            employee = cur.fetchone()
-            if employee:
-                logging.info(f"Employee retrieved with email: {email}")
-                return {
-                    'employee_id': employee[0],
-                    'name': employee[1],
-                    'email': employee[2],
-                    'team_id': employee[3],
-                    'role': employee[4],
-                    'created_at': employee[5],
-                    'updated_at': employee[6]
-                }
-            else:
-                logging.info(f"Employee with email: {email} not found.")
-                return None
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE email = %s;", (email,))
+                employee = fetch_row(cur)
+                if employee:
+                    logging.info(f"Employee retrieved with email: {email}")
+                    return employee
+                else:
+                    logging.info(f"Employee with email: {email} not found.")
+                    return None
     except psycopg2.Error as e:
         logging.error(f"Error retrieving employee by email: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def search_employees(name: Optional[str] = None, email: Optional[str] = None, team_id: Optional[int] = None, role: Optional[str] = None) -> List[Dict[str, Any]]:
     """Searches for employees based on one or more criteria."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        query = "SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE 1=1"
-        params = []
-
-        if name:
-            query += " AND name ILIKE %s"
-            params.append(f"%{name}%")
-        if email:
-            query += " AND email ILIKE %s"
-            params.append(f"%{email}%")
-        if team_id:
-            query += " AND team_id = %s"
-            params.append(team_id)
-        if role:
-            query += " AND role = %s"
-            params.append(role)
-
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            employees = cur.fetchall()
-            return [{
-                'employee_id': employee[0],
-                'name': employee[1],
-                'email': employee[2],
-                'team_id': employee[3],
-                'role': employee[4],
-                'created_at': employee[5],
-                'updated_at': employee[6]
-            } for employee in employees]
+        with get_connection() as conn:
+            query = "SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE 1=1"
+            params = []
+
+            if name:
+                query += " AND name ILIKE %s"
+                params.append(f"%{name}%")
+            if email:
+                query += " AND email ILIKE %s"
+                params.append(f"%{email}%")
+            if team_id:
+                query += " AND team_id = %s"
+                params.append(team_id)
+            if role:
+                query += " AND role = %s"
+                params.append(role)
+
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error searching employees: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_employees_by_team(team_id: int) -> List[Dict[str, Any]]:
     """Retrieves all employees belonging to a specific team."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE team_id = %s;", (team_id,))
-            employees = cur.fetchall()
-            return [{
-                'employee_id': employee[0],
-                'name': employee[1],
-                'email': employee[2],
-                'team_id': employee[3],
-                'role': employee[4],
-                'created_at': employee[5],
-                'updated_at': employee[6]
-            } for employee in employees]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE team_id = %s;", (team_id,))
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving employees by team: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_employees_by_role(role: str) -> List[Dict[str, Any]]:
     """Retrieves all employees with a specific role."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE role = %s;", (role,))
-            employees = cur.fetchall()
-            return [{
-                'employee_id': employee[0],
-                'name': employee[1],
-                'email': employee[2],
-                'team_id': employee[3],
-                'role': employee[4],
-                'created_at': employee[5],
-                'updated_at': employee[6]
-            } for employee in employees]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees WHERE role = %s;", (role,))
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving employees by role: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def search_teams(team_name: Optional[str] = None) -> List[Dict[str, Any]]:
     """Searches for teams based on name."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        query = "SELECT team_id, team_name, created_at, updated_at FROM teams WHERE 1=1"
-        params = []
-
-        if team_name:
-            query += " AND team_name ILIKE %s"
-            params.append(f"%{team_name}%")
-
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            teams = cur.fetchall()
-            return [{
-                'team_id': team[0],
-                'team_name': team[1],
-                'created_at': team[2],
-                'updated_at': team[3]
-            } for team in teams]
+        with get_connection() as conn:
+            query = "SELECT team_id, team_name, created_at, updated_at FROM teams WHERE 1=1"
+            params = []
+
+            if team_name:
+                query += " AND team_name ILIKE %s"
+                params.append(f"%{team_name}%")
+
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error searching teams: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_attendance_by_date_range(start_date: str, end_date: str, employee_id: Optional[int] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
     """Retrieves attendance records within a date range with optional employee and status filters."""
-    conn = None
     # Convert string dates to date objects
     start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        query = "SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE attendance_date BETWEEN %s AND %s"
-        params = [start_date, end_date]
-
-        if employee_id:
-            query += " AND employee_id = %s"
-            params.append(employee_id)
-        if status:
-            query += " AND status = %s"
-            params.append(status)
-
-        query += " ORDER BY attendance_date"
-
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            records = cur.fetchall()
-            return [{
-                'record_id': record[0],
-                'employee_id': record[1],
-                'attendance_date': record[2],
-                'status': record[3],
-                'check_in_time': record[4],
-                'check_out_time': record[5],
-                'notes': record[6],
-                'created_at': record[7],
-                'updated_at': record[8]
-            } for record in records]
+        with get_connection() as conn:
+            query = "SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE attendance_date BETWEEN %s AND %s"
+            params = [start_date, end_date]
+
+            if employee_id:
+                query += " AND employee_id = %s"
+                params.append(employee_id)
+            if status:
+                query += " AND status = %s"
+                params.append(status)
+
+            query += " ORDER BY attendance_date"
+
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance by date range: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_employee_attendance_stats(employee_id: int, start_date: str, end_date: str) -> Dict[str, int]:
     """Retrieves attendance statistics for an employee within a date range."""
-    conn = None
     # Convert string dates to date objects
     start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 
-                    status,
-                    COUNT(status) as count
-                FROM attendance_records
-                WHERE employee_id = %s
-                AND attendance_date BETWEEN %s AND %s
-                GROUP BY status;
-            """, (employee_id, start_date, end_date))
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT 
+                        status,
+                        SUM(record_count) as count
+                    FROM attendance_daily_rollup
+                    WHERE employee_id = %s
+                    AND attendance_date BETWEEN %s AND %s
+                    GROUP BY status;
+                """, (employee_id, start_date, end_date))
             
-            stats = cur.fetchall()
-            return {row[0]: row[1] for row in stats}
+                stats = cur.fetchall()
+                return {row[0]: int(row[1]) for row in stats}
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance stats: {e}")
         return {}
-    finally:
-        if conn:
-            conn.close()
 
 def get_team_attendance_stats(team_id: int, start_date: str, end_date: str) -> Dict[str, int]:
     """Retrieves attendance statistics for an entire team within a date range."""
-    conn = None
     # Convert string dates to date objects
     start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 
-                    ar.status,
-                    COUNT(ar.status) as count
-                FROM attendance_records ar
-                JOIN employees e ON ar.employee_id = e.employee_id
-                WHERE e.team_id = %s
-                AND ar.attendance_date BETWEEN %s AND %s
-                GROUP BY ar.status;
-            """, (team_id, start_date, end_date))
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT 
+                        status,
+                        SUM(record_count) as count
+                    FROM attendance_daily_rollup
+                    WHERE team_id = %s
+                    AND attendance_date BETWEEN %s AND %s
+                    GROUP BY status;
+                """, (team_id, start_date, end_date))
             
-            stats = cur.fetchall()
-            return {row[0]: row[1] for row in stats}
+                stats = cur.fetchall()
+                return {row[0]: int(row[1]) for row in stats}
     except psycopg2.Error as e:
         logging.error(f"Error retrieving team attendance stats: {e}")
         return {}
-    finally:
-        if conn:
-            conn.close()
 
 def get_attendance_by_status(status: str, start_date: Optional[str] = None, end_date: Optional[str] = None, team_id: Optional[int] = None) -> List[Dict[str, Any]]:
     """Retrieves attendance records by status with optional date range and team filters."""
-    conn = None
     # Convert string dates to date objects if provided
     if start_date:
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     if end_date:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        
-        query = "SELECT ar.record_id, ar.employee_id, ar.attendance_date, ar.status, ar.check_in_time, ar.check_out_time, ar.notes, ar.created_at, ar.updated_at"
+        with get_connection() as conn:
+            query = "SELECT ar.record_id, ar.employee_id, ar.attendance_date, ar.status, ar.check_in_time, ar.check_out_time, ar.notes, ar.created_at, ar.updated_at"
         
-        if team_id:
-            query += " FROM attendance_records ar JOIN employees e ON ar.employee_id = e.employee_id WHERE ar.status = %s AND e.team_id = %s"
-            params = [status, team_id]
-        else:
-            query += " FROM attendance_records ar WHERE ar.status = %s"
-            params = [status]
+            if team_id:
+                query += " FROM attendance_records ar JOIN employees e ON ar.employee_id = e.employee_id WHERE ar.status = %s AND e.team_id = %s"
+                params = [status, team_id]
+            else:
+                query += " FROM attendance_records ar WHERE ar.status = %s"
+                params = [status]
             
-        if start_date and end_date:
-            query += " AND ar.attendance_date BETWEEN %s AND %s"
-            params.append(start_date)
-            params.append(end_date)
-        elif start_date:
-            query += " AND ar.attendance_date >= %s"
-            params.append(start_date)
-        elif end_date:
-            query += " AND ar.attendance_date <= %s"
-            params.append(end_date)
+            if start_date and end_date:
+                query += " AND ar.attendance_date BETWEEN %s AND %s"
+                params.append(start_date)
+                params.append(end_date)
+            elif start_date:
+                query += " AND ar.attendance_date >= %s"
+                params.append(start_date)
+            elif end_date:
+                query += " AND ar.attendance_date <= %s"
+                params.append(end_date)
             
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            records = cur.fetchall()
-            return [{
-                'record_id': record[0],
-                'employee_id': record[1],
-                'attendance_date': record[2],
-                'status': record[3],
-                'check_in_time': record[4],
-                'check_out_time': record[5],
-                'notes': record[6],
-                'created_at': record[7],
-                'updated_at': record[8]
-            } for record in records]
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance by status: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_employees_without_attendance(date: str, team_id: Optional[int] = None) -> List[Dict[str, Any]]:
     """Find employees who don't have an attendance record for a specific date."""
-    conn = None
     # Convert string date to date object
     date = datetime.strptime(date, '%Y-%m-%d').date()
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        
-        query = """
-            SELECT e.employee_id, e.name, e.email, e.team_id, e.role
-            FROM employees e
-            WHERE e.employee_id NOT IN (
-                SELECT ar.employee_id
-                FROM attendance_records ar
-                WHERE ar.attendance_date = %s
-            )
-        """
-        params = [date]
+        with get_connection() as conn:
+            # Anti-join probing unique_employee_date per employee; unlike NOT IN it cannot be
+            # emptied by a NULL and plans as a hash or nested-loop anti join
+            query = """
+                SELECT e.employee_id, e.name, e.email, e.team_id, e.role
+                FROM employees e
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM attendance_records ar
+                    WHERE ar.employee_id = e.employee_id
+                      AND ar.attendance_date = %s
+                )
+            """
+            params = [date]
         
-        if team_id:
-            query += " AND e.team_id = %s"
-            params.append(team_id)
+            if team_id:
+                query += " AND e.team_id = %s"
+                params.append(team_id)
             
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            employees = cur.fetchall()
-            return [{
-                'employee_id': employee[0],
-                'name': employee[1],
-                'email': employee[2],
-                'team_id': employee[3],
-                'role': employee[4]
-            } for employee in employees]
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving employees without attendance: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
+
+def gap_weekdays(team_id: Optional[int] = None) -> List[int]:
+    """Weekdays to generate for a gap query: the team's, or every weekday any team works."""
+    if team_id is not None:
+        return work_calendar.weekdays_for(team_id)
+    return sorted(set(work_calendar.weekdays).union(*work_calendar.team_weekdays.values()))
+
+def filter_team_working_days(gaps: List[Any], team_id: Optional[int] = None) -> List[Any]:
+    """Drops gaps on weekdays the employee's own team does not work (only needed across teams with schedules)."""
+    if team_id is not None or not work_calendar.team_weekdays:
+        return gaps
+    weekdays = {}
+    kept = []
+    for gap in gaps:
+        team_weekdays = weekdays.get(gap['team_id'])
+        if team_weekdays is None:
+            team_weekdays = weekdays[gap['team_id']] = set(work_calendar.weekdays_for(gap['team_id']))
+        if gap['attendance_date'].isoweekday() in team_weekdays:
+            kept.append(gap)
+    return kept
+
+def build_attendance_gaps_query(
+    start_date: date,
+    end_date: date,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    working_weekdays: Optional[List[int]] = None,
+    holidays: Optional[List[date]] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Builds a query returning every (employee, working day) pair without an attendance record.
+
+    Working days are generated server-side from the weekdays in ``working_weekdays`` (by
+    default those of the team's schedule in the working-day calendar) minus the calendar's
+    holidays and ``holidays``; each (employee, day) pair is checked with an anti-join on
+    unique_employee_date, so the whole range costs one round trip and one index probe per pair.
+
+    Returns:
+        Tuple of the query text (with %s placeholders) and its parameters
+    """
+    query = """
+        WITH working_days AS (
+            SELECT day::date AS attendance_date
+            FROM generate_series(%s::date::timestamp, %s::date::timestamp, INTERVAL '1 day') AS day
+            WHERE EXTRACT(ISODOW FROM day)::int = ANY(%s::int[])
+              AND NOT (day::date = ANY(%s::date[]))
+        )
+        SELECT e.employee_id, e.name, e.email, e.team_id, e.role, d.attendance_date
+        FROM working_days d
+        CROSS JOIN employees e
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM attendance_records ar
+            WHERE ar.employee_id = e.employee_id
+              AND ar.attendance_date = d.attendance_date
+        )
+    """
+    params: List[Any] = [
+        start_date,
+        end_date,
+        gap_weekdays(team_id) if working_weekdays is None else list(working_weekdays),
+        sorted(set(work_calendar.holidays) | set(holidays or [])),
+    ]
+    if team_id:
+        query += " AND e.team_id = %s"
+        params.append(team_id)
+    if employee_id:
+        query += " AND e.employee_id = %s"
+        params.append(employee_id)
+    query += " ORDER BY d.attendance_date, e.employee_id"
+    return query, params
+
+def get_attendance_gaps(
+    start_date: str,
+    end_date: str,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    holidays: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Find every working day in a date range on which an employee has no attendance record.
+
+    Args:
+        start_date (str): First date in YYYY-MM-DD format
+        end_date (str): Last date in YYYY-MM-DD format (inclusive)
+        team_id (int, optional): Only employees of this team
+        employee_id (int, optional): Only this employee
+        holidays (List[str], optional): Dates in YYYY-MM-DD format that are not working days
+
+    Returns:
+        One row per missing (employee, date), ordered by date then employee
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    skipped = [datetime.strptime(holiday, '%Y-%m-%d').date() for holiday in holidays or []]
+    query, params = build_attendance_gaps_query(start, end, team_id, employee_id, holidays=skipped)
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return filter_team_working_days(fetch_rows(cur), team_id)
+    except psycopg2.Error as e:
+        logging.error(f"Error retrieving attendance gaps: {e}")
+        return []
 
 def update_employee(employee_id: int, name: str, email: str, team_id: Optional[int], role: str) -> bool:
     """Updates an employee's details in the employees table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE employees SET name = %s, email = %s, team_id = %s, role = %s WHERE employee_id = %s;",
-                (name, email, team_id, role, employee_id)
-            )
-            conn.commit()
-            logging.info(f"Employee with employee_id: {employee_id} updated.")
-            return True
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE employees SET name = %s, email = %s, team_id = %s, role = %s WHERE employee_id = %s;",
+                    (name, email, team_id, role, employee_id)
+                )
+                event = employee_event(employee_id, "updated")
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Employee with employee_id: {employee_id} updated.")
+                apply_event(event)
+                return True
     except psycopg2.Error as e:
         logging.error(f"Error updating employee: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def delete_employee(employee_id: int) -> bool:
     """Deletes an employee from the employees table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM employees WHERE employee_id = %s;", (employee_id,))
-            conn.commit()
-            logging.info(f"Employee with employee_id: {employee_id} deleted.")
-            return True
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM employees WHERE employee_id = %s;", (employee_id,))
+                event = employee_event(employee_id, "deleted")
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Employee with employee_id: {employee_id} deleted.")
+                apply_event(event)
+                return True
     except psycopg2.Error as e:
         logging.error(f"Error deleting employee: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
+
+# Team of the employee an attendance record belongs to, for RETURNING clauses
+ATTENDANCE_TEAM_SQL = "(SELECT e.team_id FROM employees e WHERE e.employee_id = attendance_records.employee_id)"
+
+# Updates a record and returns its previous date, employee and team alongside the new team,
+# so caches can be invalidated for both the old and the new position of the record
+UPDATE_ATTENDANCE_RECORD_SQL = """
+UPDATE attendance_records
+SET employee_id = %s, attendance_date = %s, status = %s, check_in_time = %s, check_out_time = %s, notes = %s
+FROM attendance_records old
+WHERE attendance_records.record_id = %s AND old.record_id = attendance_records.record_id
+RETURNING old.attendance_date, old.employee_id,
+    (SELECT e.team_id FROM employees e WHERE e.employee_id = old.employee_id),
+    (SELECT e.team_id FROM employees e WHERE e.employee_id = attendance_records.employee_id);
+"""
+
+CREATE_ATTENDANCE_RECORD = statements.register(
+    "create_attendance_record",
+    f"INSERT INTO attendance_records (employee_id, attendance_date, status, check_in_time, check_out_time, notes) VALUES (%s, %s, %s, %s, %s, %s) RETURNING record_id, {ATTENDANCE_TEAM_SQL};",
+)
+UPDATE_ATTENDANCE_RECORD = statements.register("update_attendance_record", UPDATE_ATTENDANCE_RECORD_SQL)
 
 def create_attendance_record(employee_id: int, attendance_date: date, status: str, check_in_time: Optional[time], check_out_time: Optional[time], notes: Optional[str]) -> Optional[int]:
     """Creates a new attendance record in the attendance_records table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO attendance_records (employee_id, attendance_date, status, check_in_time, check_out_time, notes) VALUES (%s, %s, %s, %s, %s, %s) RETURNING record_id;",
-                (employee_id, attendance_date, status, check_in_time, check_out_time, notes)
-            )
-            record_id = cur.fetchone()[0]
-            conn.commit()
-            logging.info(f"Attendance record created with record_id: {record_id}")
-            return record_id
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                statements.execute(
+                    cur, CREATE_ATTENDANCE_RECORD,
+                    (employee_id, attendance_date, status, check_in_time, check_out_time, notes)
+                )
+                record_id, team_id = cur.fetchone()
+                event = attendance_event([attendance_date], [employee_id], [team_id])
+                publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Attendance record created with record_id: {record_id}")
+                apply_event(event)
+                return record_id
     except psycopg2.Error as e:
         logging.error(f"Error creating attendance record: {e}")
-        if conn:
-            conn.rollback()
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def get_attendance_record(record_id: int) -> Optional[Dict[str, Any]]:
     """Retrieves an attendance record from the attendance_records table by record_id."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE record_id = %s;", (record_id,))
-            record = cur.fetchone()
-            if record:
-                logging.info(f"Attendance record retrieved with record_id: {record_id}")
-                return {
-                    'record_id': record[0],
-                    'employee_id': record[1],
-                    'attendance_date': record[2],
-                    'status': record[3],
-                    'check_in_time': record[4],
-                    'check_out_time': record[5],
-                    'notes': record[6],
-                    'created_at': record[7],
-                    'updated_at': record[8]
-                }
-            else:
-                logging.info(f"Attendance record with record_id: {record_id} not found.")
-                return None
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                statements.execute(cur, GET_ATTENDANCE_RECORD, (record_id,))
+                record = fetch_row(cur)
+                if record:
+                    logging.info(f"Attendance record retrieved with record_id: {record_id}")
+                    return record
+                else:
+                    logging.info(f"Attendance record with record_id: {record_id} not found.")
+                    return None
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance record: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
+
+def updated_attendance_event(previous: Any, employee_id: int, attendance_date: date) -> Dict[str, Any]:
+    """Builds the invalidation event for an update from the row returned by UPDATE_ATTENDANCE_RECORD_SQL."""
+    old_date, old_employee_id, old_team_id, new_team_id = previous
+    return attendance_event([old_date, attendance_date], [old_employee_id, employee_id], [old_team_id, new_team_id])
 
 def update_attendance_record(record_id: int, employee_id: int, attendance_date: date, status: str, check_in_time: Optional[time], check_out_time: Optional[time], notes: Optional[str]) -> bool:
     """Updates an attendance record's details in the attendance_records table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE attendance_records SET employee_id = %s, attendance_date = %s, status = %s, check_in_time = %s, check_out_time = %s, notes = %s WHERE record_id = %s;",
-                (employee_id, attendance_date, status, check_in_time, check_out_time, notes, record_id)
-            )
-            conn.commit()
-            logging.info(f"Attendance record with record_id: {record_id} updated.")
-            return True
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                statements.execute(
+                    cur, UPDATE_ATTENDANCE_RECORD,
+                    (employee_id, attendance_date, status, check_in_time, check_out_time, notes, record_id)
+                )
+                previous = cur.fetchone()
+                event = updated_attendance_event(previous, employee_id, attendance_date) if previous else None
+                if event:
+                    publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Attendance record with record_id: {record_id} updated.")
+                if event:
+                    apply_event(event)
+                return True
     except psycopg2.Error as e:
         logging.error(f"Error updating attendance record: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def delete_attendance_record(record_id: int) -> bool:
     """Deletes an attendance record from the attendance_records table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM attendance_records WHERE record_id = %s;", (record_id,))
-            conn.commit()
-            logging.info(f"Attendance record with record_id: {record_id} deleted.")
-            return True
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DELETE FROM attendance_records WHERE record_id = %s RETURNING attendance_date, employee_id, {ATTENDANCE_TEAM_SQL};", (record_id,))
+                deleted = cur.fetchone()
+                event = attendance_event([deleted[0]], [deleted[1]], [deleted[2]]) if deleted else None
+                if event:
+                    publish_invalidation(cur, event)
+                conn.commit()
+                logging.info(f"Attendance record with record_id: {record_id} deleted.")
+                if event:
+                    apply_event(event)
+                return True
     except psycopg2.Error as e:
         logging.error(f"Error deleting attendance record: {e}")
-        if conn:
-            conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
+
+# Columns loaded into the staging table by the bulk attendance import, in COPY order
+BULK_ATTENDANCE_COLUMNS = ['row_number', 'employee_id', 'attendance_date', 'status', 'check_in_time', 'check_out_time', 'notes']
+
+BULK_ATTENDANCE_STAGING_SQL = """
+CREATE TEMP TABLE attendance_staging (
+    row_number INTEGER NOT NULL,
+    employee_id INTEGER NOT NULL,
+    attendance_date DATE NOT NULL,
+    status TEXT NOT NULL,
+    check_in_time TIME WITHOUT TIME ZONE NULL,
+    check_out_time TIME WITHOUT TIME ZONE NULL,
+    notes TEXT NULL
+) ON COMMIT DROP;
+"""
+
+BULK_ATTENDANCE_UNKNOWN_EMPLOYEES_SQL = """
+SELECT s.row_number, s.employee_id
+FROM attendance_staging s
+WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.employee_id = s.employee_id)
+ORDER BY s.row_number;
+"""
+
+BULK_ATTENDANCE_UPSERT_SQL = """
+INSERT INTO attendance_records (employee_id, attendance_date, status, check_in_time, check_out_time, notes)
+SELECT s.employee_id, s.attendance_date, s.status::attendance_status, s.check_in_time, s.check_out_time, s.notes
+FROM attendance_staging s
+WHERE EXISTS (SELECT 1 FROM employees e WHERE e.employee_id = s.employee_id)
+ON CONFLICT ON CONSTRAINT unique_employee_date DO UPDATE SET
+    status = EXCLUDED.status,
+    check_in_time = EXCLUDED.check_in_time,
+    check_out_time = EXCLUDED.check_out_time,
+    notes = EXCLUDED.notes
+RETURNING (xmax = 0) AS inserted;
+"""
+
+def map_bulk_attendance_result(unknown_employees: List[Any], upserted: List[Any]) -> Dict[str, Any]:
+    """Summarises the staging checks and upsert results of a bulk import."""
+    inserted = sum(1 for row in upserted if row[0])
+    return {
+        'inserted': inserted,
+        'updated': len(upserted) - inserted,
+        'errors': [
+            {'row': row[0], 'error': f"Employee {row[1]} does not exist"}
+            for row in unknown_employees
+        ],
+    }
+
+def bulk_upsert_attendance_records(records: List[Tuple]) -> Optional[Dict[str, Any]]:
+    """
+    Loads attendance rows with COPY into a staging table and upserts them into attendance_records.
+
+    Rows must be tuples in BULK_ATTENDANCE_COLUMNS order, already validated and free of duplicate
+    (employee_id, attendance_date) keys. Existing records for the same employee and date are
+    updated in place (unique_employee_date); rows for unknown employees are skipped and reported.
+    The whole batch runs in one transaction.
+
+    Returns:
+        Dictionary with 'inserted', 'updated' and per-row 'errors', or None if the load failed
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(['' if value is None else value for value in record])
+    buffer.seek(0)
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(BULK_ATTENDANCE_STAGING_SQL)
+                cur.copy_expert(
+                    f"COPY attendance_staging ({', '.join(BULK_ATTENDANCE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+                if ATTENDANCE_PARTITIONING != "none":
+                    cur.execute(ENSURE_STAGED_PARTITIONS_SQL, (ATTENDANCE_PARTITIONING,))
+                cur.execute(BULK_ATTENDANCE_UNKNOWN_EMPLOYEES_SQL)
+                unknown_employees = cur.fetchall()
+                cur.execute(BULK_ATTENDANCE_UPSERT_SQL)
+                upserted = cur.fetchall()
+                event = attendance_event({record[2] for record in records}, {record[1] for record in records})
+                publish_invalidation(cur, event)
+                conn.commit()
+                result = map_bulk_attendance_result(unknown_employees, upserted)
+                apply_event(event)
+                logging.info(f"Bulk attendance import: {result['inserted']} inserted, {result['updated']} updated.")
+                return result
+    except psycopg2.Error as e:
+        logging.error(f"Error bulk loading attendance records: {e}")
+        return None
 
 def get_all_employees() -> List[Dict[str, Any]]:
     """Retrieves all employees from the employees table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, name, email, team_id, role, created_at, updated_at FROM employees;")
-            employees = cur.fetchall()
-            return [{
-                'employee_id': employee[0],
-                'name': employee[1],
-                'email': employee[2],
-                'team_id': employee[3],
-                'role': employee[4],
-            } for employee in employees]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT employee_id, name, email, team_id, role FROM employees;")
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving all employees: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_all_teams() -> List[Dict[str, Any]]:
     """Retrieves all teams from the teams table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT team_id, team_name, created_at, updated_at FROM teams;")
-            teams = cur.fetchall()
-            return [{
-                'team_id': team[0],
-                'team_name': team[1],
-                'created_at': team[2],
-                'updated_at': team[3]
-            } for team in teams]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT team_id, team_name, created_at, updated_at FROM teams;")
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving all teams: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_all_attendance_records() -> List[Dict[str, Any]]:
     """Retrieves all attendance records from the attendance_records table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records;")
-            records = cur.fetchall()
-            return [{
-                'record_id': record[0],
-                'employee_id': record[1],
-                'attendance_date': record[2],
-                'status': record[3],
-                'check_in_time': record[4],
-                'check_out_time': record[5],
-                'notes': record[6],
-            } for record in records]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes FROM attendance_records;")
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving all attendance records: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
+
+# Columns the AI agent may request from get_attendance_columns_by_date_range, in output order
+ATTENDANCE_DATA_COLUMNS = ['record_id', 'employee_id', 'attendance_date', 'status', 'check_in_time', 'check_out_time', 'notes']
+
+def get_attendance_columns_by_date_range(start_date: date, end_date: date, columns: Optional[List[str]] = None) -> Tuple[List[str], List[Tuple]]:
+    """
+    Retrieves selected columns of the attendance records dated between start_date and end_date.
+
+    The range is answered from the attendance_date index and only the requested columns are
+    read. Column names outside ATTENDANCE_DATA_COLUMNS are ignored; when none remain, all
+    of them are returned.
+
+    Returns:
+        Tuple of (column names, rows as tuples ordered by attendance_date and record_id)
+    """
+    selected = [column for column in ATTENDANCE_DATA_COLUMNS if columns is None or column in columns]
+    if not selected:
+        selected = list(ATTENDANCE_DATA_COLUMNS)
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT {', '.join(selected)}
+                    FROM attendance_records
+                    WHERE attendance_date BETWEEN %s AND %s
+                    ORDER BY attendance_date, record_id;
+                """, (start_date, end_date))
+                return selected, cur.fetchall()
+    except psycopg2.Error as e:
+        logging.error(f"Error retrieving attendance columns by date range: {e}")
+        return selected, []
+
+def _attendance_filters(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> Tuple[str, List[str], List[Any]]:
+    """Returns the join, WHERE clauses and parameters for the optional attendance filters."""
+    joins = ""
+    where_clauses = []
+    params = []
+
+    if start_date:
+        where_clauses.append("ar.attendance_date >= %s")
+        params.append(datetime.strptime(start_date, '%Y-%m-%d').date())
+    if end_date:
+        where_clauses.append("ar.attendance_date <= %s")
+        params.append(datetime.strptime(end_date, '%Y-%m-%d').date())
+    if team_id:
+        joins = " JOIN employees e ON ar.employee_id = e.employee_id"
+        where_clauses.append("e.team_id = %s")
+        params.append(team_id)
+    if employee_id:
+        where_clauses.append("ar.employee_id = %s")
+        params.append(employee_id)
+    if status:
+        where_clauses.append("ar.status = %s")
+        params.append(status)
+    return joins, where_clauses, params
+
+def build_attendance_page_query(
+    limit: int = 50,
+    cursor: Optional[Tuple[date, int]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+    descending: bool = False,
+) -> Tuple[str, List[Any], str, List[Any]]:
+    """
+    Builds the keyset-paginated attendance query and its matching count query.
+
+    Rows are ordered by (attendance_date, record_id); the cursor is the key of the last row
+    of the previous page, so each page is an index range scan regardless of its depth.
+    One extra row is fetched to tell whether another page follows.
+
+    Returns:
+        Tuple of (page query, page params, count query, count params) with %s placeholders
+    """
+    joins, where_clauses, params = _attendance_filters(start_date, end_date, team_id, employee_id, status)
+
+    count_where = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    count_query = f"SELECT COUNT(*) FROM attendance_records ar{joins}{count_where}"
+    count_params = list(params)
+
+    if cursor:
+        where_clauses.append(f"(ar.attendance_date, ar.record_id) {'<' if descending else '>'} (%s, %s)")
+        params.extend(cursor)
+    where = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    direction = "DESC" if descending else "ASC"
+    query = (
+        "SELECT ar.record_id, ar.employee_id, ar.attendance_date, ar.status, ar.check_in_time, ar.check_out_time, ar.notes"
+        f" FROM attendance_records ar{joins}{where}"
+        f" ORDER BY ar.attendance_date {direction}, ar.record_id {direction} LIMIT %s"
+    )
+    params.append(limit + 1)
+    return query, params, count_query, count_params
+
+PAGE_COLUMNS = ['record_id', 'employee_id', 'attendance_date', 'status', 'check_in_time', 'check_out_time', 'notes']
+
+def map_attendance_page(records: List[Any], limit: int, total_count: Optional[int] = None) -> Dict[str, Any]:
+    """Turns the rows of a page query into items plus the cursor of the next page."""
+    items = make_rows(PAGE_COLUMNS, records[:limit])
+    next_cursor = None
+    if len(records) > limit:
+        next_cursor = (items[-1].attendance_date, items[-1].record_id)
+    return {'items': items, 'next_cursor': next_cursor, 'total_count': total_count}
+
+def get_attendance_page(
+    limit: int = 50,
+    cursor: Optional[Tuple[date, int]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+    include_total: bool = False,
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """
+    Retrieves one page of attendance records using keyset pagination.
+
+    Args:
+        limit (int): Maximum number of records in the page
+        cursor (Optional[Tuple[date, int]]): (attendance_date, record_id) of the last record of the previous page
+        start_date (Optional[str]): Earliest attendance date in YYYY-MM-DD format
+        end_date (Optional[str]): Latest attendance date in YYYY-MM-DD format
+        team_id (Optional[int]): Filter by team of the employee
+        employee_id (Optional[int]): Filter by employee
+        status (Optional[str]): Filter by attendance status
+        include_total (bool): Also count all records matching the filters
+        descending (bool): Return the newest records first
+
+    Returns:
+        Dictionary with 'items', 'next_cursor' (None on the last page) and 'total_count'
+    """
+    query, params, count_query, count_params = build_attendance_page_query(
+        limit, cursor, start_date, end_date, team_id, employee_id, status, descending
+    )
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                records = cur.fetchall()
+                total_count = None
+                if include_total:
+                    cur.execute(count_query, count_params)
+                    total_count = cur.fetchone()[0]
+                return map_attendance_page(records, limit, total_count)
+    except psycopg2.Error as e:
+        logging.error(f"Error retrieving attendance page: {e}")
+        return {'items': [], 'next_cursor': None, 'total_count': None}
+
+# Columns produced by the attendance export, in output order
+EXPORT_COLUMNS = ['record_id', 'employee_id', 'attendance_date', 'status', 'check_in_time', 'check_out_time', 'notes', 'created_at', 'updated_at']
+
+def build_attendance_export_query(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """Builds the query streamed by the attendance export, ordered by (attendance_date, record_id)."""
+    joins, where_clauses, params = _attendance_filters(start_date, end_date, team_id, employee_id, status)
+    where = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    query = (
+        "SELECT " + ", ".join(f"ar.{column}" for column in EXPORT_COLUMNS) +
+        f" FROM attendance_records ar{joins}{where}"
+        " ORDER BY ar.attendance_date, ar.record_id"
+    )
+    return query, params
+
+def stream_attendance_records(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    status: Optional[str] = None,
+    batch_size: int = 2000,
+) -> Iterator[List[Tuple]]:
+    """
+    Yields filtered attendance rows in batches from a server-side (named) cursor.
+
+    Only one batch is held in memory at a time, so arbitrarily large exports run in
+    bounded memory. Rows are tuples in EXPORT_COLUMNS order. Database errors are
+    logged and re-raised, since a silently truncated export would look complete.
+    """
+    query, params = build_attendance_export_query(start_date, end_date, team_id, employee_id, status)
+    try:
+        with get_connection() as conn:
+            with conn.cursor(name="attendance_export") as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+    except psycopg2.Error as e:
+        logging.error(f"Error streaming attendance records: {e}")
+        raise
+
+ATTENDANCE_STATUSES = ['Present', 'Absent', 'WFH', 'Leave']
+
+# Where GET /summarize_attendance/ reads its counts from: 'live' aggregates attendance_records,
+# 'precomputed' sums the trigger-maintained attendance_daily_rollup table
+ATTENDANCE_SUMMARY_SOURCE = os.getenv("ATTENDANCE_SUMMARY_SOURCE", "live")
+
+def build_attendance_summary_query(
+    yesterday: date,
+    week_start: date,
+    today: date,
+    precomputed: bool = False,
+) -> Tuple[str, List[Any]]:
+    """
+    Builds a single-row query with total and per-status counts for yesterday and the last week.
+
+    Both windows are answered in one pass over an indexed attendance_date range using
+    COUNT ... FILTER, so the cost depends on the window, not the size of the table. With
+    precomputed=True the same counts are summed from attendance_daily_rollup instead, an
+    index-only scan of its per-(date, employee, status) counts.
+
+    Returns:
+        Tuple of the query text (with %s placeholders) and its parameters
+    """
+    if precomputed:
+        source = "attendance_daily_rollup"
+        aggregate = "COALESCE(SUM(record_count) FILTER (WHERE {condition}), 0)"
+    else:
+        source = "attendance_records"
+        aggregate = "COUNT(*) FILTER (WHERE {condition})"
+
+    columns = []
+    params: List[Any] = []
+    for window_condition, window_params in (
+        ("attendance_date = %s", [yesterday]),
+        ("attendance_date BETWEEN %s AND %s", [week_start, today]),
+    ):
+        columns.append(aggregate.format(condition=window_condition))
+        params.extend(window_params)
+        for status in ATTENDANCE_STATUSES:
+            columns.append(aggregate.format(condition=f"{window_condition} AND status = %s"))
+            params.extend(window_params + [status])
+
+    query = f"""
+        SELECT {', '.join(columns)}
+        FROM {source}
+        WHERE attendance_date BETWEEN %s AND %s
+    """
+    params.extend([min(week_start, yesterday), max(today, yesterday)])
+    return query, params
+
+def map_attendance_summary(row: Optional[Any]) -> Dict[str, Dict[str, int]]:
+    """Splits the row returned by the summary query into per-window count dictionaries."""
+    keys = ['total'] + ATTENDANCE_STATUSES
+    values = [int(value or 0) for value in row] if row else [0] * (2 * len(keys))
+    return {
+        'yesterday': dict(zip(keys, values[:len(keys)])),
+        'last_week': dict(zip(keys, values[len(keys):])),
+    }
+
+def get_attendance_summary_counts(today: Optional[date] = None, precomputed: Optional[bool] = None) -> Optional[Dict[str, Dict[str, int]]]:
+    """
+    Counts attendance records by status for yesterday and for the last seven days.
+
+    Args:
+        today (Optional[date]): Reference date; defaults to the current date
+        precomputed (Optional[bool]): Read attendance_daily_rollup instead of attendance_records;
+            defaults to ATTENDANCE_SUMMARY_SOURCE
+
+    Returns:
+        {'yesterday': {...}, 'last_week': {...}} with 'total' and per-status counts, or None on error
+    """
+    today = today or datetime.now().date()
+    if precomputed is None:
+        precomputed = ATTENDANCE_SUMMARY_SOURCE == "precomputed"
+    query, params = build_attendance_summary_query(
+        today - timedelta(days=1), today - timedelta(days=7), today, precomputed
+    )
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return map_attendance_summary(cur.fetchone())
+    except psycopg2.Error as e:
+        logging.error(f"Error retrieving attendance summary: {e}")
+        return None
 
 def get_attendance_records_by_employee(employee_id: int) -> List[Dict[str, Any]]:
     """Retrieves attendance records for a specific employee from the attendance_records table."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT record_id, employee_id, attendance_date, status, check_in_time, check_out_time, notes, created_at, updated_at FROM attendance_records WHERE employee_id = %s;", (employee_id,))
-            records = cur.fetchall()
-            return [{
-                'record_id': record[0],
-                'employee_id': record[1],
-                'attendance_date': record[2],
-                'status': record[3],
-                'check_in_time': record[4],
-                'check_out_time': record[5],
-                'notes': record[6],
-                'created_at': record[7],
-                'updated_at': record[8]
-            } for record in records]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                statements.execute(cur, GET_ATTENDANCE_RECORDS_BY_EMPLOYEE, (employee_id,))
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance records by employee: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 def get_attendance_records_by_team(team_id: int) -> List[Dict[str, Any]]:
     """Retrieves attendance records for all employees in a specific team."""
-    conn = None
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            # Join employees and attendance_records tables to filter by team_id
-            cur.execute("""
-                SELECT ar.record_id, ar.employee_id, ar.attendance_date, ar.status, ar.check_in_time, ar.check_out_time, ar.notes, ar.created_at, ar.updated_at
-                FROM attendance_records ar
-                JOIN employees e ON ar.employee_id = e.employee_id
-                WHERE e.team_id = %s;
-            """, (team_id,))
-            records = cur.fetchall()
-            return [{
-                'record_id': record[0],
-                'employee_id': record[1],
-                'attendance_date': record[2],
-                'status': record[3],
-                'check_in_time': record[4],
-                'check_out_time': record[5],
-                'notes': record[6],
-                'created_at': record[7],
-                'updated_at': record[8]
-            } for record in records]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                # Join employees and attendance_records tables to filter by team_id
+                cur.execute("""
+                    SELECT ar.record_id, ar.employee_id, ar.attendance_date, ar.status, ar.check_in_time, ar.check_out_time, ar.notes, ar.created_at, ar.updated_at
+                    FROM attendance_records ar
+                    JOIN employees e ON ar.employee_id = e.employee_id
+                    WHERE e.team_id = %s;
+                """, (team_id,))
+                return fetch_rows(cur)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance records by team: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
+
+def build_attendance_trends_query(
+    start_date: str,
+    end_date: str,
+    group_by: str = "team",
+    employee_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Builds the aggregation query behind get_attendance_trends.
+
+    Counts come from attendance_daily_rollup, so the query is answered from its covering
+    indexes without joining attendance_records to employees; team and employee names are
+    joined in after aggregation. Shared by the sync and async data-access layers so both
+    run the same SQL.
+
+    Returns:
+        Tuple of the query text (with %s placeholders) and its parameters
+    """
+    # Convert string dates to date objects
+    start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+    params = [start_date, end_date]
+    where_clauses = ["r.attendance_date BETWEEN %s AND %s"]
+
+    # Add filters if provided
+    if employee_id:
+        where_clauses.append("r.employee_id = %s")
+        params.append(employee_id)
+
+    if team_id:
+        where_clauses.append("r.team_id = %s")
+        params.append(team_id)
+
+    if status:
+        where_clauses.append("r.status = %s")
+        params.append(status)
+
+    where_clause = " AND ".join(where_clauses)
+
+    if group_by == "team":
+        query = f"""
+            WITH counts AS (
+                SELECT 
+                    r.team_id,
+                    r.status,
+                    SUM(r.record_count) as count,
+                    MIN(r.attendance_date) as earliest_date,
+                    MAX(r.attendance_date) as latest_date
+                FROM attendance_daily_rollup r
+                WHERE {where_clause} AND r.team_id IS NOT NULL
+                GROUP BY r.team_id, r.status
+            )
+            SELECT 
+                t.team_id,
+                t.team_name,
+                c.status,
+                c.count,
+                c.count * 100.0 / 
+                    NULLIF(SUM(c.count) OVER (PARTITION BY t.team_id), 0) as percentage,
+                c.earliest_date,
+                c.latest_date
+            FROM counts c
+            JOIN teams t ON c.team_id = t.team_id
+            ORDER BY t.team_name, c.status
+        """
+    elif group_by == "status":
+        query = f"""
+            SELECT 
+                r.status,
+                SUM(r.record_count) as count,
+                SUM(r.record_count) * 100.0 / 
+                    NULLIF(SUM(SUM(r.record_count)) OVER (), 0) as percentage,
+                MIN(r.attendance_date) as earliest_date,
+                MAX(r.attendance_date) as latest_date
+            FROM attendance_daily_rollup r
+            WHERE {where_clause}
+            GROUP BY r.status
+            ORDER BY r.status
+        """
+    else:  # group_by == "employee"
+        query = f"""
+            WITH counts AS (
+                SELECT 
+                    r.employee_id,
+                    r.status,
+                    SUM(r.record_count) as count,
+                    MIN(r.attendance_date) as earliest_date,
+                    MAX(r.attendance_date) as latest_date
+                FROM attendance_daily_rollup r
+                WHERE {where_clause}
+                GROUP BY r.employee_id, r.status
+            )
+            SELECT 
+                e.employee_id,
+                e.name as employee_name,
+                c.status,
+                c.count,
+                c.count * 100.0 / 
+                    NULLIF(SUM(c.count) OVER (PARTITION BY e.employee_id), 0) as percentage,
+                c.earliest_date,
+                c.latest_date
+            FROM counts c
+            JOIN employees e ON c.employee_id = e.employee_id
+            ORDER BY e.name, c.status
+        """
+    return query, params
+
+TRENDS_COLUMNS = {
+    'team': ('team_id', 'team_name', 'status', 'count', 'percentage', 'earliest_date', 'latest_date'),
+    'status': ('status', 'count', 'percentage', 'earliest_date', 'latest_date'),
+    'employee': ('employee_id', 'employee_name', 'status', 'count', 'percentage', 'earliest_date', 'latest_date'),
+}
+
+def map_attendance_trends(results: List[Any], group_by: str = "team") -> List[Dict[str, Any]]:
+    """Converts rows returned by the trends query into compact rows with int counts and float percentages."""
+    columns = TRENDS_COLUMNS.get(group_by, TRENDS_COLUMNS['employee'])
+    count_index = columns.index('count')
+    row = row_class(columns)
+    rows = []
+    for result in results:
+        values = list(result)
+        values[count_index] = int(values[count_index])
+        percentage = values[count_index + 1]
+        values[count_index + 1] = float(percentage) if percentage is not None else 0.0
+        rows.append(row._make(values))
+    return rows
 
 def get_attendance_trends(
     start_date: str,
@@ -1091,131 +1681,227 @@ def get_attendance_trends(
     Returns:
         List of dictionaries containing the aggregated attendance data
     """
-    conn = None
-    # Convert string dates to date objects
-    start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    query, params = build_attendance_trends_query(start_date, end_date, group_by, employee_id, team_id, status)
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        
-        params = [start_date, end_date]
-        where_clauses = ["ar.attendance_date BETWEEN %s AND %s"]
-        
-        # Add filters if provided
-        if employee_id:
-            where_clauses.append("e.employee_id = %s")
-            params.append(employee_id)
-        
-        if team_id:
-            where_clauses.append("e.team_id = %s")
-            params.append(team_id)
-            
-        if status:
-            where_clauses.append("ar.status = %s")
-            params.append(status)
-        
-        where_clause = " AND ".join(where_clauses)
-        
-        if group_by == "team":
-            query = f"""
-                SELECT 
-                    t.team_id,
-                    t.team_name,
-                    ar.status,
-                    COUNT(ar.record_id) as count,
-                    COUNT(ar.record_id) * 100.0 / 
-                        NULLIF(SUM(COUNT(ar.record_id)) OVER (PARTITION BY t.team_id), 0) as percentage,
-                    MIN(ar.attendance_date) as earliest_date,
-                    MAX(ar.attendance_date) as latest_date
-                FROM attendance_records ar
-                JOIN employees e ON ar.employee_id = e.employee_id
-                JOIN teams t ON e.team_id = t.team_id
-                WHERE {where_clause}
-                GROUP BY t.team_id, t.team_name, ar.status
-                ORDER BY t.team_name, ar.status
-            """
-        elif group_by == "status":
-            query = f"""
-                SELECT 
-                    ar.status,
-                    COUNT(ar.record_id) as count,
-                    COUNT(ar.record_id) * 100.0 / 
-                        NULLIF(SUM(COUNT(ar.record_id)) OVER (), 0) as percentage,
-                    MIN(ar.attendance_date) as earliest_date,
-                    MAX(ar.attendance_date) as latest_date
-                FROM attendance_records ar
-                JOIN employees e ON ar.employee_id = e.employee_id
-                LEFT JOIN teams t ON e.team_id = t.team_id
-                WHERE {where_clause}
-                GROUP BY ar.status
-                ORDER BY ar.status
-            """
-        else:  # group_by == "employee"
-            query = f"""
-                SELECT 
-                    e.employee_id,
-                    e.name as employee_name,
-                    ar.status,
-                    COUNT(ar.record_id) as count,
-                    COUNT(ar.record_id) * 100.0 / 
-                        NULLIF(SUM(COUNT(ar.record_id)) OVER (PARTITION BY e.employee_id), 0) as percentage,
-                    MIN(ar.attendance_date) as earliest_date,
-                    MAX(ar.attendance_date) as latest_date
-                FROM attendance_records ar
-                JOIN employees e ON ar.employee_id = e.employee_id
-                WHERE {where_clause}
-                GROUP BY e.employee_id, e.name, ar.status
-                ORDER BY e.name, ar.status
-            """
-            
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            results = cur.fetchall()
-            
-            if group_by == "team":
-                return [{
-                    'team_id': result[0],
-                    'team_name': result[1],
-                    'status': result[2],
-                    'count': result[3],
-                    'percentage': float(result[4]) if result[4] is not None else 0.0,
-                    'earliest_date': result[5],
-                    'latest_date': result[6]
-                } for result in results]
-            elif group_by == "status":
-                return [{
-                    'status': result[0],
-                    'count': result[1],
-                    'percentage': float(result[2]) if result[2] is not None else 0.0,
-                    'earliest_date': result[3],
-                    'latest_date': result[4]
-                } for result in results]
-            else:  # group_by == "employee"
-                return [{
-                    'employee_id': result[0],
-                    'employee_name': result[1],
-                    'status': result[2],
-                    'count': result[3],
-                    'percentage': float(result[4]) if result[4] is not None else 0.0,
-                    'earliest_date': result[5],
-                    'latest_date': result[6]
-                } for result in results]
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                results = cur.fetchall()
+                return map_attendance_trends(results, group_by)
     except psycopg2.Error as e:
         logging.error(f"Error retrieving attendance trends: {e}")
         return []
+
+def build_attendance_matrix_queries(
+    start_date: date,
+    end_date: date,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> Tuple[Tuple[str, List[Any]], Tuple[str, List[Any]]]:
+    """
+    Builds the two queries loading an employee x date attendance matrix for the analytics engine.
+
+    The first lists the employees in scope. The second returns a single row of three parallel
+    integer arrays (employee_id, day offset from start_date, status code as 1-based position in
+    ATTENDANCE_STATUSES), so a whole range arrives as three arrays instead of one tuple per record.
+
+    Returns:
+        ((employees query, params), (records query, params)), with %s placeholders
+    """
+    employee_filters = ""
+    employee_params: List[Any] = []
+    if team_id:
+        employee_filters += " AND e.team_id = %s"
+        employee_params.append(team_id)
+    if employee_id:
+        employee_filters += " AND e.employee_id = %s"
+        employee_params.append(employee_id)
+
+    employees_query = f"""
+        SELECT e.employee_id, e.name, e.team_id
+        FROM employees e
+        WHERE 1=1{employee_filters}
+        ORDER BY e.employee_id
+    """
+    records_query = f"""
+        SELECT array_agg(ar.employee_id), array_agg(ar.attendance_date - %s::date), array_agg(array_position(%s::text[], ar.status::text))
+        FROM attendance_records ar
+        JOIN employees e ON e.employee_id = ar.employee_id
+        WHERE ar.attendance_date BETWEEN %s AND %s{employee_filters}
+    """
+    records_params = [start_date, ATTENDANCE_STATUSES, start_date, end_date] + employee_params
+    return (employees_query, employee_params), (records_query, records_params)
+
+def get_attendance_matrix_data(
+    start_date: date,
+    end_date: date,
+    team_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+) -> Optional[Tuple[List[Tuple], Tuple[Optional[List[int]], ...]]]:
+    """
+    Loads the employees and attendance arrays for the analytics engine (see build_attendance_matrix_queries).
+
+    Both queries run in one transaction so they see the same snapshot.
+
+    Returns:
+        (employee rows, (employee_ids, day_offsets, status_codes)), or None on error
+    """
+    (employees_query, employee_params), (records_query, records_params) = build_attendance_matrix_queries(
+        start_date, end_date, team_id, employee_id
+    )
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY;")
+                cur.execute(employees_query, employee_params)
+                employees = cur.fetchall()
+                cur.execute(records_query, records_params)
+                arrays = cur.fetchone()
+                return employees, tuple(arrays)
+    except psycopg2.Error as e:
+        logging.error(f"Error loading attendance matrix: {e}")
+        return None
+
+# Aggregate of attendance_records that attendance_daily_rollup must match, and the rollup's key columns
+ATTENDANCE_ROLLUP_SQL = """
+    SELECT ar.attendance_date, e.team_id, ar.employee_id, ar.status, COUNT(*) AS record_count
+    FROM attendance_records ar
+    JOIN employees e ON ar.employee_id = e.employee_id
+    GROUP BY ar.attendance_date, e.team_id, ar.employee_id, ar.status
+"""
+ATTENDANCE_ROLLUP_KEYS = ['attendance_date', 'team_id', 'employee_id', 'status']
+
+def check_attendance_rollups() -> Optional[int]:
+    """
+    Compares attendance_daily_rollup with a fresh aggregate of attendance_records.
+
+    Rows with a zero count are treated as absent, so a rollup row left at zero by
+    deletions is not a mismatch.
+
+    Returns:
+        Number of mismatching keys, or None on error
+    """
+    # team_id is matched with IS NOT DISTINCT FROM as it may be NULL
+    join_condition = " AND ".join(f"x.{key} IS NOT DISTINCT FROM r.{key}" for key in ATTENDANCE_ROLLUP_KEYS)
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT COUNT(*)
+                    FROM ({ATTENDANCE_ROLLUP_SQL}) x
+                    FULL JOIN (SELECT * FROM attendance_daily_rollup WHERE record_count <> 0) r ON {join_condition}
+                    WHERE x.record_count IS DISTINCT FROM r.record_count;
+                """)
+                return cur.fetchone()[0]
+    except psycopg2.Error as e:
+        logging.error(f"Error checking attendance rollups: {e}")
+        return None
+
+def rebuild_attendance_rollups() -> bool:
+    """
+    Recomputes attendance_daily_rollup from attendance_records in one transaction.
+
+    Writes to attendance_records are blocked while the rebuild runs, so no change can
+    slip between the recount and the commit.
+    """
+    columns = ", ".join(ATTENDANCE_ROLLUP_KEYS + ['record_count'])
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("LOCK TABLE attendance_records IN SHARE MODE;")
+                cur.execute("DELETE FROM attendance_daily_rollup;")
+                cur.execute(f"INSERT INTO attendance_daily_rollup ({columns}) SELECT {columns} FROM ({ATTENDANCE_ROLLUP_SQL}) x;")
+                conn.commit()
+                logging.info("Attendance rollups rebuilt.")
+                return True
+    except psycopg2.Error as e:
+        logging.error(f"Error rebuilding attendance rollups: {e}")
+        return False
+
+def benchmark_statements(iterations: int = 500) -> Optional[Dict[str, Any]]:
+    """
+    Times the registered read statements with and without server-side preparation.
+
+    Runs each hot read ``iterations`` times per mode against the first employee and
+    attendance record in the database, then restores the configured mode.
+
+    Returns:
+        The statement latency stats for both modes, or None on error
+    """
+    configured = statements.enabled
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT employee_id, email FROM employees ORDER BY employee_id LIMIT 1;")
+                employee = cur.fetchone()
+                cur.execute("SELECT record_id FROM attendance_records ORDER BY record_id LIMIT 1;")
+                record = cur.fetchone()
+                if not employee or not record:
+                    logging.error("Benchmark needs at least one employee and one attendance record.")
+                    return None
+                statements.reset_stats()
+                for enabled in (False, True):
+                    statements.enabled = enabled
+                    for _ in range(iterations):
+                        for name, params in (
+                            (GET_EMPLOYEE, (employee[0],)),
+                            (GET_EMPLOYEE_BY_USERNAME, (employee[1],)),
+                            (GET_ATTENDANCE_RECORD, (record[0],)),
+                            (GET_ATTENDANCE_RECORDS_BY_EMPLOYEE, (employee[0],)),
+                        ):
+                            statements.execute(cur, name, params)
+                            cur.fetchall()
+                return statements.stats()["statements"]
+    except psycopg2.Error as e:
+        logging.error(f"Error benchmarking statements: {e}")
+        return None
     finally:
-        if conn:
-            conn.close()
+        statements.enabled = configured
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Database maintenance commands")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="init",
+        choices=["init", "check-rollups", "rebuild-rollups", "bench-statements", "partition", "maintain-partitions"],
+        help=(
+            "init (re)creates the schema; check-rollups and rebuild-rollups verify or recompute the attendance "
+            "rollup table; bench-statements compares planned and prepared latency of the hot queries; "
+            "partition migrates attendance_records to range partitions; maintain-partitions creates upcoming ones"
+        ),
+    )
+    parser.add_argument(
+        "--interval",
+        choices=["month", "year"],
+        default=ATTENDANCE_PARTITIONING if ATTENDANCE_PARTITIONING != "none" else "month",
+        help="Partition size used by the partition command",
+    )
+    args = parser.parse_args()
+
     # Basic check to ensure credentials were loaded
     if not all([db_name, db_user, db_password, db_host, db_port]):
         logging.error("Error: Database configuration is missing in .env file or environment variables.")
     else:
-        initialize_database()
\ No newline at end of file
+        if args.command == "init":
+            initialize_database()
+        elif args.command == "check-rollups":
+            mismatches = check_attendance_rollups()
+            if mismatches is not None:
+                logging.info(f"attendance_daily_rollup: {'consistent' if mismatches == 0 else f'{mismatches} mismatching rows'}")
+        elif args.command == "rebuild-rollups":
+            rebuild_attendance_rollups()
+        elif args.command == "partition":
+            partition_attendance_records(args.interval)
+        elif args.command == "maintain-partitions":
+            maintain_attendance_partitions()
+        else:
+            results = benchmark_statements()
+            if results is not None:
+                for name, modes in results.items():
+                    planned = modes.get("planned", {}).get("avg_ms")
+                    prepared = modes.get("prepared", {}).get("avg_ms")
+                    logging.info(f"{name}: planned {planned} ms, prepared {prepared} ms")
+        pool.close()
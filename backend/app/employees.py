@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Union
 from tenacity import retry, stop_after_attempt, retry_if_exception, wait_incrementing, before_sleep_log, after_log
 import logging
-from .db import (
+from .async_db import (
     get_employee,
     update_employee,
     delete_employee,
@@ -11,6 +11,7 @@ from .db import (
 from .models import Employee, EmployeeCRUD
 from .auth import get_current_active_user
 from .helper import is_db_error
+from .responses import list_response
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ async def _get_employee(employee_id: Union[int, str], current_user: Employee):
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid employee_id format")
 
-    employee = get_employee(employee_id)
+    employee = await get_employee(employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
@@ -35,7 +36,7 @@ async def _get_employee(employee_id: Union[int, str], current_user: Employee):
     if current_user.role != "ADMIN":
         if current_user.employee_id != employee_id and current_user.team_id != employee['team_id']:
             raise HTTPException(status_code=403, detail="Unauthorized")
-    return Employee(**employee)
+    return employee
 
 # Employees CRUD endpoints
 @router.get("/employees/{employee_id}", response_model=Employee)
@@ -66,10 +67,10 @@ async def update_employee_endpoint(employee_id: int, employee_data: EmployeeCRUD
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        if not update_employee(employee_id, employee_data.name, employee_data.email, employee_data.team_id, employee_data.role):
+        if not await update_employee(employee_id, employee_data.name, employee_data.email, employee_data.team_id, employee_data.role):
             raise HTTPException(status_code=500, detail="Failed to update employee")
-        employee = get_employee(employee_id)
-        return Employee(**employee)
+        employee = await get_employee(employee_id)
+        return employee
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update employee: {e}")
 
@@ -85,7 +86,7 @@ async def delete_employee_endpoint(employee_id: int, current_user: Employee = De
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        if not delete_employee(employee_id):
+        if not await delete_employee(employee_id):
             raise HTTPException(status_code=500, detail="Failed to delete employee")
         return {"message": "Employee deleted"}
     except Exception as e:
@@ -104,7 +105,7 @@ async def read_all_employees_endpoint(current_user: Employee = Depends(get_curre
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        employees = get_all_employees()
-        return [Employee(**employee) for employee in employees]
+        employees = await get_all_employees()
+        return list_response(employees, Employee)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read employees: {e}")
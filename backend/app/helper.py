@@ -1,21 +1,25 @@
+import asyncio
+import base64
+import csv
+import io
+import json
 import datetime as dt
 import jwt
 import os
+import re
 import psycopg2
+import asyncpg
 from dotenv import load_dotenv
 from fastapi import HTTPException
 from passlib.context import CryptContext
 from .db import (
-    db_name,
-    db_user,
-    db_password,
-    db_host,
-    db_port,
-    get_all_attendance_records,
+    get_attendance_columns_by_date_range,
+    ATTENDANCE_STATUSES,
 )
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Optional
-from .models import User, AttendanceRecord
+from typing import Any, Dict, List, Optional, Tuple
+from .cache import credential_cache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,10 +27,27 @@ load_dotenv()
 # Initialize CryptContext from ini file
 bcrypt_context = CryptContext.from_path("passlib_config.ini")
 
+# Bounded pool that runs bcrypt off the event loop; bcrypt releases the GIL while hashing
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_jobs_in_flight = 0
+
+async def _run_password_job(fn, *args):
+    global _password_jobs_in_flight
+    loop = asyncio.get_running_loop()
+    _password_jobs_in_flight += 1
+    try:
+        return await loop.run_in_executor(password_hash_executor, fn, *args)
+    finally:
+        _password_jobs_in_flight -= 1
+
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# When enabled, get_current_user builds the principal from the signed role/team_id/employee_id
+# claims instead of looking the employee up; changes then apply only once the token is reissued
+TRUST_JWT_CLAIMS = os.getenv("AUTH_TRUST_JWT_CLAIMS", "false").lower() in ("1", "true", "yes")
 
 def create_access_token(data: dict, expires_delta: dt.timedelta = None):
     to_encode = data.copy()
@@ -44,105 +65,222 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return bcrypt_context.hash(password)
 
-def get_employee_by_username(username: str):
-    conn = None
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verifies a password on the bcrypt thread pool so the event loop keeps serving requests.
+
+    Successful verifications are remembered for LOGIN_CACHE_TTL seconds (disabled by default),
+    letting repeated logins with the same credentials skip bcrypt entirely.
+    """
+    if credential_cache.contains(plain_password, hashed_password):
+        return True
+    verified = await _run_password_job(verify_password, plain_password, hashed_password)
+    if verified:
+        credential_cache.add(plain_password, hashed_password)
+    return verified
+
+async def get_password_hash_async(password):
+    """Hashes a password on the bcrypt thread pool."""
+    return await _run_password_job(get_password_hash, password)
+
+def get_password_hash_stats() -> Dict[str, Any]:
+    """Returns the bcrypt pool size, the number of running or queued jobs and login cache counters."""
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "in_flight": _password_jobs_in_flight,
+        "login_cache": credential_cache.stats(),
+    }
+
+def encode_cursor(key: Tuple[dt.date, int]) -> str:
+    """Encodes an (attendance_date, record_id) keyset position as an opaque cursor string."""
+    attendance_date, record_id = key
+    return base64.urlsafe_b64encode(f"{attendance_date.isoformat()}|{record_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[dt.date, int]:
+    """Decodes a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, name, email, team_id, role, password_hash FROM employees WHERE email = %s;", (username,))
-            employee = cur.fetchone()
-            if employee:
-                return User(
-                    employee_id=employee[0],
-                    name=employee[1],
-                    email=employee[2],
-                    team_id=employee[3],
-                    role=employee[4],
-                    password_hash=employee[5]
-                )
-            else:
-                return None
-    except psycopg2.Error as e:
-        print(f"Error retrieving employee: {e}")
-        return None
-    finally:
-        if conn:
-            conn.close()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        attendance_date, record_id = raw.split("|")
+        return dt.date.fromisoformat(attendance_date), int(record_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _export_value(value: Any) -> Any:
+    """Converts dates, times and timestamps into ISO 8601 strings; other values pass through."""
+    if isinstance(value, (dt.date, dt.time)):
+        return value.isoformat()
+    return value
+
+def rows_to_ndjson(rows: List[Any], columns: List[str]) -> str:
+    """Serializes a batch of rows as newline-delimited JSON objects."""
+    return "".join(
+        json.dumps({column: _export_value(value) for column, value in zip(columns, row)}) + "\n"
+        for row in rows
+    )
+
+def rows_to_csv(rows: List[Any], columns: Optional[List[str]] = None) -> str:
+    """Serializes a batch of rows as CSV, preceded by a header line when columns are given."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if columns:
+        writer.writerow(columns)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def _parse_bulk_row(row: Dict[str, Any]) -> Tuple:
+    """Validates one uploaded attendance row and returns it as a staging tuple (without row number)."""
+    def field(name: str) -> Optional[str]:
+        value = row.get(name)
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value or None
+
+    employee_id = field('employee_id')
+    attendance_date = field('attendance_date')
+    status = field('status')
+    if employee_id is None or attendance_date is None or status is None:
+        raise ValueError("employee_id, attendance_date and status are required")
+    if status not in ATTENDANCE_STATUSES:
+        raise ValueError(f"Invalid status '{status}'; expected one of {', '.join(ATTENDANCE_STATUSES)}")
+    check_in_time = field('check_in_time')
+    check_out_time = field('check_out_time')
+    return (
+        int(employee_id),
+        dt.date.fromisoformat(attendance_date),
+        status,
+        dt.time.fromisoformat(check_in_time) if check_in_time else None,
+        dt.time.fromisoformat(check_out_time) if check_out_time else None,
+        field('notes'),
+    )
+
+def parse_attendance_rows(body: str, input_format: str) -> Tuple[List[Tuple], List[Dict[str, Any]]]:
+    """
+    Parses a bulk attendance upload in CSV (with a header line) or JSON-lines format.
+
+    Rows are numbered from 1 in upload order, excluding the CSV header and blank lines.
+    When the same (employee_id, attendance_date) appears more than once, the last row wins
+    and the earlier ones are reported as errors, since a single upsert cannot touch a
+    record twice.
+
+    Returns:
+        Tuple of (rows in db.BULK_ATTENDANCE_COLUMNS order, list of {'row', 'error'} dictionaries)
+    """
+    if input_format == 'csv':
+        raw_rows = csv.DictReader(io.StringIO(body))
+    elif input_format == 'ndjson':
+        raw_rows = (line for line in body.splitlines() if line.strip())
+    else:
+        raise ValueError(f"Unsupported format: {input_format}")
+
+    rows: Dict[Tuple[int, dt.date], Tuple] = {}
+    errors: List[Dict[str, Any]] = []
+    for row_number, raw_row in enumerate(raw_rows, start=1):
+        try:
+            if input_format == 'ndjson':
+                raw_row = json.loads(raw_row)
+                if not isinstance(raw_row, dict):
+                    raise ValueError("Each line must be a JSON object")
+            parsed = _parse_bulk_row(raw_row)
+        except (ValueError, TypeError) as e:
+            errors.append({'row': row_number, 'error': str(e)})
+            continue
+        key = parsed[:2]
+        if key in rows:
+            errors.append({'row': rows[key][0], 'error': f"Superseded by row {row_number} for the same employee and date"})
+        rows[key] = (row_number,) + parsed
+
+    errors.sort(key=lambda error: error['row'])
+    return list(rows.values()), errors
 
 def is_db_error(exception: Exception) -> bool:
     """
     Return True if the exception is a database connection or server error.
     In this case, we will check for HTTP exceptions with status code 500.
     """
-    return isinstance(exception, psycopg2.Error) or (isinstance(exception, HTTPException) and exception.status_code == 500)
+    return isinstance(exception, (psycopg2.Error, asyncpg.PostgresError)) or (isinstance(exception, HTTPException) and exception.status_code == 500)
 
-def summarize_attendance(records: List[AttendanceRecord], timeframe: str) -> str:
-    """Summarizes attendance records for a given timeframe."""
-    if not records:
+def summarize_attendance(counts: Dict[str, int], timeframe: str) -> str:
+    """Summarizes the status counts returned by get_attendance_summary_counts for a given timeframe."""
+    if not counts or not counts.get('total'):
         return f"No attendance records found for {timeframe}."
 
-    total_records = len(records)
-    present_count = sum(1 for record in records if record['status'] == 'Present')
-    absent_count = sum(1 for record in records if record['status'] == 'Absent')
-    wfh_count = sum(1 for record in records if record['status'] == 'WFH')
-    leave_count = sum(1 for record in records if record['status'] == 'Leave')
-
     summary = (
-        f"Total Records: {total_records}\n"
-        f"Present: {present_count}\n"
-        f"Absent: {absent_count}\n"
-        f"WFH: {wfh_count}\n"
-        f"Leave: {leave_count}\n"
+        f"Total Records: {counts['total']}\n"
+        f"Present: {counts['Present']}\n"
+        f"Absent: {counts['Absent']}\n"
+        f"WFH: {counts['WFH']}\n"
+        f"Leave: {counts['Leave']}\n"
     )
 
     return summary
 
+_RELATIVE_TIMEFRAME = re.compile(r"^(?:last|past) (\d+) (day|week|month)s?$")
+
+def resolve_timeframe(timeframe: str, today: Optional[dt.date] = None) -> Tuple[dt.date, dt.date]:
+    """
+    Translates a relative timeframe into an inclusive (start_date, end_date) range.
+
+    Supported: "today", "yesterday", "last week" (7 days), "last month" (30 days),
+    "last N days|weeks|months", and the calendar periods "this week|month|quarter|year".
+
+    Raises:
+        ValueError: If the timeframe is not recognised
+    """
+    today = today or datetime.now().date()
+    timeframe = " ".join(timeframe.lower().split())
+
+    if timeframe == "today":
+        return today, today
+    if timeframe == "yesterday":
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if timeframe == "last week":
+        return today - timedelta(days=7), today
+    if timeframe == "last month":
+        return today - timedelta(days=30), today
+    if timeframe == "this week":
+        return today - timedelta(days=today.weekday()), today
+    if timeframe == "this month":
+        return today.replace(day=1), today
+    if timeframe == "this quarter":
+        return today.replace(month=3 * ((today.month - 1) // 3) + 1, day=1), today
+    if timeframe == "this year":
+        return today.replace(month=1, day=1), today
+
+    match = _RELATIVE_TIMEFRAME.match(timeframe)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        days = count * {"day": 1, "week": 7, "month": 30}[unit]
+        return today - timedelta(days=days), today
+
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
 def get_attendance_data(timeframe: str, columns: Optional[List[str]] = None) -> str:
     """
     Retrieves attendance data for a specific timeframe.
 
     Args:
-        timeframe (str): The timeframe for which to retrieve attendance data (e.g., "last week", "last month", "today").
+        timeframe (str): The timeframe for which to retrieve attendance data (e.g., "today", "yesterday",
+            "last week", "last month", "last 14 days", "this month", "this quarter", "this year").
         columns (Optional[List[str]], optional): The columns to include in the output. Defaults to None (all columns).
 
     Returns:
         str: A string representation of the attendance data.
     """
-    today = datetime.now().date()
-    all_records = get_all_attendance_records()
-
-    if timeframe == "last week":
-        start_date = today - timedelta(days=7)
-        filtered_records = [
-            record for record in all_records
-            if start_date <= record["attendance_date"] <= today
-        ]
-    elif timeframe == "last month":
-        start_date = today - timedelta(days=30)
-        filtered_records = [
-            record for record in all_records
-            if start_date <= record["attendance_date"] <= today
-        ]
-    elif timeframe == "today":
-        filtered_records = [
-            record for record in all_records
-            if record["attendance_date"] == today
-        ]
-    else:
-        return "Invalid timeframe. Supported timeframes: last week, last month, today."
+    try:
+        start_date, end_date = resolve_timeframe(timeframe)
+    except ValueError:
+        return (
+            "Invalid timeframe. Supported timeframes: today, yesterday, last week, last month, "
+            "last N days/weeks/months, this week, this month, this quarter, this year."
+        )
 
-    if not filtered_records:
+    selected, rows = get_attendance_columns_by_date_range(start_date, end_date, columns)
+    if not rows:
         return f"No attendance records found for {timeframe}."
 
-    output = ""
-    for record in filtered_records:
-        record_str = ", ".join(f"{col}: {record[col]}" for col in record if columns is None or col in columns)
-        output += f"({record_str})\n"
-
-    return output
\ No newline at end of file
+    return "".join(
+        "(" + ", ".join(f"{column}: {value}" for column, value in zip(selected, row)) + ")\n"
+        for row in rows
+    )
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .cache import principal_cache, trends_cache
+
+# Cache invalidation events. The db write functions apply an event to the local caches after
+# committing and publish it with pg_notify in the same transaction; every worker runs an
+# InvalidationListener that applies events published by the others. Events are dictionaries:
+#   {"entity": "team", "team_id": 3, "action": "updated"}
+#   {"entity": "employee", "employee_id": 7, "action": "deleted"}
+#   {"entity": "attendance", "dates": ["2025-04-01"], "employee_ids": [7], "team_ids": [3]}
+#   {"entity": "all"}
+# For attendance, "dates" may be replaced by "date_range": [first, last] and employee_ids or
+# team_ids may be null (unknown) to keep large bulk loads under the NOTIFY payload limit.
+
+NOTIFY_ENABLED = os.getenv("CACHE_NOTIFY_ENABLED", "true").lower() == "true"
+NOTIFY_CHANNEL = os.getenv("CACHE_NOTIFY_CHANNEL", "attendops_cache")
+
+# Identifies this process so the listener can skip events it already applied locally
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Above this many dates or ids an attendance event is sent in its compact form
+MAX_EVENT_KEYS = 200
+
+_handlers: List[Callable[[Dict[str, Any]], None]] = []
+
+def on_invalidation(handler: Callable[[Dict[str, Any]], None]) -> Callable[[Dict[str, Any]], None]:
+    """Registers a function called with every event, local or remote. Usable as a decorator."""
+    _handlers.append(handler)
+    return handler
+
+def team_event(team_id: int, action: str) -> Dict[str, Any]:
+    """Event for a created, updated or deleted team."""
+    return {"entity": "team", "team_id": team_id, "action": action}
+
+def employee_event(employee_id: int, action: str) -> Dict[str, Any]:
+    """Event for a created, updated or deleted employee."""
+    return {"entity": "employee", "employee_id": employee_id, "action": action}
+
+def attendance_event(
+    dates: Iterable[date],
+    employee_ids: Optional[Iterable[int]] = None,
+    team_ids: Optional[Iterable[Optional[int]]] = None,
+) -> Dict[str, Any]:
+    """Event for attendance records written on the given dates; None ids mean unknown."""
+    dates = sorted(set(dates))
+    event: Dict[str, Any] = {"entity": "attendance"}
+    if len(dates) > MAX_EVENT_KEYS:
+        event["date_range"] = [dates[0].isoformat(), dates[-1].isoformat()]
+    else:
+        event["dates"] = [changed.isoformat() for changed in dates]
+    for name, ids in (("employee_ids", employee_ids), ("team_ids", team_ids)):
+        ids = None if ids is None else sorted(set(ids), key=lambda value: (value is None, value))
+        event[name] = ids if ids is None or len(ids) <= MAX_EVENT_KEYS else None
+    return event
+
+def _event_dates(event: Dict[str, Any]) -> List[date]:
+    if "date_range" in event:
+        first, last = (date.fromisoformat(value) for value in event["date_range"])
+        return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    return [date.fromisoformat(value) for value in event.get("dates", [])]
+
+@on_invalidation
+def _invalidate_auth_and_trends(event: Dict[str, Any]) -> None:
+    entity = event.get("entity")
+    action = event.get("action")
+    if entity == "attendance":
+        trends_cache.invalidate_attendance(_event_dates(event), event.get("employee_ids"), event.get("team_ids"))
+    elif entity == "team":
+        if action == "updated":
+            trends_cache.invalidate_group("team")
+        elif action == "deleted":
+            # Members of the team now have team_id NULL (ON DELETE SET NULL)
+            principal_cache.clear()
+            trends_cache.clear()
+    elif entity == "employee":
+        if action in ("updated", "deleted"):
+            principal_cache.invalidate(employee_id=event.get("employee_id"))
+        if action == "updated":
+            # A name or team change can alter any cached grouping
+            trends_cache.clear()
+    elif entity == "all":
+        principal_cache.clear()
+        trends_cache.clear()
+
+def apply_event(event: Dict[str, Any]) -> None:
+    """Evicts the entries affected by an event from this process's caches."""
+    for handler in _handlers:
+        try:
+            handler(event)
+        except Exception as e:
+            logging.error(f"Error applying cache invalidation {event}: {e}")
+
+def encode_event(event: Dict[str, Any]) -> str:
+    """Serialises an event as a NOTIFY payload tagged with this worker's id."""
+    return json.dumps({**event, "origin": WORKER_ID}, separators=(",", ":"))
+
+
+class InvalidationListener:
+    """
+    Background task that LISTENs for invalidation events from other workers.
+
+    Runs on a dedicated connection outside the pool. If the connection is lost it is
+    re-established with exponential backoff, and all caches are cleared on reconnect since
+    events sent in the meantime were missed. The connection is pinged every
+    ``keepalive`` seconds so a silently dropped socket is noticed.
+
+    Args:
+        connect (Callable[[], Awaitable[Any]]): Coroutine factory returning an asyncpg connection
+        channel (str): NOTIFY channel to listen on
+        keepalive (float): Seconds between liveness checks of the connection
+    """
+
+    def __init__(self, connect: Callable[[], Awaitable[Any]], channel: str = NOTIFY_CHANNEL, keepalive: float = 30.0):
+        self.connect = connect
+        self.channel = channel
+        self.keepalive = keepalive
+        self._task: Optional[asyncio.Task] = None
+        self._connected = False
+        self._received = 0
+        self._applied = 0
+        self._reconnects = 0
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self._received += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logging.error(f"Ignoring malformed cache invalidation payload: {payload}")
+            return
+        if event.get("origin") == WORKER_ID:
+            return
+        apply_event(event)
+        self._applied += 1
+
+    async def _listen_once(self) -> None:
+        conn = await self.connect()
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda _: lost.set())
+        try:
+            await conn.add_listener(self.channel, self._on_notification)
+            self._connected = True
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    await conn.execute("SELECT 1;")
+        finally:
+            self._connected = False
+            if not conn.is_closed():
+                await conn.close()
+
+    async def _run(self) -> None:
+        delay = 1.0
+        first_attempt = True
+        while True:
+            if not first_attempt:
+                # Events published while we were not listening are lost
+                apply_event({"entity": "all"})
+            first_attempt = False
+            try:
+                await self._listen_once()
+                delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Cache invalidation listener disconnected: {e}")
+            self._reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def start(self) -> None:
+        """Starts listening in the background; does nothing if notifications are disabled."""
+        if NOTIFY_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the listener and closes its connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns connection state and event counters."""
+        return {
+            "enabled": NOTIFY_ENABLED,
+            "channel": self.channel,
+            "worker_id": WORKER_ID,
+            "connected": self._connected,
+            "received": self._received,
+            "applied": self._applied,
+            "reconnects": self._reconnects,
+        }
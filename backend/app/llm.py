@@ -0,0 +1,345 @@
+import asyncio
+import contextvars
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.events.llm import LLMChatEndEvent
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import ToolSelection
+from llama_index.core.tools import BaseTool
+from pydantic import Field, PrivateAttr
+
+from .tooloutput import estimate_tokens
+
+# LLM backends of the AI agent workflow. "gemini" is the production model; "scripted" replays
+# recorded tool-call plans from a JSON file without any network access, so the agent path can
+# be load-tested, profiled and benchmarked offline (see agent_benchmark.py).
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_PLANS_FILE = os.getenv(
+    "LLM_PLANS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mock_data", "agent_plans.json"),
+)
+# Simulated model latency per scripted LLM call, in seconds
+SCRIPTED_LLM_LATENCY = float(os.getenv("SCRIPTED_LLM_LATENCY", "0"))
+
+NO_PLAN_RESPONSE = "I have no recorded plan for this question."
+PLAN_EXHAUSTED_RESPONSE = "The recorded plan for this question has no further steps."
+
+
+def _normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+
+def load_plans(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Reads recorded plans from a JSON file.
+
+    The file holds a list of {"question": str, "steps": [...]} objects. Each step is one LLM
+    reply: {"tool_calls": [{"name": str, "kwargs": {...}}]} or {"text": str}, optionally with
+    the "agent" that makes it and a "latency" in seconds overriding the default.
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return {_normalize_question(entry["question"]): entry["steps"] for entry in entries}
+
+
+def _tool_calls(message: ChatMessage) -> List[Tuple[str, Dict[str, Any]]]:
+    calls = []
+    for call in message.additional_kwargs.get("tool_calls", []) or []:
+        # ToolSelection objects while live, plain dicts after a context round trip
+        if isinstance(call, dict):
+            calls.append((call.get("tool_name"), call.get("tool_kwargs") or {}))
+        else:
+            calls.append((call.tool_name, call.tool_kwargs))
+    return calls
+
+
+class ScriptedLLM(FunctionCallingLLM):
+    """
+    Deterministic function-calling LLM that replays recorded plans instead of calling a model.
+
+    The plan is chosen by the latest user message. Which of its steps comes next is derived
+    from the conversation itself (the replies and handoffs already made this turn), so one
+    instance serves any number of concurrent conversations. Steps tagged with an "agent" are
+    only played by that agent: when a turn starts at a specialist through direct routing, the
+    manager's delegation steps are skipped.
+
+    Args:
+        plans (Dict[str, List[Dict]]): Steps per normalized question, see load_plans()
+        latency (float): Seconds each call waits before answering, to simulate the model
+    """
+
+    plans: Dict[str, List[Dict[str, Any]]] = Field(default_factory=dict)
+    latency: float = Field(default=0.0, ge=0.0)
+    _agents: Dict[str, str] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def from_file(cls, path: str, latency: float = 0.0) -> "ScriptedLLM":
+        return cls(plans=load_plans(path), latency=latency)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ScriptedLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(is_function_calling_model=True, model_name="scripted")
+
+    def bind_agents(self, agents: Iterable[Any]) -> None:
+        """Tells the agents apart by their system prompts so agent-tagged steps can be matched."""
+        self._agents = {agent.system_prompt: agent.name for agent in agents if agent.system_prompt}
+
+    def _agent_segments(self, steps: List[Dict[str, Any]]) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        # Consecutive steps of the same agent; untagged steps belong to the preceding agent
+        segments: List[Tuple[Optional[str], List[Dict[str, Any]]]] = []
+        for step in steps:
+            agent = step.get("agent", segments[-1][0] if segments else None)
+            if segments and segments[-1][0] == agent:
+                segments[-1][1].append(step)
+            else:
+                segments.append((agent, [step]))
+        return segments
+
+    def _next_step(self, messages: Sequence[ChatMessage]) -> Dict[str, Any]:
+        question = next((index for index in range(len(messages) - 1, -1, -1) if messages[index].role == MessageRole.USER), None)
+        if question is None:
+            return {"text": NO_PLAN_RESPONSE}
+        steps = self.plans.get(_normalize_question(messages[question].content or ""))
+        if not steps:
+            return {"text": NO_PLAN_RESPONSE}
+
+        agent = None
+        if messages and messages[0].role == MessageRole.SYSTEM:
+            agent = self._agents.get(messages[0].content)
+
+        # Agents the turn was handed to so far, and replies made since the last handoff
+        handoffs: List[str] = []
+        replies = 0
+        for message in messages[question + 1:]:
+            if message.role != MessageRole.ASSISTANT:
+                continue
+            replies += 1
+            for name, kwargs in _tool_calls(message):
+                if name == "handoff":
+                    handoffs.append(kwargs.get("to_agent"))
+                    replies = 0
+
+        segments = self._agent_segments(steps)
+        # Leading segments skipped because the turn did not start at their agent
+        start = 0
+        if handoffs:
+            start = next((index for index in range(len(segments) - 1) if segments[index + 1][0] in (None, handoffs[0])), 0)
+        elif agent is not None:
+            start = next((index for index, (owner, _) in enumerate(segments) if owner in (None, agent)), 0)
+        position = start + len(handoffs)
+        if position < len(segments) and replies < len(segments[position][1]):
+            return segments[position][1][replies]
+        return {"text": PLAN_EXHAUSTED_RESPONSE}
+
+    def _response(self, step: Dict[str, Any], messages: Sequence[ChatMessage]) -> ChatResponse:
+        if "tool_calls" in step:
+            calls = [
+                ToolSelection(
+                    tool_id=f"call_{len(messages)}_{index}",
+                    tool_name=call["name"],
+                    tool_kwargs=call.get("kwargs", {}),
+                )
+                for index, call in enumerate(step["tool_calls"])
+            ]
+            message = ChatMessage(role=MessageRole.ASSISTANT, content="", additional_kwargs={"tool_calls": calls})
+            return ChatResponse(message=message, delta="")
+        text = step.get("text", "")
+        return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=text), delta=text)
+
+    def _chunks(self, response: ChatResponse) -> Iterator[ChatResponse]:
+        # Text is streamed word by word like a real model; tool calls arrive in one piece
+        text = response.message.content or ""
+        if not text:
+            yield response
+            return
+        content = ""
+        for delta in re.findall(r"\S+\s*", text):
+            content += delta
+            yield ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=content), delta=delta)
+
+    def _prepare_chat_with_tools(
+        self,
+        tools: Sequence[BaseTool],
+        user_msg: Optional[Any] = None,
+        chat_history: Optional[List[ChatMessage]] = None,
+        verbose: bool = False,
+        allow_parallel_tool_calls: bool = False,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        messages = list(chat_history or [])
+        if user_msg is not None:
+            messages.append(ChatMessage(role=MessageRole.USER, content=user_msg) if isinstance(user_msg, str) else user_msg)
+        return {"messages": messages, "tools": tools}
+
+    def get_tool_calls_from_response(self, response: ChatResponse, error_on_no_tool_call: bool = True, **kwargs: Any) -> List[ToolSelection]:
+        calls = response.message.additional_kwargs.get("tool_calls", [])
+        if not calls and error_on_no_tool_call:
+            raise ValueError("Expected at least one tool call, but got 0 tool calls.")
+        return calls
+
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        step = self._next_step(messages)
+        time.sleep(step.get("latency", self.latency))
+        return self._response(step, messages)
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        step = self._next_step(messages)
+        await asyncio.sleep(step.get("latency", self.latency))
+        return self._response(step, messages)
+
+    @llm_chat_callback()
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        step = self._next_step(messages)
+
+        def gen() -> ChatResponseGen:
+            time.sleep(step.get("latency", self.latency))
+            yield from self._chunks(self._response(step, messages))
+
+        return gen()
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        step = self._next_step(messages)
+
+        async def gen() -> ChatResponseAsyncGen:
+            await asyncio.sleep(step.get("latency", self.latency))
+            for chunk in self._chunks(self._response(step, messages)):
+                yield chunk
+
+        return gen()
+
+    def _complete(self, prompt: str) -> CompletionResponse:
+        response = self._response(self._next_step([ChatMessage(role=MessageRole.USER, content=prompt)]), [])
+        return CompletionResponse(text=response.message.content or "")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self._complete(prompt)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self._complete(prompt)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        response = self._complete(prompt)
+
+        def gen() -> CompletionResponseGen:
+            yield CompletionResponse(text=response.text, delta=response.text)
+
+        return gen()
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        response = self._complete(prompt)
+
+        async def gen() -> CompletionResponseAsyncGen:
+            yield CompletionResponse(text=response.text, delta=response.text)
+
+        return gen()
+
+
+def create_llm(backend: Optional[str] = None) -> FunctionCallingLLM:
+    """
+    Creates the LLM used by the agents.
+
+    Args:
+        backend (str, optional): "gemini" or "scripted"; defaults to LLM_BACKEND
+    """
+    backend = (backend or LLM_BACKEND).lower()
+    if backend == "gemini":
+        # from llama_index.llms.google_genai import GoogleGenAI
+        from llama_index.llms.gemini import Gemini
+        return Gemini()
+    if backend == "scripted":
+        return ScriptedLLM.from_file(LLM_PLANS_FILE, latency=SCRIPTED_LLM_LATENCY)
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+
+class LLMUsage:
+    """LLM calls and estimated prompt/completion tokens counted while a track_usage() block is active."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "llm_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+_current_usage: contextvars.ContextVar[Optional[LLMUsage]] = contextvars.ContextVar("llm_usage", default=None)
+
+
+def _message_text(message: ChatMessage) -> str:
+    calls = _tool_calls(message)
+    return (message.content or "") + (json.dumps(calls, default=str) if calls else "")
+
+
+class _UsageHandler(BaseEventHandler):
+    @classmethod
+    def class_name(cls) -> str:
+        return "LLMUsageHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> None:
+        usage = _current_usage.get()
+        if usage is None or not isinstance(event, LLMChatEndEvent):
+            return
+        usage.calls += 1
+        usage.prompt_tokens += sum(estimate_tokens(_message_text(message)) for message in event.messages)
+        if event.response is not None:
+            usage.completion_tokens += estimate_tokens(_message_text(event.response.message))
+
+
+_usage_handler: Optional[_UsageHandler] = None
+
+
+@contextmanager
+def track_usage() -> Iterator[LLMUsage]:
+    """
+    Counts the LLM calls made by work started inside the block, including agent workflow runs.
+
+    Tokens are estimated from message text at tooloutput.CHARS_PER_TOKEN characters per token,
+    the same for every backend, so counts are comparable between runs; tool schemas are not
+    included.
+    """
+    global _usage_handler
+    if _usage_handler is None:
+        _usage_handler = _UsageHandler()
+        get_dispatcher().add_event_handler(_usage_handler)
+    usage = LLMUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
@@ -1,8 +1,11 @@
 from datetime import date, time
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 
 class Employee(BaseModel):
+    # Lets routers return the compact rows from rows.py directly
+    model_config = ConfigDict(from_attributes=True)
+
     employee_id: int
     name: str
     email: str
@@ -26,6 +29,9 @@ class User(Employee):
     password_hash: str
 
 class Team(BaseModel):
+    # Lets routers return the compact rows from rows.py directly
+    model_config = ConfigDict(from_attributes=True)
+
     team_id: int
     team_name: str
     created_at: date
@@ -35,6 +41,9 @@ class TeamCRUD(BaseModel):
     team_name: str
 
 class AttendanceRecord(BaseModel):
+    # Lets routers return the compact rows from rows.py directly
+    model_config = ConfigDict(from_attributes=True)
+
     record_id: int
     employee_id: int
     attendance_date: date
@@ -51,12 +60,42 @@ class AttendanceRecordCRUD(BaseModel):
     check_out_time: Optional[time]
     notes: Optional[str]
 
+class AttendancePage(BaseModel):
+    """One page of attendance records with the cursor for the next page"""
+    items: List[AttendanceRecord]
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None
+
+class BulkRowError(BaseModel):
+    """A rejected row of a bulk attendance upload"""
+    row: int
+    error: str
+
+class BulkAttendanceResult(BaseModel):
+    """Outcome of a bulk attendance upload"""
+    inserted: int
+    updated: int
+    errors: List[BulkRowError]
+
 class AttendanceSummary(BaseModel):
     yesterday_summary: str
     last_week_summary: str
 
+class AttendanceGap(BaseModel):
+    """A working day on which an employee has no attendance record"""
+    model_config = ConfigDict(from_attributes=True)
+
+    employee_id: int
+    name: str
+    email: str
+    team_id: Optional[int]
+    role: str
+    attendance_date: date
+
 class TrendResult(BaseModel):
     """Data model for attendance trend results"""
+    model_config = ConfigDict(from_attributes=True)
+
     team_id: Optional[int] = None
     team_name: Optional[str] = None
     employee_id: Optional[int] = None
@@ -65,4 +104,42 @@ class TrendResult(BaseModel):
     count: int
     percentage: float
     earliest_date: Optional[date] = None
-    latest_date: Optional[date] = None
\ No newline at end of file
+    latest_date: Optional[date] = None
+
+class AnalyticsEmployee(BaseModel):
+    """Working-day attendance metrics of one employee"""
+    employee_id: int
+    name: str
+    team_id: Optional[int] = None
+    working_days: int
+    expected_days: int
+    attended: int
+    absent: int
+    leave: int
+    wfh: int
+    missing: int
+    attendance_rate: Optional[float] = None
+    recent_rate: Optional[float] = None
+    longest_absence_streak: int
+    current_presence_streak: int
+
+class AnalyticsDay(BaseModel):
+    """Attendance across all employees on one date"""
+    date: date
+    expected: int
+    attended: int
+    rate: Optional[float] = None
+    rolling_rate: Optional[float] = None
+
+class AttendanceAnalytics(BaseModel):
+    """Working-day attendance analytics for a date range"""
+    start_date: date
+    end_date: date
+    window: int
+    employee_count: int
+    expected_days: int
+    attended_days: int
+    missing_records: int
+    attendance_rate: Optional[float] = None
+    daily: List[AnalyticsDay]
+    employees: List[AnalyticsEmployee]
@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection could be checked out before the timeout expired."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections shared by the whole process.
+
+    Connections are opened lazily up to ``max_size`` and kept warm down to ``min_size``.
+    On checkout, connections that have been idle for longer than ``check_after`` seconds
+    are pinged with ``SELECT 1`` and replaced if broken, and connections older than
+    ``max_lifetime`` seconds are recycled. Callers that find the pool saturated wait
+    up to ``timeout`` seconds for a connection to be returned.
+
+    Args:
+        min_size (int): Number of connections kept open while idle
+        max_size (int): Upper bound on simultaneously open connections
+        max_lifetime (float): Seconds after which a connection is closed and replaced
+        max_idle (float): Seconds an idle connection above ``min_size`` is kept before closing
+        check_after (float): Idle seconds after which a connection is health-checked on checkout
+        timeout (float): Seconds to wait for a free connection before raising PoolTimeout
+        **connect_kwargs: Keyword arguments forwarded to ``psycopg2.connect``
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        check_after: float = 10.0,
+        timeout: float = 30.0,
+        **connect_kwargs: Any,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        # Idle connections as (connection, created_at, returned_at), most recently returned last
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        # Counters exposed through stats()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._connections_created = 0
+        self._connections_recycled = 0
+        self._health_check_failures = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._connections_created += 1
+        return conn
+
+    def _discard(self, conn) -> None:
+        """Closes a connection and releases its slot. Must be called with the lock held."""
+        self._created_at.pop(id(conn), None)
+        self._size -= 1
+        self._cond.notify()
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_expired(self, conn, now: float) -> bool:
+        created_at = self._created_at.get(id(conn), now)
+        return self.max_lifetime > 0 and now - created_at >= self.max_lifetime
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if idle_for < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def open(self) -> None:
+        """Opens ``min_size`` connections up front so the first requests do not pay for them."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                logging.error(f"Error warming up connection pool: {e}")
+                return
+            with self._cond:
+                self._idle.append((conn, self._created_at[id(conn)], time.monotonic()))
+                self._cond.notify()
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Checks out a healthy connection, waiting for one to be returned if the pool is saturated."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            conn = None
+            returned_at = 0.0
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+                    if self._idle:
+                        conn, _, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"Timed out after {timeout}s waiting for a database connection")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                now = time.monotonic()
+                if self._is_expired(conn, now):
+                    with self._cond:
+                        self._connections_recycled += 1
+                        self._discard(conn)
+                    continue
+                if not self._is_healthy(conn, now - returned_at):
+                    with self._cond:
+                        self._health_check_failures += 1
+                        self._discard(conn)
+                    continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+            return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """Returns a connection to the pool, rolling back any open transaction first."""
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        now = time.monotonic()
+        with self._cond:
+            if discard or conn.closed or self._closed or self._is_expired(conn, now):
+                if not discard and not conn.closed and not self._closed:
+                    self._connections_recycled += 1
+                self._discard(conn)
+                return
+            self._idle.append((conn, self._created_at.get(id(conn), now), now))
+            self._trim_idle(now)
+            self._cond.notify()
+
+    def _trim_idle(self, now: float) -> None:
+        """Closes connections idle for longer than ``max_idle`` while above ``min_size``. Lock must be held."""
+        if self.max_idle <= 0:
+            return
+        while self._size > self.min_size and self._idle and now - self._idle[0][2] >= self.max_idle:
+            conn, _, _ = self._idle.popleft()
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Context manager that checks out a connection and always returns it to the pool.
+
+        Any transaction left open is rolled back on exit, so callers only need to commit
+        their writes. Connections broken by an error are discarded instead of reused.
+        """
+        conn = self.getconn(timeout=timeout)
+        try:
+            yield conn
+        except BaseException:
+            broken = conn.closed != 0
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            self.putconn(conn, discard=broken)
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns pool size, saturation and wait-time counters."""
+        with self._cond:
+            in_use = self._size - len(self._idle)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "saturation": round(in_use / self.max_size, 3),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "connections_created": self._connections_created,
+                "connections_recycled": self._connections_recycled,
+                "health_check_failures": self._health_check_failures,
+            }
+
+    def close(self) -> None:
+        """Closes all idle connections; connections still checked out are closed when returned."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
@@ -0,0 +1,86 @@
+import re
+import threading
+import time
+from typing import Any, Dict, Sequence, Set, Tuple
+
+import psycopg2.extensions
+
+
+def to_numbered_placeholders(query: str) -> str:
+    """Rewrites psycopg2-style %s placeholders as server-side $1, $2, ..."""
+    counter = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which registry statements it has prepared."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: Set[str] = set()
+
+
+class StatementRegistry:
+    """
+    Named server-side prepared statements for the hot queries of the sync data-access layer.
+
+    Statements are registered once at import time and prepared lazily, the first time each
+    pooled connection runs them (PREPARE lasts for the session, so a recycled connection
+    simply prepares again). Later calls send only EXECUTE with the parameters, skipping
+    parse and plan on the server. With ``enabled`` False the same SQL is sent as plain text,
+    and per-statement latency is recorded for both modes so they can be compared.
+
+    Args:
+        enabled (bool): Use prepared statements; False sends the SQL text on every call
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._statements: Dict[str, Tuple[str, str, int]] = {}
+        self._lock = threading.Lock()
+        # (name, mode) -> [calls, total seconds]
+        self._timings: Dict[Tuple[str, str], list] = {}
+
+    def register(self, name: str, query: str) -> str:
+        """Registers a query written with %s placeholders under a name and returns the name."""
+        self._statements[name] = (query, to_numbered_placeholders(query).rstrip().rstrip(";"), query.count("%s"))
+        return name
+
+    def execute(self, cur, name: str, params: Sequence[Any] = ()) -> None:
+        """Runs a registered statement on the cursor, preparing it on the connection first if needed."""
+        query, prepared_query, param_count = self._statements[name]
+        conn = cur.connection
+        started = time.perf_counter()
+        if self.enabled and isinstance(conn, PreparedConnection):
+            if name not in conn.prepared_statements:
+                cur.execute(f"PREPARE {name} AS {prepared_query};")
+                conn.prepared_statements.add(name)
+            if param_count:
+                cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * param_count)});", params)
+            else:
+                cur.execute(f"EXECUTE {name};")
+            mode = "prepared"
+        else:
+            cur.execute(query, params)
+            mode = "planned"
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            timing = self._timings.setdefault((name, mode), [0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+
+    def reset_stats(self) -> None:
+        """Clears the recorded latencies."""
+        with self._lock:
+            self._timings.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns call counts and mean latency per statement and mode."""
+        with self._lock:
+            statements: Dict[str, Dict[str, Any]] = {}
+            for (name, mode), (calls, total) in sorted(self._timings.items()):
+                statements.setdefault(name, {})[mode] = {
+                    "calls": calls,
+                    "avg_ms": round(total * 1000 / calls, 3) if calls else 0.0,
+                }
+            return {"enabled": self.enabled, "statements": statements}
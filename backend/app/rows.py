@@ -0,0 +1,74 @@
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+
+@lru_cache(maxsize=None)
+def row_class(columns: Tuple[str, ...]) -> type:
+    """
+    Returns the compact row type for a column list, creating it on first use.
+
+    Rows are namedtuples, so each one costs a single tuple allocation instead of a dict.
+    They also answer ``row['column']``, ``keys()`` and ``get()`` like the dicts the db
+    functions used to return, which keeps ``Model(**row)`` and key lookups working, and
+    Pydantic/FastAPI read them through attribute access (``from_attributes``) without an
+    intermediate dict. Iterating a row yields its values, as with any tuple.
+    """
+    base = namedtuple("Row", columns)
+
+    class Row(base):
+        __slots__ = ()
+
+        def __getitem__(self, key):
+            if isinstance(key, str):
+                try:
+                    return getattr(self, key)
+                except AttributeError:
+                    raise KeyError(key) from None
+            return base.__getitem__(self, key)
+
+        def __contains__(self, key) -> bool:
+            return key in self._fields
+
+        def keys(self) -> Tuple[str, ...]:
+            return self._fields
+
+        def get(self, key: str, default: Any = None) -> Any:
+            return getattr(self, key, default) if key in self._fields else default
+
+        def __repr__(self) -> str:
+            return repr(self._asdict())
+
+    return Row
+
+
+def make_rows(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[Any]:
+    """Wraps raw result tuples (or asyncpg Records) in the row type for ``columns``."""
+    return list(map(row_class(tuple(columns))._make, rows))
+
+
+def fetch_rows(cur) -> List[Any]:
+    """Fetches all remaining rows of a psycopg2 cursor as compact rows named after its columns."""
+    return make_rows([column[0] for column in cur.description], cur.fetchall())
+
+
+def fetch_row(cur) -> Optional[Any]:
+    """Fetches the next row of a psycopg2 cursor as a compact row, or None."""
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return row_class(tuple(column[0] for column in cur.description))._make(row)
+
+
+def records_to_rows(records: Sequence[Any]) -> List[Any]:
+    """Converts asyncpg Records to compact rows, using the column names of the first record."""
+    if not records:
+        return []
+    return make_rows(list(records[0].keys()), records)
+
+
+def record_to_row(record: Optional[Any]) -> Optional[Any]:
+    """Converts a single asyncpg Record to a compact row, passing None through."""
+    if record is None:
+        return None
+    return row_class(tuple(record.keys()))._make(record)
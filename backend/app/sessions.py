@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+SessionKey = Tuple[int, str]
+
+
+class SessionBusyError(Exception):
+    """Raised when a conversation already runs its maximum number of concurrent turns."""
+
+
+class ChatSession:
+    """
+    One conversation of one user: the agent workflow context and its turn limiter.
+
+    Attributes:
+        key (SessionKey): (employee_id, conversation_id)
+        context (Any): Workflow context carried between turns, None before the first turn
+        turns (int): Completed turns since the session was loaded
+        ended (bool): Set by SessionStore.end(); turns still running are no longer persisted
+    """
+
+    def __init__(self, key: SessionKey, concurrency: int):
+        self.key = key
+        self.context: Any = None
+        self.turns = 0
+        self.last_used = time.monotonic()
+        self.loaded = False
+        self.ended = False
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._active = 0
+        self._waiting = 0
+
+    @property
+    def busy(self) -> bool:
+        return self._active > 0 or self._waiting > 0
+
+
+class SessionStore:
+    """
+    Live chat sessions keyed by (user, conversation id).
+
+    Sessions are kept in an LRU bounded by ``maxsize`` and dropped after ``idle_ttl`` seconds
+    without a turn; sessions with a turn in flight are never evicted. Each session admits at
+    most ``concurrency`` turns at once, later requests wait up to ``wait_timeout`` seconds and
+    then fail with SessionBusyError, while different conversations run fully in parallel. With
+    the default of 1 a conversation's context is never advanced by two turns at the same time;
+    higher values let concurrent turns start from the same context, and the last to finish wins.
+
+    With ``load``/``save``/``delete`` callbacks the context is written through after every turn
+    and read back when an evicted or unknown session is resumed, e.g. by another worker.
+
+    Args:
+        maxsize (int): Live sessions kept in memory
+        idle_ttl (float): Seconds a session may stay unused before eviction
+        concurrency (int): Turns a single session may run concurrently
+        wait_timeout (float): Seconds a turn waits for a busy session
+        load (Callable, optional): async (employee_id, conversation_id) -> context or None
+        save (Callable, optional): async (employee_id, conversation_id, context) -> None
+        delete (Callable, optional): async (employee_id, conversation_id) -> None
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        idle_ttl: float = 1800.0,
+        concurrency: int = 1,
+        wait_timeout: float = 30.0,
+        load: Optional[Callable[[int, str], Awaitable[Any]]] = None,
+        save: Optional[Callable[[int, str, Any], Awaitable[None]]] = None,
+        delete: Optional[Callable[[int, str], Awaitable[None]]] = None,
+    ):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self.concurrency = max(concurrency, 1)
+        self.wait_timeout = wait_timeout
+        self.load = load
+        self.save = save
+        self.delete = delete
+        self._sessions: "OrderedDict[SessionKey, ChatSession]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._rejected = 0
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key, session in list(self._sessions.items()):
+            if now - session.last_used <= self.idle_ttl:
+                break
+            if not session.busy:
+                del self._sessions[key]
+                self._evictions += 1
+        if len(self._sessions) > self.maxsize:
+            for key, session in list(self._sessions.items()):
+                if len(self._sessions) <= self.maxsize:
+                    break
+                if not session.busy:
+                    del self._sessions[key]
+                    self._evictions += 1
+
+    def _get(self, key: SessionKey) -> ChatSession:
+        session = self._sessions.get(key)
+        if session is None:
+            self._misses += 1
+            session = self._sessions[key] = ChatSession(key, self.concurrency)
+            self._evict()
+        else:
+            self._hits += 1
+            self._sessions.move_to_end(key)
+        return session
+
+    async def acquire(self, employee_id: int, conversation_id: str) -> ChatSession:
+        """
+        Starts a turn of a conversation, creating or resuming its session.
+
+        Waits up to ``wait_timeout`` seconds for a turn slot and raises SessionBusyError after
+        that. Every acquired session must be handed back with release().
+        """
+        key = (employee_id, conversation_id)
+        session = self._get(key)
+        session._waiting += 1
+        try:
+            await asyncio.wait_for(session._semaphore.acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise SessionBusyError(f"Conversation {conversation_id} is busy")
+        finally:
+            session._waiting -= 1
+        session._active += 1
+        try:
+            if not session.loaded:
+                session.loaded = True
+                if self.load is not None:
+                    try:
+                        session.context = await self.load(employee_id, conversation_id)
+                    except Exception as e:
+                        logging.error(f"Error loading chat session {key}: {e}")
+        except BaseException:
+            await self.release(session, completed=False)
+            raise
+        return session
+
+    async def release(self, session: ChatSession, completed: bool = True) -> None:
+        """
+        Ends a turn started with acquire().
+
+        The context of a completed turn is persisted when a ``save`` callback is configured;
+        an abandoned turn (error or cancellation) leaves the stored context as it was, and so
+        does a turn whose conversation was ended while it ran.
+        """
+        try:
+            if completed:
+                session.turns += 1
+                if self.save is not None and not session.ended:
+                    try:
+                        await self.save(session.key[0], session.key[1], session.context)
+                        # Ended while saving: the delete may have run first, so repeat it
+                        if session.ended and self.delete is not None:
+                            await self.delete(session.key[0], session.key[1])
+                    except Exception as e:
+                        logging.error(f"Error saving chat session {session.key}: {e}")
+        finally:
+            session._active -= 1
+            session.last_used = time.monotonic()
+            session._semaphore.release()
+
+    @asynccontextmanager
+    async def session(self, employee_id: int, conversation_id: str) -> AsyncIterator[ChatSession]:
+        """
+        Runs one turn of a conversation inside an ``async with`` block.
+
+        Set ``session.context`` to the new workflow context before leaving the block; it is
+        persisted when a ``save`` callback is configured.
+        """
+        session = await self.acquire(employee_id, conversation_id)
+        completed = False
+        try:
+            yield session
+            completed = True
+        finally:
+            await self.release(session, completed)
+
+    async def end(self, employee_id: int, conversation_id: str) -> bool:
+        """
+        Forgets a conversation in memory and in persistent storage; returns whether it was live.
+
+        Turns still running on the conversation finish, but their context is not saved.
+        """
+        key = (employee_id, conversation_id)
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            session.ended = True
+        if self.delete is not None:
+            try:
+                await self.delete(employee_id, conversation_id)
+            except Exception as e:
+                logging.error(f"Error deleting chat session {key}: {e}")
+        return session is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of live sessions and hit, eviction and rejection counters."""
+        self._evict()
+        return {
+            "live": len(self._sessions),
+            "busy": sum(1 for session in self._sessions.values() if session.busy),
+            "maxsize": self.maxsize,
+            "idle_ttl": self.idle_ttl,
+            "concurrency": self.concurrency,
+            "persistent": self.save is not None,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "rejected": self._rejected,
+        }
+
+
+CHAT_SESSIONS_MAX = int(os.getenv("CHAT_SESSIONS_MAX", "256"))
+CHAT_SESSION_IDLE_TTL = float(os.getenv("CHAT_SESSION_IDLE_TTL", "1800"))
+CHAT_SESSION_CONCURRENCY = int(os.getenv("CHAT_SESSION_CONCURRENCY", "1"))
+CHAT_SESSION_WAIT = float(os.getenv("CHAT_SESSION_WAIT", "30"))
+CHAT_SESSIONS_PERSIST = os.getenv("CHAT_SESSIONS_PERSIST", "false").lower() == "true"
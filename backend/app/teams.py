@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from tenacity import retry, stop_after_attempt, retry_if_exception, wait_incrementing, before_sleep_log, after_log
 import logging
-from .db import (
+from .async_db import (
     create_team,
     get_team,
     update_team,
@@ -13,12 +13,20 @@ from datetime import datetime, date
 from .models import Team, TeamCRUD, Employee
 from .auth import get_current_active_user
 from .helper import is_db_error
+from .responses import list_response
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _with_dates(team):
+    """Returns the team row with its timestamps converted to dates."""
+    return team._replace(
+        created_at=team["created_at"].date() if isinstance(team["created_at"], datetime) else team["created_at"],
+        updated_at=team["updated_at"].date() if isinstance(team["updated_at"], datetime) else team["updated_at"],
+    )
+
 # Teams CRUD endpoints
 @router.post("/teams/", response_model=Team)
 @retry(
@@ -35,18 +43,14 @@ async def create_team_endpoint(team_data: TeamCRUD, current_user: Employee = Dep
         team_name = team_data.team_name
         if not team_name:
             raise HTTPException(status_code=400, detail="Team name is required")
-        team_id = create_team(team_name)
+        team_id = await create_team(team_name)
         if not team_id:
             raise HTTPException(status_code=500, detail="Failed to create team")
-        team = get_team(team_id)
+        team = await get_team(team_id)
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
-        # Convert datetime objects to date
-        if isinstance(team["created_at"], datetime):
-            team["created_at"] = team["created_at"].date()
-        if isinstance(team["updated_at"], datetime):
-            team["updated_at"] = team["updated_at"].date()
-        return Team(**team)
+        team = _with_dates(team)
+        return team
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create team: {e}")
 
@@ -60,19 +64,15 @@ async def create_team_endpoint(team_data: TeamCRUD, current_user: Employee = Dep
 )
 async def read_team_endpoint(team_id: int, current_user: Employee = Depends(get_current_active_user)):
     try:
-        team = get_team(team_id)
+        team = await get_team(team_id)
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         if current_user.role != "ADMIN":
             if current_user.team_id != team_id:
                  raise HTTPException(status_code=403, detail="Unauthorized")
             
-        # Convert datetime objects to date
-        if isinstance(team["created_at"], datetime):
-            team["created_at"] = team["created_at"].date()
-        if isinstance(team["updated_at"], datetime):
-            team["updated_at"] = team["updated_at"].date()
-        return Team(**team)
+        team = _with_dates(team)
+        return team
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read team: {e}")
 
@@ -91,20 +91,16 @@ async def update_team_endpoint(team_id: int, team_data: TeamCRUD, current_user:
         team_name = team_data.team_name
         if not team_name:
             raise HTTPException(status_code=400, detail="Team name is required")
-        if not update_team(team_id, team_name):
+        if not await update_team(team_id, team_name):
             raise HTTPException(status_code=500, detail="Failed to update team")
         
-        team = get_team(team_id)
+        team = await get_team(team_id)
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
-        # Convert datetime objects to date
-        if isinstance(team["created_at"], datetime):
-            team["created_at"] = team["created_at"].date()
-        if isinstance(team["updated_at"], datetime):
-            team["updated_at"] = team["updated_at"].date()
+        team = _with_dates(team)
 
-        return Team(**team)
+        return team
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update team: {e}")
 
@@ -120,7 +116,7 @@ async def delete_team_endpoint(team_id: int, current_user: Employee = Depends(ge
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        if not delete_team(team_id):
+        if not await delete_team(team_id):
             raise HTTPException(status_code=500, detail="Failed to delete team")
         return {"message": "Team deleted"}
     except Exception as e:
@@ -138,16 +134,11 @@ async def read_all_teams_endpoint(current_user: Employee = Depends(get_current_a
     try:
         if current_user.role != "ADMIN":
             raise HTTPException(status_code=403, detail="Unauthorized")
-        teams = get_all_teams()
+        teams = await get_all_teams()
         if not teams:
             raise HTTPException(status_code=404, detail="No teams found")
 
-        # Convert datetime objects to date
-        for team in teams:
-            if isinstance(team["created_at"], datetime):
-                team["created_at"] = team["created_at"].date()
-            if isinstance(team["updated_at"], datetime):
-                team["updated_at"] = team["updated_at"].date()
-        return [Team(**team) for team in teams]
+        teams = [_with_dates(team) for team in teams]
+        return list_response(teams, Team)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read teams: {e}")
@@ -0,0 +1,211 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+from .invalidation import on_invalidation
+
+# Caching of the AI agents' tool calls. Three layers, checked in order:
+#   1. the turn memo: results of every tool call made while answering one chat message, so
+#      agents handing the conversation to each other do not repeat each other's lookups;
+#   2. the reference cache: teams and the employee directory, shared across turns for
+#      TOOL_CACHE_TTL seconds and evicted by team/employee invalidation events;
+#   3. in-flight coalescing: identical calls running at the same time share one query.
+
+ToolKey = Tuple[str, str]
+
+
+class ToolCallTurn:
+    """
+    Memo and counters for the tool calls made while answering one chat message.
+
+    Start the agent workflow through run() so every step task it creates sees this turn.
+    """
+
+    def __init__(self):
+        self.memo: Dict[ToolKey, Any] = {}
+        self.calls = 0
+        self.memo_hits = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.db_seconds = 0.0
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Calls ``fn`` in a copy of the current context in which this is the active turn."""
+        context = contextvars.copy_context()
+        return context.run(self._run, fn, args, kwargs)
+
+    def _run(self, fn: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        _current_turn.set(self)
+        return fn(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "memo_hits": self.memo_hits,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "db_seconds": round(self.db_seconds, 4),
+        }
+
+
+_current_turn: contextvars.ContextVar[Optional[ToolCallTurn]] = contextvars.ContextVar("tool_call_turn", default=None)
+
+
+class ToolCallCache:
+    """
+    Memoizes, caches and coalesces calls to the synchronous db functions used as agent tools.
+
+    call() answers one call of such a function, running it on a worker thread only when no
+    layer can answer; tooloutput.tool_functions builds FunctionTool's ``async_fn`` on it.
+    Results are shared between callers, so tools must be read-only and return values that
+    are not mutated afterwards.
+
+    Args:
+        maxsize (int): Maximum number of reference results kept across turns
+        ttl (float): Seconds a reference result is kept; 0 disables the reference cache
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._reference = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl, 0.001))
+        self._entities: Dict[ToolKey, frozenset] = {}
+        self._inflight: Dict[ToolKey, asyncio.Future] = {}
+        # Bumped by every invalidation, so a query that overlapped a write is not cached
+        self._generation = 0
+        self._calls = 0
+        self._memo_hits = 0
+        self._cache_hits = 0
+        self._coalesced = 0
+        self._executed = 0
+        self._db_seconds = 0.0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    @staticmethod
+    def make_key(name: str, args: Tuple, kwargs: Dict[str, Any]) -> ToolKey:
+        return name, json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    async def call(self, fn: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any], entities: frozenset = frozenset()) -> Any:
+        """Answers one tool call from the turn memo, the reference cache, a running call or ``fn``."""
+        key = self.make_key(fn.__name__, args, kwargs)
+        turn = _current_turn.get()
+        self._calls += 1
+        if turn is not None:
+            turn.calls += 1
+            if key in turn.memo:
+                turn.memo_hits += 1
+                self._memo_hits += 1
+                return turn.memo[key]
+
+        if entities and self.enabled:
+            with self._lock:
+                found = key in self._reference
+                result = self._reference.get(key)
+            if found:
+                self._cache_hits += 1
+                if turn is not None:
+                    turn.cache_hits += 1
+                    turn.memo[key] = result
+                return result
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._coalesced += 1
+            if turn is not None:
+                turn.coalesced += 1
+        else:
+            future = asyncio.ensure_future(self._execute(fn, args, kwargs, key, entities, turn))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so a cancelled caller does not cancel the query other callers are waiting on
+        result = await asyncio.shield(future)
+        if turn is not None:
+            turn.memo[key] = result
+        return result
+
+    async def _execute(self, fn: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any], key: ToolKey, entities: frozenset, turn: Optional[ToolCallTurn]) -> Any:
+        generation = self._generation
+        started = time.perf_counter()
+        try:
+            return_value = await asyncio.to_thread(fn, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._executed += 1
+            self._db_seconds += elapsed
+            if turn is not None:
+                turn.executed += 1
+                turn.db_seconds += elapsed
+        if entities and self.enabled:
+            with self._lock:
+                if generation != self._generation:
+                    return return_value
+                self._reference[key] = return_value
+                self._entities[key] = entities
+        return return_value
+
+    def invalidate(self, entity: str) -> None:
+        """Evicts the reference results that depend on an entity type."""
+        with self._lock:
+            self._generation += 1
+            for key, entities in list(self._entities.items()):
+                if key not in self._reference:
+                    del self._entities[key]
+                elif entity in entities:
+                    del self._reference[key]
+                    del self._entities[key]
+                    self._evictions += 1
+
+    def clear(self) -> None:
+        """Evicts every reference result."""
+        with self._lock:
+            self._generation += 1
+            self._evictions += len(self._reference)
+            self._reference.clear()
+            self._entities.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns cache size and call counters."""
+        with self._lock:
+            size = len(self._reference)
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "calls": self._calls,
+            "executed": self._executed,
+            "memo_hits": self._memo_hits,
+            "cache_hits": self._cache_hits,
+            "coalesced": self._coalesced,
+            "inflight": len(self._inflight),
+            "db_seconds": round(self._db_seconds, 4),
+            "evictions": self._evictions,
+        }
+
+
+# Cache used by the tools of the AI agent workflow
+tool_cache = ToolCallCache(
+    maxsize=int(os.getenv("TOOL_CACHE_MAXSIZE", "256")),
+    ttl=float(os.getenv("TOOL_CACHE_TTL", "30")),
+)
+
+@on_invalidation
+def _invalidate_tool_cache(event: Dict[str, Any]) -> None:
+    entity = event.get("entity")
+    if entity in ("team", "employee"):
+        tool_cache.invalidate(entity)
+    elif entity == "all":
+        tool_cache.clear()
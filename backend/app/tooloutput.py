@@ -0,0 +1,254 @@
+import functools
+import inspect
+import json
+import math
+import os
+from collections import Counter
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .toolcache import tool_cache
+
+# Shaping of AI agent tool results before they enter the LLM context. Row lists are projected
+# onto the columns the agents need and encoded as one column header plus value arrays instead
+# of repeating every key per row. Above TOOL_OUTPUT_MAX_ROWS rows a tool answers with counts
+# and a page of rows, and every output is kept within a token budget, with an explicit marker
+# wherever something was left out so the model knows to page or narrow the query.
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "2000"))
+TOOL_OUTPUT_MAX_ROWS = int(os.getenv("TOOL_OUTPUT_MAX_ROWS", "50"))
+TOOL_OUTPUT_PAGE_SIZE = int(os.getenv("TOOL_OUTPUT_PAGE_SIZE", "25"))
+
+# Rough token estimate for JSON-ish text; close enough for budgeting across LLM tokenizers
+CHARS_PER_TOKEN = 4
+
+# Free-text values (notes) are cut to this many characters
+MAX_TEXT_CHARS = 80
+
+# Never shown to the agents unless a spec asks for them
+DROPPED_COLUMNS = frozenset({"created_at", "updated_at", "password_hash"})
+
+# Most frequent values listed per summary column
+SUMMARY_TOP_VALUES = 10
+
+
+class ToolOutputSpec:
+    """
+    How the results of one kind of tool are shaped.
+
+    Args:
+        columns (Sequence[str], optional): Columns to keep, in order; None keeps every column
+            except DROPPED_COLUMNS
+        group_by (Sequence[str]): Columns whose value counts summarize a large result
+        ranges (Sequence[str]): Columns whose minimum and maximum summarize a large result
+        budget (int, optional): Token budget of the output; defaults to TOOL_OUTPUT_TOKEN_BUDGET
+        paged (bool): Whether the tool takes an ``offset`` to page through large results
+    """
+
+    def __init__(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        group_by: Sequence[str] = (),
+        ranges: Sequence[str] = (),
+        budget: Optional[int] = None,
+        paged: bool = True,
+    ):
+        self.columns = tuple(columns) if columns is not None else None
+        self.group_by = tuple(group_by)
+        self.ranges = tuple(ranges)
+        self.budget = budget
+        self.paged = paged
+
+    @property
+    def token_budget(self) -> int:
+        return self.budget if self.budget is not None else TOOL_OUTPUT_TOKEN_BUDGET
+
+
+ATTENDANCE_ROWS = ToolOutputSpec(
+    columns=("record_id", "employee_id", "attendance_date", "status", "check_in_time", "check_out_time", "notes"),
+    group_by=("status", "employee_id"),
+    ranges=("attendance_date",),
+)
+EMPLOYEE_ROWS = ToolOutputSpec(
+    columns=("employee_id", "name", "email", "team_id", "role"),
+    group_by=("team_id", "role"),
+)
+TEAM_ROWS = ToolOutputSpec(columns=("team_id", "team_name"))
+GAP_ROWS = ToolOutputSpec(
+    columns=("employee_id", "name", "team_id", "attendance_date"),
+    group_by=("employee_id", "attendance_date"),
+    ranges=("attendance_date",),
+)
+# Single records, statistics and text: only the column filter and the budget apply
+DEFAULT_OUTPUT = ToolOutputSpec(paged=False)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of LLM tokens in a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _compact_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, str) and len(value) > MAX_TEXT_CHARS:
+        return value[:MAX_TEXT_CHARS] + "…"
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _row_columns(row: Any) -> List[str]:
+    fields = getattr(row, "_fields", None)
+    return list(fields) if fields is not None else list(row.keys())
+
+
+def _select_columns(available: Iterable[str], spec: ToolOutputSpec) -> List[str]:
+    available = list(available)
+    if spec.columns is None:
+        return [column for column in available if column not in DROPPED_COLUMNS]
+    return [column for column in spec.columns if column in available]
+
+
+def _is_row(value: Any) -> bool:
+    return hasattr(value, "_fields") or isinstance(value, dict)
+
+
+def _summary(rows: Sequence[Any], spec: ToolOutputSpec, available: List[str]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {}
+    for column in spec.group_by:
+        if column not in available:
+            continue
+        counts = Counter(_compact_value(row[column]) for row in rows)
+        top = counts.most_common(SUMMARY_TOP_VALUES)
+        summary[f"count_by_{column}"] = {str(value): count for value, count in top}
+        if len(counts) > len(top):
+            summary[f"count_by_{column}"]["(other)"] = sum(counts.values()) - sum(count for _, count in top)
+    for column in spec.ranges:
+        if column not in available:
+            continue
+        values = [row[column] for row in rows if row[column] is not None]
+        if values:
+            summary[f"{column}_range"] = [_compact_value(min(values)), _compact_value(max(values))]
+    return summary
+
+
+def _fit(output: Dict[str, Any], budget: int) -> str:
+    """Drops trailing rows of ``output`` until it fits the budget, recording how many were cut."""
+    text = _dumps(output)
+    if estimate_tokens(text) <= budget:
+        return text
+    rows = output["rows"]
+    low, high = 0, len(rows)
+    # Largest number of rows that still fits, by binary search, leaving room for the marker
+    placeholder = "x" * 120
+    while low < high:
+        middle = (low + high + 1) // 2
+        candidate = {**output, "rows": rows[:middle], "truncated": placeholder}
+        if estimate_tokens(_dumps(candidate)) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    shown = low
+    cut = len(rows) - shown
+    output = {**output, "rows": rows[:shown]}
+    if "omitted_rows" in output or "offset" not in output:
+        output["omitted_rows"] = output.get("omitted_rows", 0) + cut
+        output["truncated"] = f"{cut} rows were cut to stay within {budget} tokens; narrow the query"
+    else:
+        output["next_offset"] = output["offset"] + shown
+        output["truncated"] = f"{cut} rows were cut to stay within {budget} tokens; call again with offset={output['next_offset']}"
+    return _dumps(output)
+
+
+def shape_rows(rows: Sequence[Any], spec: ToolOutputSpec, offset: int = 0) -> str:
+    """
+    Encodes a list of rows for the LLM.
+
+    Small results are returned whole as {"columns": [...], "rows": [[...], ...]}. Results
+    with more than TOOL_OUTPUT_MAX_ROWS rows (or any result read from a non-zero offset) also
+    carry "total_rows", a "summary" of value counts and ranges over all rows, and the page of
+    rows starting at ``offset`` with the "next_offset" to continue from.
+    """
+    if not rows:
+        return _dumps({"total_rows": 0, "rows": []})
+    available = _row_columns(rows[0])
+    columns = _select_columns(available, spec)
+    offset = max(offset, 0)
+
+    output: Dict[str, Any] = {"columns": columns}
+    if len(rows) > TOOL_OUTPUT_MAX_ROWS or offset:
+        page = rows[offset:offset + TOOL_OUTPUT_PAGE_SIZE] if spec.paged else rows[:TOOL_OUTPUT_PAGE_SIZE]
+        output = {
+            "total_rows": len(rows),
+            "summary": _summary(rows, spec, available),
+            "offset": offset if spec.paged else 0,
+            **output,
+        }
+        end = output["offset"] + len(page)
+        if spec.paged and end < len(rows):
+            output["next_offset"] = end
+        elif not spec.paged and end < len(rows):
+            output["omitted_rows"] = len(rows) - end
+    else:
+        page = rows
+    output["rows"] = [[_compact_value(row[column]) for column in columns] for row in page]
+    return _fit(output, spec.token_budget)
+
+
+def shape_value(value: Any, spec: ToolOutputSpec = DEFAULT_OUTPUT) -> str:
+    """Encodes any tool result for the LLM, cut to the spec's token budget with a marker."""
+    if isinstance(value, list) and value and _is_row(value[0]):
+        return shape_rows(value, spec)
+    if _is_row(value):
+        columns = _select_columns(_row_columns(value), spec)
+        value = {column: value[column] for column in columns}
+    text = value if isinstance(value, str) else _dumps(value)
+    budget = spec.token_budget
+    if estimate_tokens(text) <= budget:
+        return text
+    limit = budget * CHARS_PER_TOKEN
+    return text[:limit] + f"\n…[truncated: {len(text) - limit} more characters; narrow the query]"
+
+
+def tool_functions(fn: Callable[..., Any], spec: ToolOutputSpec = DEFAULT_OUTPUT, entities: Iterable[str] = ()) -> Dict[str, Callable[..., Any]]:
+    """
+    Builds the ``fn``/``async_fn`` pair for FunctionTool.from_defaults from a db function.
+
+    Both return the shaped output. Paged specs add an ``offset`` parameter to the tool schema;
+    pages are cut from the full result, which tool_cache keeps for the rest of the turn, so
+    paging does not repeat the query.
+
+    Args:
+        fn (Callable): Synchronous, read-only db function
+        spec (ToolOutputSpec): How to shape its results
+        entities (Iterable[str]): Passed to tool_cache.call for cross-turn caching
+    """
+    entities = frozenset(entities)
+    signature = inspect.signature(fn)
+    if spec.paged:
+        signature = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("offset", inspect.Parameter.KEYWORD_ONLY, default=0, annotation=int),
+        ])
+
+    def shape(result: Any, offset: int) -> str:
+        if spec.paged and isinstance(result, list):
+            return shape_rows(result, spec, offset)
+        return shape_value(result, spec)
+
+    @functools.wraps(fn)
+    def shaped(*args: Any, offset: int = 0, **kwargs: Any) -> str:
+        return shape(fn(*args, **kwargs), offset)
+
+    @functools.wraps(fn)
+    async def shaped_async(*args: Any, offset: int = 0, **kwargs: Any) -> str:
+        return shape(await tool_cache.call(fn, args, kwargs, entities), offset)
+
+    shaped.__signature__ = signature
+    shaped_async.__signature__ = signature
+    return {"fn": shaped, "async_fn": shaped_async}
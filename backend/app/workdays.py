@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Working-day calendar shared by the gap queries and the analytics engine. Configured with:
+#   WORKING_WEEKDAYS=1,2,3,4,5                    ISO weekdays (1 = Monday) worked by default
+#   HOLIDAYS=2025-01-01,2025-12-25                company-wide non-working dates
+#   TEAM_WORKING_WEEKDAYS={"3": [1,2,3,4,5,6]}    per-team weekdays, as JSON keyed by team_id
+
+
+def _parse_weekdays(value: str) -> List[int]:
+    weekdays = sorted({int(day) for day in value.split(",") if day.strip()})
+    if not weekdays or any(day < 1 or day > 7 for day in weekdays):
+        raise ValueError(f"Weekdays must be ISO weekday numbers 1-7, got '{value}'")
+    return weekdays
+
+
+class WorkCalendar:
+    """
+    Working days as weekdays minus holidays, with an optional weekday schedule per team.
+
+    Backed by NumPy business-day calendars, so masks for long ranges and many teams are
+    computed without Python loops over dates.
+
+    Args:
+        weekdays (Sequence[int]): ISO weekdays (1 = Monday ... 7 = Sunday) worked by default
+        holidays (Iterable[date]): Non-working dates for every team
+        team_weekdays (Dict[int, Sequence[int]]): Weekdays worked by specific teams
+    """
+
+    def __init__(
+        self,
+        weekdays: Sequence[int] = (1, 2, 3, 4, 5),
+        holidays: Iterable[date] = (),
+        team_weekdays: Optional[Dict[int, Sequence[int]]] = None,
+    ):
+        self.weekdays = sorted(set(weekdays))
+        self.holidays = sorted(set(holidays))
+        self.team_weekdays = {int(team_id): sorted(set(days)) for team_id, days in (team_weekdays or {}).items()}
+        self._busdaycals: Dict[Optional[int], np.busdaycalendar] = {}
+
+    @classmethod
+    def from_env(cls) -> "WorkCalendar":
+        """Builds the calendar from WORKING_WEEKDAYS, HOLIDAYS and TEAM_WORKING_WEEKDAYS."""
+        weekdays = _parse_weekdays(os.getenv("WORKING_WEEKDAYS", "1,2,3,4,5"))
+        holidays = [date.fromisoformat(day.strip()) for day in os.getenv("HOLIDAYS", "").split(",") if day.strip()]
+        team_weekdays = {
+            int(team_id): _parse_weekdays(",".join(str(day) for day in days))
+            for team_id, days in json.loads(os.getenv("TEAM_WORKING_WEEKDAYS", "{}")).items()
+        }
+        return cls(weekdays, holidays, team_weekdays)
+
+    def weekdays_for(self, team_id: Optional[int] = None) -> List[int]:
+        """Returns the ISO weekdays worked by a team, or the default ones."""
+        return self.team_weekdays.get(team_id, self.weekdays) if team_id is not None else self.weekdays
+
+    def _busdaycal(self, team_id: Optional[int]) -> np.busdaycalendar:
+        key = team_id if team_id in self.team_weekdays else None
+        busdaycal = self._busdaycals.get(key)
+        if busdaycal is None:
+            weekdays = self.weekdays_for(key)
+            weekmask = [day in weekdays for day in range(1, 8)]
+            busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=np.array(self.holidays, dtype="datetime64[D]"))
+            self._busdaycals[key] = busdaycal
+        return busdaycal
+
+    def is_working_day(self, day: date, team_id: Optional[int] = None) -> bool:
+        """Whether a team (or the company default) works on a date."""
+        return bool(np.is_busday(np.datetime64(day, "D"), busdaycal=self._busdaycal(team_id)))
+
+    def working_days(self, start_date: date, end_date: date, team_id: Optional[int] = None) -> List[date]:
+        """Lists the working days between two dates, inclusive."""
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date + timedelta(days=1), "D"))
+        return days[np.is_busday(days, busdaycal=self._busdaycal(team_id))].astype(date).tolist()
+
+    def working_mask(self, start_date: date, end_date: date, team_ids: Sequence[Optional[int]]) -> np.ndarray:
+        """
+        Returns a boolean (len(team_ids), days) matrix: whether each row's team works on each date.
+
+        Rows are usually employees, given by their team_id; rows of teams without a schedule of
+        their own (including None) share the default calendar.
+        """
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date + timedelta(days=1), "D"))
+        mask = np.empty((len(team_ids), len(days)), dtype=bool)
+        default_row = np.is_busday(days, busdaycal=self._busdaycal(None))
+        mask[:] = default_row
+        if self.team_weekdays:
+            teams = np.array([-1 if team_id is None else team_id for team_id in team_ids])
+            for team_id in self.team_weekdays:
+                rows = teams == team_id
+                if rows.any():
+                    mask[rows] = np.is_busday(days, busdaycal=self._busdaycal(team_id))
+        return mask
+
+
+try:
+    work_calendar = WorkCalendar.from_env()
+except ValueError as e:
+    logging.error(f"Invalid working-day calendar configuration, using Monday to Friday: {e}")
+    work_calendar = WorkCalendar()
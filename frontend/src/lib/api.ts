@@ -75,6 +75,24 @@ export interface TrendParams {
   status?: string;
 }
 
+export interface AttendancePage<T = any> {
+  items: T[];
+  next_cursor: string | null;
+  total_count: number | null;
+}
+
+export interface AttendancePageParams {
+  limit?: number;
+  cursor?: string | null;
+  start_date?: string;
+  end_date?: string;
+  team_id?: number;
+  employee_id?: number;
+  status?: string;
+  include_total?: boolean;
+  descending?: boolean;
+}
+
 // Auth APIs
 export const authApi = {
   login: async (email: string, password: string) => {
@@ -133,7 +151,15 @@ export const teamApi = {
 
 // Attendance APIs
 export const attendanceApi = {
-  getAll: () => fetchWithAuth<any[]>('/attendance/'),
+  getPage: (params: AttendancePageParams = {}) => {
+    const queryParams = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        queryParams.append(key, value.toString());
+      }
+    });
+    return fetchWithAuth<AttendancePage>(`/attendance/?${queryParams.toString()}`);
+  },
   getById: (id: string) => fetchWithAuth<any>(`/attendance/${id}`),
   getByEmployeeId: (employeeId: string) =>
     fetchWithAuth<any[]>(`/attendance/employee/${employeeId}`),
@@ -187,11 +213,96 @@ export const attendanceApi = {
   }
 };
 
+// Events emitted by POST /chat/stream
+export type ChatStreamEvent =
+  | { type: 'conversation'; conversation_id: string }
+  | { type: 'agent'; agent: string }
+  | { type: 'token'; agent: string; delta: string }
+  | { type: 'tool_call'; tool: string; arguments: Record<string, unknown> }
+  | { type: 'tool_result'; tool: string; output: string }
+  | { type: 'error'; detail: string }
+  | { type: 'done'; response: string; conversation_id: string };
+
 // AI Chat API
 export const chatApi = {
-  sendMessage: (message: string) =>
-    fetchWithAuth<{ response: string }>('/chat/', {
+  // Streams the agent's progress; aborting the signal closes the connection and cancels the run
+  streamMessage: async (
+    message: string,
+    conversationId: string | undefined,
+    onEvent: (event: ChatStreamEvent) => void,
+    signal?: AbortSignal
+  ): Promise<ApiResponse<null>> => {
+    const token = localStorage.getItem('token');
+
+    if (!token) {
+      window.location.href = '/login';
+      return { error: 'Authentication required' };
+    }
+
+    try {
+      const response = await fetch(`${API_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`,
+        },
+        body: JSON.stringify({ message, conversation_id: conversationId }),
+        signal,
+      });
+
+      if (response.status === 401) {
+        localStorage.removeItem('token');
+        window.location.href = '/login?session=expired';
+        return { error: 'Session expired. Please login again.' };
+      }
+
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || data.message || 'An error occurred');
+      }
+
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = '';
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+
+        // Events are separated by a blank line; lines starting with ':' are keep-alives
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf('\n\n');
+
+          let type = 'message';
+          let data = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event: ')) type = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (data) {
+            onEvent({ type, ...JSON.parse(data) } as ChatStreamEvent);
+          }
+        }
+      }
+
+      return { data: null };
+    } catch (error) {
+      if (error instanceof DOMException && error.name === 'AbortError') {
+        return { error: 'Cancelled' };
+      }
+      const message = error instanceof Error ? error.message : 'An unexpected error occurred';
+      toast.error(message);
+      console.error('API error:', error);
+      return { error: message };
+    }
+  },
+
+  sendMessage: (message: string, conversationId?: string) =>
+    fetchWithAuth<{ response: string; conversation_id: string }>('/chat/', {
       method: 'POST',
-      body: JSON.stringify({ message })
+      body: JSON.stringify({ message, conversation_id: conversationId })
     })
 };
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { attendanceApi, employeeApi, teamApi } from '@/lib/api';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -66,6 +66,11 @@ const AttendancePage = () => {
   const [isDeleteDialogOpen, setIsDeleteDialogOpen] = useState(false);
   const [currentPage, setCurrentPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
+  const [totalCount, setTotalCount] = useState(0);
+  // cursors[i] is the cursor that fetches page i + 1; the first page has no cursor
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isPageLoading, setIsPageLoading] = useState(false);
   const itemsPerPage = 10;
   const [activeTab, setActiveTab] = useState('all');
   
@@ -88,27 +93,17 @@ const AttendancePage = () => {
     notes: '',
   });
 
-  // Fetch data on component mount
+  // Fetch employees and teams on component mount
   useEffect(() => {
     const fetchData = async () => {
       setIsLoading(true);
       try {
-        // Fetch attendance records
-        const attendanceResponse = await attendanceApi.getAll();
-        
         // Fetch employees for dropdown
         const employeesResponse = await employeeApi.getAll();
         
         // Fetch teams for filtering
         const teamsResponse = await teamApi.getAll();
         
-        if (attendanceResponse.error || !attendanceResponse.data) {
-          toast.error('Failed to load attendance records');
-        } else {
-          setAttendanceRecords(attendanceResponse.data);
-          setTotalPages(Math.ceil(attendanceResponse.data.length / itemsPerPage));
-        }
-        
         if (employeesResponse.error || !employeesResponse.data) {
           toast.error('Failed to load employees');
         } else {
@@ -131,53 +126,88 @@ const AttendancePage = () => {
     fetchData();
   }, []);
 
-  // Filter attendance records based on criteria
-  const filteredRecords = attendanceRecords.filter((record) => {
-    // Filter by date if selected
-    if (dateFilter && format(new Date(record.attendance_date), 'yyyy-MM-dd') !== format(dateFilter, 'yyyy-MM-dd')) {
-      return false;
-    }
-    
-    // Filter by employee if selected
-    if (employeeFilter && employeeFilter !== 'all' && record.employee_id.toString() !== employeeFilter) {
-      return false;
-    }
-    
-    // Filter by team if selected
-    if (teamFilter && teamFilter !== 'all') {
-      const employee = employees.find(e => e.employee_id === record.employee_id);
-      if (!employee || employee.team_id?.toString() !== teamFilter) {
-        return false;
-      }
-    }
-    
-    // Filter by status if selected
-    if (statusFilter && statusFilter !== 'all' && record.status !== statusFilter) {
-      return false;
-    }
-    
-    // Filter by tab selection
+  // Translate the tab and filters into the server-side query parameters
+  const buildFilterParams = useCallback(() => {
+    let startDate: string | undefined;
+    let endDate: string | undefined;
+    const today = format(new Date(), 'yyyy-MM-dd');
+
     if (activeTab === 'today') {
-      return format(new Date(record.attendance_date), 'yyyy-MM-dd') === format(new Date(), 'yyyy-MM-dd');
+      startDate = today;
+      endDate = today;
     } else if (activeTab === 'week') {
-      const recordDate = new Date(record.attendance_date);
-      const today = new Date();
       const weekAgo = new Date();
-      weekAgo.setDate(today.getDate() - 7);
-      return recordDate >= weekAgo && recordDate <= today;
+      weekAgo.setDate(weekAgo.getDate() - 7);
+      startDate = format(weekAgo, 'yyyy-MM-dd');
+      endDate = today;
     }
-    
-    return true;
-  });
 
-  // Sort attendance records by created date (attendance_date)
-  const sortedRecords = filteredRecords.sort((a, b) => new Date(a.attendance_date).getTime() - new Date(b.attendance_date).getTime());
+    // A selected date narrows the tab's range down to that single day
+    if (dateFilter) {
+      const selected = format(dateFilter, 'yyyy-MM-dd');
+      startDate = startDate && startDate > selected ? startDate : selected;
+      endDate = endDate && endDate < selected ? endDate : selected;
+    }
 
-  // Paginate sorted records
-  const paginatedRecords = sortedRecords.slice(
-    (currentPage - 1) * itemsPerPage,
-    currentPage * itemsPerPage
-  );
+    return {
+      start_date: startDate,
+      end_date: endDate,
+      employee_id: employeeFilter && employeeFilter !== 'all' ? parseInt(employeeFilter) : undefined,
+      team_id: teamFilter && teamFilter !== 'all' ? parseInt(teamFilter) : undefined,
+      status: statusFilter && statusFilter !== 'all' ? statusFilter : undefined,
+    };
+  }, [activeTab, dateFilter, employeeFilter, teamFilter, statusFilter]);
+
+  // Fetch one page of attendance records from the server
+  const fetchPage = useCallback(async (page: number, cursor: string | null) => {
+    setIsPageLoading(true);
+    try {
+      const response = await attendanceApi.getPage({
+        ...buildFilterParams(),
+        limit: itemsPerPage,
+        cursor,
+        include_total: true,
+      });
+
+      if (response.error || !response.data) {
+        toast.error('Failed to load attendance records');
+        return;
+      }
+
+      setAttendanceRecords(response.data.items);
+      setNextCursor(response.data.next_cursor);
+      setCurrentPage(page);
+      if (response.data.total_count !== null) {
+        setTotalCount(response.data.total_count);
+        setTotalPages(Math.max(1, Math.ceil(response.data.total_count / itemsPerPage)));
+      }
+    } catch (error) {
+      console.error('Error fetching attendance records:', error);
+      toast.error('An error occurred while loading attendance records');
+    } finally {
+      setIsPageLoading(false);
+    }
+  }, [buildFilterParams]);
+
+  // Restart from the first page whenever the tab or a filter changes
+  useEffect(() => {
+    setCursors([null]);
+    fetchPage(1, null);
+  }, [fetchPage]);
+
+  const goToNextPage = () => {
+    if (!nextCursor) return;
+    setCursors(prev => [...prev.slice(0, currentPage), nextCursor]);
+    fetchPage(currentPage + 1, nextCursor);
+  };
+
+  const goToPreviousPage = () => {
+    if (currentPage <= 1) return;
+    fetchPage(currentPage - 1, cursors[currentPage - 2]);
+  };
+
+  // Reload the current page after a create, update or delete
+  const refreshPage = () => fetchPage(currentPage, cursors[currentPage - 1] ?? null);
 
   // Get employee name by ID
   const getEmployeeName = (employeeId: number) => {
@@ -275,13 +305,7 @@ const AttendancePage = () => {
           toast.error('Failed to update attendance record');
         } else {
           toast.success('Attendance record updated successfully');
-          
-          // Update the record in the local state
-          setAttendanceRecords(prev => prev.map(record => 
-            record.record_id === selectedRecord.record_id 
-              ? { ...record, ...attendanceData }
-              : record
-          ));
+          await refreshPage();
         }
       } else {
         // Create new record
@@ -291,17 +315,7 @@ const AttendancePage = () => {
           toast.error('Failed to create attendance record');
         } else {
           toast.success('Attendance record created successfully');
-          
-          // Add the new record to the local state
-          if (response.data) {
-            setAttendanceRecords(prev => [...prev, response.data as AttendanceRecord]);
-          } else {
-            // Refresh the entire list if we don't have the new record data
-            const refreshResponse = await attendanceApi.getAll();
-            if (!refreshResponse.error && refreshResponse.data) {
-              setAttendanceRecords(refreshResponse.data);
-            }
-          }
+          await refreshPage();
         }
       }
       
@@ -333,11 +347,7 @@ const AttendancePage = () => {
         toast.error('Failed to delete attendance record');
       } else {
         toast.success('Attendance record deleted successfully');
-        
-        // Remove the record from the local state
-        setAttendanceRecords(prev => prev.filter(record => 
-          record.record_id !== selectedRecord.record_id
-        ));
+        await refreshPage();
       }
       
       setIsDeleteDialogOpen(false);
@@ -380,7 +390,7 @@ const AttendancePage = () => {
             <div>
               <CardTitle>Attendance Records</CardTitle>
               <CardDescription>
-                Showing {filteredRecords.length} records in total
+                Showing {totalCount} records in total
               </CardDescription>
             </div>
             <Button onClick={() => handleOpenDialog()}>
@@ -488,8 +498,14 @@ const AttendancePage = () => {
                 </TableRow>
               </TableHeader>
               <TableBody>
-                {paginatedRecords.length > 0 ? (
-                  paginatedRecords.map((record, index) => (
+                {isPageLoading && attendanceRecords.length === 0 ? (
+                  <TableRow>
+                    <TableCell colSpan={8} className="text-center py-4">
+                      <Loader2 className="h-5 w-5 animate-spin inline" />
+                    </TableCell>
+                  </TableRow>
+                ) : attendanceRecords.length > 0 ? (
+                  attendanceRecords.map((record, index) => (
                     <TableRow key={record.record_id}>
                       <TableCell>{(currentPage - 1) * itemsPerPage + index + 1}</TableCell>
                       <TableCell>{formatDate(record.attendance_date)}</TableCell>
@@ -528,41 +544,31 @@ const AttendancePage = () => {
             </Table>
           </div>
 
-          {filteredRecords.length > itemsPerPage && (
+          {(currentPage > 1 || nextCursor) && (
             <div className="mt-4 flex justify-center">
               <Pagination>
                 <PaginationContent>
                   <PaginationItem>
                     {currentPage > 1 && (
                       <PaginationPrevious 
-                        onClick={() => setCurrentPage(prev => Math.max(prev - 1, 1))}
+                        onClick={goToPreviousPage}
                       />
                     )}
                   </PaginationItem>
                   
-                  {Array.from({ length: Math.min(5, totalPages) }, (_, i) => {
-                    // Show pagination window around current page
-                    const pageOffset = Math.max(0, currentPage - 3);
-                    const page = i + 1 + pageOffset;
-                    if (page <= totalPages) {
-                      return (
-                        <PaginationItem key={page}>
-                          <PaginationLink
-                            onClick={() => setCurrentPage(page)}
-                            isActive={page === currentPage}
-                          >
-                            {page}
-                          </PaginationLink>
-                        </PaginationItem>
-                      );
-                    }
-                    return null;
-                  })}
+                  <PaginationItem>
+                    <PaginationLink isActive>
+                      {currentPage}
+                    </PaginationLink>
+                  </PaginationItem>
+                  <PaginationItem className="text-sm text-muted-foreground px-2">
+                    of {totalPages}
+                  </PaginationItem>
                   
                   <PaginationItem>
-                    {currentPage < totalPages && (
+                    {nextCursor && (
                       <PaginationNext
-                        onClick={() => setCurrentPage(prev => Math.min(prev + 1, totalPages))}
+                        onClick={goToNextPage}
                       />
                     )}
                   </PaginationItem>
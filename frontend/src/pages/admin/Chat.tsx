@@ -3,7 +3,7 @@ import { useState, useRef, useEffect } from 'react';
 import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
-import { chatApi } from '@/lib/api';
+import { chatApi, ChatStreamEvent } from '@/lib/api';
 import { toast } from 'sonner';
 import { Send, User, Bot, Loader2 } from 'lucide-react';
 import { cn } from '@/lib/utils';
@@ -26,7 +26,10 @@ const ChatPage = () => {
   ]);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [conversationId, setConversationId] = useState<string | undefined>();
+  const [activity, setActivity] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const abortRef = useRef<AbortController | null>(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -36,6 +39,9 @@ const ChatPage = () => {
     scrollToBottom();
   }, [messages]);
 
+  // Leaving the page closes any open stream, which cancels the agent run on the server
+  useEffect(() => () => abortRef.current?.abort(), []);
+
   const handleSendMessage = async () => {
     if (!inputMessage.trim()) return;
     
@@ -50,26 +56,61 @@ const ChatPage = () => {
     setInputMessage('');
     setIsLoading(true);
     
+    const botMessageId = (Date.now() + 1).toString();
+    const updateBotMessage = (content: string) => {
+      setMessages(prev => {
+        const existing = prev.some(message => message.id === botMessageId);
+        if (!existing) {
+          return [...prev, { id: botMessageId, content, sender: 'bot', timestamp: new Date() }];
+        }
+        return prev.map(message => message.id === botMessageId ? { ...message, content } : message);
+      });
+    };
+
+    const controller = new AbortController();
+    abortRef.current = controller;
+    let draft = '';
+
+    const handleEvent = (event: ChatStreamEvent) => {
+      switch (event.type) {
+        case 'conversation':
+          setConversationId(event.conversation_id);
+          break;
+        case 'agent':
+          // Each agent starts its own reply; show only the latest one while streaming
+          draft = '';
+          setActivity(`${event.agent.replace(/_/g, ' ')} is working...`);
+          break;
+        case 'tool_call':
+          setActivity(`Running ${event.tool}...`);
+          break;
+        case 'token':
+          draft += event.delta;
+          setActivity(null);
+          updateBotMessage(draft);
+          break;
+        case 'error':
+          toast.error('The AI assistant ran into an error');
+          break;
+        case 'done':
+          setConversationId(event.conversation_id);
+          updateBotMessage(event.response);
+          break;
+      }
+    };
+
     try {
-      const response = await chatApi.sendMessage(inputMessage);
-      
-      if (response.error || !response.data) {
+      const result = await chatApi.streamMessage(inputMessage, conversationId, handleEvent, controller.signal);
+
+      if (result.error && result.error !== 'Cancelled') {
         toast.error('Failed to get response from AI assistant');
-        return;
       }
-      
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: response.data.response,
-        sender: 'bot',
-        timestamp: new Date(),
-      };
-      
-      setMessages(prev => [...prev, botMessage]);
     } catch (error) {
       console.error('Error sending message:', error);
       toast.error('An error occurred while communicating with the AI assistant');
     } finally {
+      abortRef.current = null;
+      setActivity(null);
       setIsLoading(false);
     }
   };
@@ -120,7 +161,8 @@ const ChatPage = () => {
             {isLoading && (
               <div className="flex items-start gap-3 rounded-lg p-3 bg-muted" style={{ maxWidth: '80%' }}>
                 <Bot className="h-5 w-5 mt-1" />
-                <Loader2 className="h-4 w-4 animate-spin" />
+                <Loader2 className="h-4 w-4 animate-spin mt-1" />
+                {activity && <span className="text-sm text-muted-foreground">{activity}</span>}
               </div>
             )}
             <div ref={messagesEndRef} />